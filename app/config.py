@@ -4,9 +4,6 @@ from fastapi.security import OAuth2PasswordBearer
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 
-from google import genai
-
-client = genai.Client()
 load_dotenv()
 
 google_api_key = os.getenv("GOOGLE_API_KEY")
@@ -38,4 +35,89 @@ api_key = os.getenv("PINECONE_API_KEY")
 index_name = os.getenv("PINECONE_INDEX")
 dimension = os.getenv("EMBEDDING_DIMENSION")
 cloud = os.getenv("PINECONE_CLOUD")
-region = os.getenv("PINECONE_REGION")
\ No newline at end of file
+region = os.getenv("PINECONE_REGION")
+
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", os.path.join("indexes", "lexical"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+
+MEMORY_MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "6"))
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1200"))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+MEMORY_CACHE_SIZE = int(os.getenv("MEMORY_CACHE_SIZE", "1024"))
+MEMORY_TTL_SECONDS = int(os.getenv("MEMORY_TTL_SECONDS", "1800"))
+
+MAX_BATCH_QUESTIONS = int(os.getenv("MAX_BATCH_QUESTIONS", "50"))
+BATCH_GENERATION_CONCURRENCY = int(os.getenv("BATCH_GENERATION_CONCURRENCY", "8"))
+
+CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "true").lower() == "true"
+CHAT_WRITER_BATCH_SIZE = int(os.getenv("CHAT_WRITER_BATCH_SIZE", "200"))
+CHAT_WRITER_FLUSH_INTERVAL = float(os.getenv("CHAT_WRITER_FLUSH_INTERVAL", "0.5"))
+CHAT_WRITER_MAX_RETRIES = int(os.getenv("CHAT_WRITER_MAX_RETRIES", "3"))
+CHAT_WRITER_RETRY_BACKOFF = float(os.getenv("CHAT_WRITER_RETRY_BACKOFF", "0.5"))
+LATENCY_BREAKDOWN_MAX_ROWS = int(os.getenv("LATENCY_BREAKDOWN_MAX_ROWS", "20000"))
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "adaptive")
+ADAPTIVE_FETCH_K = int(os.getenv("ADAPTIVE_FETCH_K", "20"))
+ADAPTIVE_MIN_K = int(os.getenv("ADAPTIVE_MIN_K", "2"))
+ADAPTIVE_MAX_K = int(os.getenv("ADAPTIVE_MAX_K", "10"))
+ADAPTIVE_RELATIVE_THRESHOLD = float(os.getenv("ADAPTIVE_RELATIVE_THRESHOLD", "0.88"))
+ADAPTIVE_FLAT_SPREAD = float(os.getenv("ADAPTIVE_FLAT_SPREAD", "0.05"))
+
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "25"))
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "12"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "4.0"))
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.2"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "1000"))
+LLM_CONTEXT_CACHE_ENABLED = os.getenv("LLM_CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+LLM_CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("LLM_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+
+PROVIDER_MODE = os.getenv("PROVIDER_MODE", "live")
+OFFLINE_SEED = int(os.getenv("OFFLINE_SEED", "7"))
+OFFLINE_LLM_LATENCY = os.getenv("OFFLINE_LLM_LATENCY", "lognormal:600,0.4")
+OFFLINE_EMBED_LATENCY = os.getenv("OFFLINE_EMBED_LATENCY", "fixed:40")
+OFFLINE_VECTOR_LATENCY = os.getenv("OFFLINE_VECTOR_LATENCY", "fixed:10")
+OFFLINE_LLM_ERROR_RATE = float(os.getenv("OFFLINE_LLM_ERROR_RATE", "0"))
+
+SESSION_RETRIEVAL_CACHE = os.getenv("SESSION_RETRIEVAL_CACHE", "true").lower() == "true"
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "512"))
+SESSION_CACHE_TTL_SECONDS = int(os.getenv("SESSION_CACHE_TTL_SECONDS", "1800"))
+SESSION_CACHE_MAX_CHUNKS = int(os.getenv("SESSION_CACHE_MAX_CHUNKS", "40"))
+SESSION_CACHE_MIN_SCORE = float(os.getenv("SESSION_CACHE_MIN_SCORE", "0.75"))
+
+PLACEHOLDER_MAP_CACHE_SIZE = int(os.getenv("PLACEHOLDER_MAP_CACHE_SIZE", "256"))
+
+LEASE_JOB_CONCURRENCY = int(os.getenv("LEASE_JOB_CONCURRENCY", "4"))
+LEASE_JOB_SYNC_WAIT_SECONDS = float(os.getenv("LEASE_JOB_SYNC_WAIT_SECONDS", "20"))
+LEASE_JOB_POLL_INTERVAL = float(os.getenv("LEASE_JOB_POLL_INTERVAL", "0.5"))
+LEASE_JOB_MAX_ATTEMPTS = int(os.getenv("LEASE_JOB_MAX_ATTEMPTS", "3"))
+LEASE_JOB_STALE_SECONDS = int(os.getenv("LEASE_JOB_STALE_SECONDS", "900"))
+LEASE_RENDER_CACHE_SIZE = int(os.getenv("LEASE_RENDER_CACHE_SIZE", "128"))
+
+METADATA_EXTRACTION_MODE = os.getenv("METADATA_EXTRACTION_MODE", "auto")  # auto / single / chunked
+METADATA_SECTION_CHARS = int(os.getenv("METADATA_SECTION_CHARS", "12000"))
+METADATA_SECTION_CONCURRENCY = int(os.getenv("METADATA_SECTION_CONCURRENCY", "8"))
+
+LEASE_BATCH_MAX_FILES = int(os.getenv("LEASE_BATCH_MAX_FILES", "50"))
+LEASE_BATCH_CONCURRENCY = int(os.getenv("LEASE_BATCH_CONCURRENCY", "4"))
+TEMPLATE_REGISTRY_SIZE = int(os.getenv("TEMPLATE_REGISTRY_SIZE", "64"))
+
+LEASE_STORE_DIR = os.getenv("LEASE_STORE_DIR", "lease_store")
+LEASE_STORE_CACHE_SIZE = int(os.getenv("LEASE_STORE_CACHE_SIZE", "256"))
+LEASE_STORE_REBASE_RATIO = float(os.getenv("LEASE_STORE_REBASE_RATIO", "0.5"))
@@ -1,5 +1,4 @@
-
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from datetime import datetime
 from typing import Optional
 from app.models.models import User, OTP, Company, Token
@@ -83,7 +82,7 @@ def create_bearer_token(db: Session, user_id: int) -> str:
     return token
 
 def get_user_by_token(db: Session, token: str) -> Optional[User]:
-    db_token = db.query(Token).filter(
+    db_token = db.query(Token).options(joinedload(Token.user)).filter(
         Token.token == token,
         Token.expires_at > datetime.utcnow()
     ).first()
@@ -81,6 +81,21 @@ def get_recent_questions_data(db: Session, company_id: int):
     )
     return [row[0] for row in recent_questions]
 
+def bucket_by_day(start_date, days: int, series: dict) -> list:
+    """One entry per day from `start_date`, filled from (date, count) rows per series name."""
+    summary = [
+        {"date": (start_date + timedelta(days=i)).isoformat(), **{name: 0 for name in series}}
+        for i in range(days)
+    ]
+    by_date = {entry["date"]: entry for entry in summary}
+    for name, rows in series.items():
+        for date, count in rows:
+            entry = by_date.get(date.isoformat() if hasattr(date, "isoformat") else str(date))
+            if entry:
+                entry[name] = count
+    return summary
+
+
 def get_activity_summary_data(db: Session, company_id: int, start_date: datetime, days: int):
     chat_sessions = (
         db.query(func.date(ChatSession.created_at).label("date"), func.count().label("count"))
@@ -105,25 +120,11 @@ def get_activity_summary_data(db: Session, company_id: int, start_date: datetime
         .group_by(func.date(ChatSession.created_at))
         .all()
     )
-    summary = []
-    for i in range(days):
-        day = (start_date + timedelta(days=i)).isoformat()
-        summary.append({"date": day, "chat_sessions": 0, "logins": 0, "active_users": 0})
-
-    for date, count in chat_sessions:
-        for entry in summary:
-            if entry["date"] == date.isoformat():
-                entry["chat_sessions"] = count
-
-    for date, count in logins:
-        for entry in summary:
-            if entry["date"] == date.isoformat():
-                entry["logins"] = count
-
-    for date, count in active_users:
-        for entry in summary:
-            if entry["date"] == date.isoformat():
-                entry["active_users"] = count
+    summary = bucket_by_day(start_date, days, {
+        "chat_sessions": chat_sessions,
+        "logins": logins,
+        "active_users": active_users,
+    })
 
     result = [
         {"date": entry["date"], "chat_sessions": entry["chat_sessions"], "active_users": entry["active_users"]}
@@ -143,7 +144,7 @@ async def classify_feedback_with_llm(feedback_list: list[str]):
     prompt = build_feedback_classification_prompt(feedback_list)
 
     try:
-        result = invoke_llm(prompt, expect_json=True, fallback={"feedback": ["neutral"] * len(feedback_list)})
+        result = await invoke_llm(prompt, expect_json=True, fallback={"feedback": ["neutral"] * len(feedback_list)})
         feedback_labels = result.get("feedback", [])
 
         # Ensure output length matches input
@@ -218,3 +219,18 @@ async def get_rag_metrics_data(db: Session, company_id: int):
     }
 
 
+
+def get_chat_timings_data(db: Session, company_id: int, start_date: datetime, limit: int):
+    """Timing fields of the newest `limit` turns since `start_date`; the answer payloads are never loaded."""
+    return (
+        db.query(
+            ChatHistory.response_time,
+            ChatHistory.response_json["timings_ms"],
+            ChatHistory.response_json["usage"],
+            ChatHistory.response_json["cache_hits"],
+        )
+        .filter(ChatHistory.company_id == company_id, ChatHistory.timestamp >= start_date)
+        .order_by(ChatHistory.timestamp.desc())
+        .limit(limit)
+        .all()
+    )
@@ -116,8 +116,92 @@ def save_chat_history(
     db.refresh(chat_history)
     return chat_history
 
+def save_chat_turn(
+    db: Session,
+    session_id: str,
+    user_id: int,
+    question: str,
+    answer: str,
+    company_id: int,
+    category: Optional[str] = None,
+    building_id: Optional[int] = None,
+    response_json: Optional[dict] = None,
+    response_time: Optional[float] = None,
+    confidence: Optional[float] = None,
+    timestamp: Optional[datetime] = None
+):
+    """Session upsert and history insert in one transaction, without the refresh round trips."""
+    save_chat_history_batch(
+        db,
+        session_id=session_id,
+        user_id=user_id,
+        company_id=company_id,
+        category=category,
+        building_id=building_id,
+        turns=[{
+            "question": question,
+            "answer": answer,
+            "response_json": response_json,
+            "response_time": response_time,
+            "confidence": confidence,
+            "timestamp": timestamp,
+        }],
+    )
+
 def get_user_chat_history(db: Session, session_id: str, user_id: int):
     return db.query(ChatHistory).filter_by(
         chat_session_id=session_id,
         user_id=user_id
     ).order_by(ChatHistory.timestamp.asc()).all()
+
+
+def is_foreign_chat_session(db: Session, session_id: str, user_id: int, company_id: int) -> bool:
+    """True when `session_id` already exists and belongs to another user or company."""
+    owner = db.query(ChatSession.user_id, ChatSession.company_id).filter_by(id=session_id).first()
+    return owner is not None and tuple(owner) != (user_id, company_id)
+
+
+def save_chat_history_batch(
+    db: Session,
+    session_id: str,
+    user_id: int,
+    company_id: int,
+    turns: list,
+    category: Optional[str] = None,
+    building_id: Optional[int] = None
+):
+    """
+    Create the session if needed and insert every turn in a single transaction.
+    Raises PermissionError when the session belongs to another user or company.
+    """
+    try:
+        session = db.query(ChatSession).filter_by(id=session_id).first()
+        if session is not None and (session.user_id, session.company_id) != (user_id, company_id):
+            raise PermissionError(f"Chat session {session_id} belongs to another user")
+        if not session:
+            db.add(ChatSession(
+                id=session_id,
+                user_id=user_id,
+                category=category,
+                company_id=company_id,
+                building_id=building_id,
+                created_at=datetime.utcnow(),
+            ))
+        db.add_all([
+            ChatHistory(
+                chat_session_id=session_id,
+                user_id=user_id,
+                company_id=company_id,
+                question=turn["question"],
+                answer=turn["answer"],
+                response_time=turn.get("response_time"),
+                confidence=turn.get("confidence"),
+                response_json=turn.get("response_json"),
+                timestamp=turn.get("timestamp") or datetime.utcnow(),
+            )
+            for turn in turns
+        ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
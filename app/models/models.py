@@ -226,6 +226,38 @@ class StandaloneFile(Base):
     user = relationship("User", back_populates="standalone_files", foreign_keys=[user_id])
     building = relationship("Building", foreign_keys=[building_id])
 
+class LeaseJob(Base):
+    """LOI -> metadata -> lease pipeline run; each finished stage's output is kept so a retry resumes."""
+    __tablename__ = "lease_jobs"
+    job_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    category = Column(String, nullable=False)
+    original_file_name = Column(String, nullable=False)
+    upload_path = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="queued")  # queued / running / completed / failed
+    stage = Column(String, nullable=False, default="extract_text")
+    extracted_text = Column(Text, nullable=True)
+    structured_metadata = Column(Text, nullable=True)
+    file_id = Column(String, ForeignKey("standalone_files.file_id", ondelete="SET NULL"), nullable=True)
+    lease_revision = Column(Integer, nullable=True)  # lease store revision written by the job
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user = relationship("User", foreign_keys=[user_id])
+
+
+class LeaseRenderState(Base):
+    """What the last render of a file's lease used, so metadata edits can re-render incrementally."""
+    __tablename__ = "lease_render_states"
+    file_id = Column(String, ForeignKey("standalone_files.file_id", ondelete="CASCADE"), primary_key=True)
+    template_digest = Column(String, nullable=False)
+    mapping = Column(JSON, nullable=False)  # placeholder -> flattened metadata key (or null)
+    metadata_values = Column(JSON, nullable=False)  # flattened metadata the lease was rendered from
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class CategorizedFile(Base):
     __tablename__ = "categorized_files"
     file_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -4,7 +4,8 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database.db import get_db
 from app.models.models import User
-from app.schema.chat_bot_schema import AskQuestionRequest, ListFilesResponse
+from app.schema.chat_bot_schema import AskQuestionRequest, AskQuestionsBatchRequest, ListFilesResponse
+from app.services.batch_chat_service import ask_batch_service
 from app.services.session_service import delete_session_service, get_session_history_service, list_chat_sessions_service
 from app.utils.auth_utils import get_current_user
 
@@ -42,6 +43,14 @@ async def ask_question(
     return await ask_simple_service(req, current_user, db)
 
 
+@router.post("/ask_questions/batch/", summary="Ask many questions about one building at once")
+async def ask_questions_batch(
+    req: AskQuestionsBatchRequest,
+    current_user=Depends(get_current_user),
+):
+    return await ask_batch_service(req, current_user)
+
+
 @router.get("/chat/sessions/")
 async def list_chat_sessions(
     current_user=Depends(get_current_user),
@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from app.database.db import get_db
 from app.models.models import User
-from app.services.dashboard_service import get_activity_summary_service, get_ai_insights_service, get_analytics_service, get_rag_metrics_service, get_recent_questions_ai_service, get_stats_service, get_usage_trends_service
+from app.services.dashboard_service import get_activity_summary_service, get_ai_insights_service, get_latency_breakdown_service, get_analytics_service, get_rag_metrics_service, get_recent_questions_ai_service, get_stats_service, get_usage_trends_service
 from app.utils.auth_utils import get_current_user
 
 router = APIRouter()
@@ -35,15 +35,15 @@ def get_analytics(
     return get_analytics_service(db, current_user.company_id, days)
 
 @router.get("/ai_insights")
-def get_ai_insights(
+async def get_ai_insights(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     check_admin_permission(current_user)
-    return get_ai_insights_service(db, current_user.company_id)
+    return await get_ai_insights_service(db, current_user.company_id)
 
 @router.get("/usage_trends")
-def get_usage_trends(
+async def get_usage_trends(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     days: int = 7
@@ -51,15 +51,15 @@ def get_usage_trends(
     check_admin_permission(current_user)
     if days not in [7, 30, 90]:
         days = 7
-    return get_usage_trends_service(db, current_user.company_id, days)
+    return await get_usage_trends_service(db, current_user.company_id, days)
 
 @router.get("/recent_questions")
-def get_recent_questions(
+async def get_recent_questions(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     check_admin_permission(current_user)
-    return get_recent_questions_ai_service(db, current_user.company_id)
+    return await get_recent_questions_ai_service(db, current_user.company_id)
 
 @router.get("/activity_summary")
 def get_activity_summary(
@@ -80,3 +80,15 @@ async def get_rag_metrics(
     check_admin_permission(current_user)
     metrics = await get_rag_metrics_service(db, current_user.company_id)
     return metrics
+
+
+@router.get("/latency_breakdown")
+def get_latency_breakdown(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    days: int = Query(7, description="Filter by last X days (7, 30, 90)")
+):
+    check_admin_permission(current_user)
+    if days not in [7, 30, 90]:
+        raise HTTPException(status_code=400, detail="Days must be 7, 30, or 90")
+    return get_latency_breakdown_service(db, current_user.company_id, days)
@@ -1,24 +1,25 @@
 
+import asyncio
 import logging
-import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, Body
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.orm import Session
+from app.config import LEASE_JOB_SYNC_WAIT_SECONDS
 from app.database.db import get_db
 from app.models.models import StandaloneFile, User
-from app.services.gen_lease_services import (
-    save_file_metadata, extract_structured_metadata_with_llm,
-    get_file_info_service, generate_lease_text, list_category_files_service,
-    save_lease_file
+from app.services.gen_lease_services import get_file_info_service, list_category_files_service, save_lease_file
+from app.services.lease_job_service import (
+    create_lease_job, get_lease_job, job_payload, lease_job_runner,
+    retry_lease_job, stream_lease_job_events
 )
+from app.services.lease_store import lease_store
+from app.services.lease_render_service import regenerate_lease_for_file, render_lease_for_file
 from app.utils.auth_utils import get_current_user
 from app.crud.user_chatbot_crud import get_standalone_file, delete_standalone_file
-from app.utils.process_file import save_to_temp, extract_text_from_file_using_llm
 import json
 from pydantic import BaseModel
 from typing import List
-from fastapi.responses import PlainTextResponse
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
@@ -42,8 +43,6 @@ class UpdateTextRequest(BaseModel):
     
 
 
-from fastapi import HTTPException
-
 @router.post("/upload/simple")
 async def upload_file(
     file: UploadFile = File(...),
@@ -51,44 +50,79 @@ async def upload_file(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
+    """
+    Queue the LOI -> metadata -> lease pipeline as a background job and wait up
+    to LEASE_JOB_SYNC_WAIT_SECONDS for it. A job that finishes in time answers
+    as before; a slower one answers 202 with its job id for /jobs/{job_id}.
+    """
     # Raise an HTTPException if the file is not a PDF
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Invalid file type. Only PDF files are allowed.")
-    
-    try:
-        logger.info(f"Uploading file {file.filename} for user {current_user.id}")
-        
-        temp_path = await save_to_temp(file, current_user.id, current_user, category)
-        
-        extracted_text = extract_text_from_file_using_llm(temp_path)
-        if not extracted_text:
-            raise ValueError("No text extracted from file")
-        
-        structured_metadata = extract_structured_metadata_with_llm(extracted_text) or {}
-
-        saved_file = save_file_metadata(
-            db,
-            file,
-            gcs_path="",  
-            category=category,
-            current_user=current_user,
-            structured_metadata=json.dumps(structured_metadata)
-        )
 
-        os.remove(temp_path)
-        
-        return {
-            "file_id": saved_file.file_id,
-            "original_file_name": saved_file.original_file_name,
-            "category": saved_file.category,
-            "user_id": saved_file.user_id,
-            "uploaded_at": saved_file.uploaded_at.isoformat()
-        }
-    except Exception as e:
-        logger.error(f"Failed to upload file {file.filename}: {str(e)}")
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            os.remove(temp_path)
-        raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(e)}")
+    logger.info(f"Uploading file {file.filename} for user {current_user.id}")
+    job = await create_lease_job(db, file, category, current_user)
+    task = lease_job_runner.tasks.get(job.job_id)
+    if task is not None:
+        try:
+            await asyncio.wait_for(asyncio.shield(task), LEASE_JOB_SYNC_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+    db.refresh(job)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Failed to upload file: {job.error}")
+    if job.status != "completed":
+        return JSONResponse(status_code=202, content=job_payload(job))
+
+    saved_file = get_standalone_file(db, job.file_id)
+    return {
+        "file_id": saved_file.file_id,
+        "original_file_name": saved_file.original_file_name,
+        "category": saved_file.category,
+        "user_id": saved_file.user_id,
+        "uploaded_at": saved_file.uploaded_at.isoformat(),
+        "job_id": job.job_id,
+    }
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    category: str = Form(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    if not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Invalid file type. Only PDF files are allowed.")
+    job = await create_lease_job(db, file, category, current_user)
+    return job_payload(job)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    return job_payload(get_lease_job(db, job_id, current_user))
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    return stream_lease_job_events(job_id, current_user)
+
+
+@router.post("/jobs/{job_id}/retry", status_code=202)
+async def retry_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Re-run a failed job from the stage it failed in; earlier stages' results are reused."""
+    return job_payload(retry_lease_job(db, job_id, current_user))
 
 
 
@@ -127,13 +161,14 @@ async def generate_lease_agreement_text(
         if not file_info or not file_info.get("success"):
             raise HTTPException(status_code=404, detail="File not found or extraction failed")
 
-        lease_text = generate_lease_text(file_info["structured_metadata"])
+        lease_text = await render_lease_for_file(db, file_id, file_info["structured_metadata"])
 
         save_lease_file(
             content=lease_text,
             company_id=current_user.company_id,
             category="lease_gen",
-            file_id=file_id
+            file_id=file_id,
+            note="generated"
         )
 
         db_file = get_standalone_file(db, file_id)
@@ -162,17 +197,66 @@ async def view_file_text(
     if not db_file:
         raise HTTPException(status_code=404, detail="File not found or not authorized")
 
-    file_path = os.path.join("uploads", str(current_user.company_id), "lease_gen", f"{file_id}.txt")
-
-    if not os.path.exists(file_path):
+    content = lease_store.read_latest(current_user.company_id, "lease_gen", file_id)
+    if content is None:
         raise HTTPException(status_code=400, detail="No lease text file found")
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
+    return PlainTextResponse(content=content)
+
+
+
+def _owned_lease_file(db: Session, file_id: str, current_user: User) -> StandaloneFile:
+    db_file = db.query(StandaloneFile).filter(
+        StandaloneFile.file_id == file_id,
+        StandaloneFile.user_id == current_user.id
+    ).first()
+    if not db_file:
+        raise HTTPException(status_code=404, detail="File not found or not authorized")
+    return db_file
+
+
+@router.get("/files/lease-history")
+async def lease_history(
+    file_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    _owned_lease_file(db, file_id, current_user)
+    return {"file_id": file_id, "revisions": lease_store.history(current_user.company_id, "lease_gen", file_id)}
+
 
+@router.get("/files/lease-revision", response_class=PlainTextResponse)
+async def lease_revision(
+    file_id: str,
+    rev: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    _owned_lease_file(db, file_id, current_user)
+    content = lease_store.read_revision(current_user.company_id, "lease_gen", file_id, rev)
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"Revision {rev} not found")
     return PlainTextResponse(content=content)
 
 
+@router.get("/files/lease-diff", response_class=PlainTextResponse)
+async def lease_diff(
+    file_id: str,
+    from_rev: int,
+    to_rev: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Unified diff between two revisions; `to_rev` defaults to the latest."""
+    _owned_lease_file(db, file_id, current_user)
+    if to_rev is None:
+        to_rev = len(lease_store.history(current_user.company_id, "lease_gen", file_id))
+    diff = lease_store.diff(current_user.company_id, "lease_gen", file_id, from_rev, to_rev)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return PlainTextResponse(content=diff)
+
+
 
 @router.patch("/files/text")
 async def update_file_text(
@@ -189,20 +273,15 @@ async def update_file_text(
     if not db_file:
         raise HTTPException(status_code=404, detail="File not found or not authorized")
 
-    file_path = os.path.join("uploads", str(current_user.company_id), "lease_gen", f"{file_id}.txt")
-
-
-    if not os.path.exists(file_path):
+    if not lease_store.exists(current_user.company_id, "lease_gen", file_id):
         raise HTTPException(status_code=400, detail="No lease text file found to update")
 
-    print("file type", type(new_text))
-
-
     save_lease_file(
         content=new_text,
         company_id=current_user.company_id,
         category="lease_gen",
-        file_id=file_id
+        file_id=file_id,
+        note="edited"
     )
 
     return {"messsage": "Text updated successfully."} 
@@ -229,21 +308,24 @@ async def update_metadata(
         db.commit()
         db.refresh(db_file)
 
-      
-        lease_text = generate_lease_text(structured_metadata)
 
-        file_path = save_lease_file(
+        lease_text, changed_placeholders = await regenerate_lease_for_file(db, file_id, structured_metadata)
+
+        revision = save_lease_file(
             content=lease_text,
             company_id=current_user.company_id,
             category="lease_gen",
-            file_id=file_id
+            file_id=file_id,
+            note="metadata updated"
         )
-        logger.info(f"Lease text saved to {file_path} with updated metadata for file_id {file_id}")
+        logger.info(f"Lease text saved as revision {revision['rev']} with updated metadata for file_id {file_id}")
 
         return {
             "file_id": db_file.file_id,
             "structured_metadata": structured_metadata,
-            "file_path": file_path
+            "lease_revision": {"rev": revision["rev"], "sha": revision["sha"]},
+            "incremental": changed_placeholders is not None,
+            "changed_placeholders": changed_placeholders,
         }
     except Exception as e:
         logger.error(f"Error updating metadata for file_id {file_id}: {str(e)}")
@@ -275,10 +357,8 @@ async def delete_file(
         if db_file.user_id != current_user.id:
             raise HTTPException(status_code=403, detail="Not authorized to delete this file")
         
-        file_path = f"uploads/{current_user.company_id}/lease_gen/{file_id}.txt"
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            logger.info(f"Deleted lease text file {file_path}")
+        lease_store.delete(current_user.company_id, "lease_gen", file_id)
+        logger.info(f"Deleted lease revisions for {file_id}")
         
         delete_standalone_file(db, file_id)
         return {"message": f"File with id {file_id} deleted successfully"}
@@ -1,14 +1,18 @@
+import asyncio
 import os
 import uuid
 import shutil
 import logging
+from typing import List
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from app.database.db import get_db
 from app.models.models import StandaloneFile, User
-from app.services.gen_lease_services import extract_structured_metadata_with_llm, generate_lease_text, save_lease_file
+from app.services.lease_batch_service import generate_lease_for_loi, generate_leases_batch, save_loi
+from app.services.template_registry import template_registry
+from app.utils.llm_client import llm_gateway
 from app.utils.auth_utils import get_current_user
 
 
@@ -42,19 +46,40 @@ async def upload_file(
     with open(save_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
 
+    placeholders = None
+    if category == "template":
+        # extract and compile once here; generation only ever renders the compiled form
+        try:
+            placeholders = (await asyncio.to_thread(template_registry.register, file_id, save_path)).fields
+        except Exception as e:
+            # no text, a corrupt DOCX/PDF or an I/O error: don't leave the upload behind
+            os.remove(save_path)
+            raise HTTPException(status_code=400, detail=f"Could not read template: {str(e)}")
+
     db_file = StandaloneFile(
         file_id=file_id,
         original_file_name=file.filename,
         user_id=current_user.id,
         category=category,
         gcs_path=save_path,  # local path stored here
+        company_id=current_user.company_id,
         uploaded_at=datetime.utcnow(),
     )
-    db.add(db_file)
-    db.commit()
+    try:
+        db.add(db_file)
+        db.commit()
+    except Exception:
+        db.rollback()
+        if category == "template":
+            template_registry.drop(file_id, save_path)
+        os.remove(save_path)
+        raise
     db.refresh(db_file)
 
-    return {"file_id": file_id, "file_name": file.filename, "category": category}
+    response = {"file_id": file_id, "file_name": file.filename, "category": category}
+    if placeholders is not None:
+        response["placeholders"] = placeholders
+    return response
 
 
 # ========== 2️⃣ List Files ==========
@@ -81,7 +106,7 @@ def list_files(
 
 # ========== 3️⃣ Delete File ==========
 @router.delete("/{file_id}")
-def delete_file(
+async def delete_file(
     file_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -94,6 +119,10 @@ def delete_file(
     if not db_file:
         raise HTTPException(status_code=404, detail="File not found.")
 
+    if db_file.category == "template":
+        template = template_registry.drop(file_id, db_file.gcs_path)
+        if template is not None:
+            await llm_gateway.drop_context_cache(f"lease-template:{template.digest}")
     if os.path.exists(db_file.gcs_path):
         os.remove(db_file.gcs_path)
 
@@ -121,26 +150,37 @@ async def generate_lease_from_template(
     if not template_file:
         raise HTTPException(status_code=404, detail="Template file not found.")
 
-    # Save uploaded LOI locally
-    loi_folder = os.path.join(UPLOAD_DIR, f"user_{current_user.id}", "loi")
-    os.makedirs(loi_folder, exist_ok=True)
-    loi_file_id = str(uuid.uuid4())
-    loi_ext = os.path.splitext(loi_file.filename)[1]
-    loi_path = os.path.join(loi_folder, f"{loi_file_id}{loi_ext}")
-
-    with open(loi_path, "wb") as buffer:
-        shutil.copyfileobj(loi_file.file, buffer)
-
-    # ====== Extract metadata from LOI =====
-    extracted_text = "..."  # ← extract text from LOI using pymupdf or docx
-    metadata = extract_structured_metadata_with_llm(extracted_text)
-
-    # ====== Generate final lease ======
-    lease_text = generate_lease_text(metadata)
-    lease_path = save_lease_file(lease_text, f"user_{current_user.id}", "leases", loi_file_id)
+    template = await template_registry.aget(template_file)
+    loi = await asyncio.to_thread(save_loi, loi_file, current_user.id)
+    try:
+        result = await generate_lease_for_loi(loi, template, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Could not generate lease: {str(e)}")
 
     return {
         "message": "Lease generated successfully.",
-        "lease_path": lease_path,
-        "metadata": metadata
+        "loi_file_id": loi["loi_file_id"],
+        "lease_revision": result["lease_revision"],
+        "metadata": result["metadata"]
     }
+
+
+# ========== 5️⃣ Batch: many LOIs + one Template → zip of Leases ==========
+@router.post("/generate-lease/batch")
+async def generate_leases_from_template(
+    template_file_id: str = Form(...),
+    loi_files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Generate a lease for every uploaded LOI from one template; streams a zip with a manifest.json."""
+    template_file = db.query(StandaloneFile).filter(
+        StandaloneFile.file_id == template_file_id,
+        StandaloneFile.user_id == current_user.id,
+        StandaloneFile.category == "template"
+    ).first()
+
+    if not template_file:
+        raise HTTPException(status_code=404, detail="Template file not found.")
+
+    return await generate_leases_batch(loi_files, await template_registry.aget(template_file), current_user)
@@ -29,3 +29,9 @@ class ListFilesResponse(BaseModel):
     user_email: str
     building_id: Optional[int] = None
     category: Optional[str] = None
+
+class AskQuestionsBatchRequest(BaseModel):
+    session_id: str
+    questions: List[str]
+    category: str
+    building_id: Optional[int] = None
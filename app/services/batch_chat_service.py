@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.config import BATCH_GENERATION_CONCURRENCY, MAX_BATCH_QUESTIONS, google_api_key
+from app.crud.user_chatbot_crud import is_foreign_chat_session, save_chat_history_batch
+from app.database.db import SessionLocal
+from app.services.conversation_memory import get_cached_session_memory
+from app.services.retrieval_service import retrieve_chunks
+from app.services.user_chatbot_service import answer_from_matches, retrieval_confidence
+from app.utils.process_file import get_embedding
+
+logger = logging.getLogger(__name__)
+
+
+def _is_foreign_session(session_id: str, user_id: int, company_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return is_foreign_chat_session(db, session_id, user_id, company_id)
+    finally:
+        db.close()
+
+
+async def ask_batch_service(req, current_user):
+    """
+    Answer many questions about one building/category at once. All questions are
+    embedded in one call, vector queries run concurrently and generation is
+    bounded by BATCH_GENERATION_CONCURRENCY. Answers stream back as NDJSON in
+    completion order; every Q/A pair is saved to ChatHistory in one transaction.
+    """
+    if not google_api_key:
+        raise HTTPException(500, "Google API key missing")
+
+    questions = [q.strip() for q in req.questions if q and q.strip()]
+    if not questions:
+        raise HTTPException(400, "At least one question is required")
+    if len(questions) > MAX_BATCH_QUESTIONS:
+        raise HTTPException(400, f"A batch can contain at most {MAX_BATCH_QUESTIONS} questions")
+
+    start_time = time.time()
+    company_id = current_user.company_id
+    if await asyncio.to_thread(_is_foreign_session, req.session_id, current_user.id, company_id):
+        raise HTTPException(status_code=404, detail="Chat session not found or you do not have access")
+    filter_metadata = {"category": req.category, "company_id": str(company_id)}
+    if req.building_id:
+        filter_metadata["building_id"] = str(req.building_id)
+
+    try:
+        embeddings = await get_embedding(questions, google_api_key)
+        results = await asyncio.gather(*[
+            retrieve_chunks(question, emb, filter_metadata, company_id)
+            for question, emb in zip(questions, embeddings)
+        ])
+    except Exception as e:
+        logger.error(f"Batch retrieval failed: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve information from files")
+
+    retrieval_time = time.time() - start_time
+    semaphore = asyncio.Semaphore(BATCH_GENERATION_CONCURRENCY)
+
+    async def answer(position: int):
+        question, result = questions[position], results[position]
+        async with semaphore:
+            item_start = time.time()
+            if not result["matches"]:
+                answer_text, confidence, prompt_tokens = "Information not available in documents", 0.0, None
+            else:
+                try:
+                    generated = await answer_from_matches(question, result["matches"])
+                    answer_text, prompt_tokens = generated["answer"], generated["prompt_tokens"]
+                    confidence = retrieval_confidence(result)
+                except Exception as e:
+                    logger.error(f"Failed to answer batch question {position}: {str(e)}")
+                    answer_text, confidence, prompt_tokens = "Failed to generate an answer", 0.0, None
+        response_time = round(retrieval_time + time.time() - item_start, 3)
+        return {
+            "index": position,
+            "question": question,
+            "answer": answer_text,
+            "confidence": confidence,
+            "response_time": response_time,
+            "prompt_tokens": prompt_tokens,
+        }
+
+    async def stream():
+        turns = []
+        for next_done in asyncio.as_completed([answer(i) for i in range(len(questions))]):
+            item = await next_done
+            turns.append(item)
+            yield json.dumps(item) + "\n"
+
+        turns.sort(key=lambda t: t["index"])
+        db = SessionLocal()
+        try:
+            save_chat_history_batch(
+                db,
+                session_id=req.session_id,
+                user_id=current_user.id,
+                company_id=company_id,
+                category=req.category,
+                building_id=req.building_id,
+                turns=[
+                    {
+                        "question": t["question"],
+                        "answer": t["answer"],
+                        "response_time": t["response_time"],
+                        "confidence": t["confidence"],
+                        "timestamp": datetime.utcnow(),
+                        "response_json": {
+                            "query_type": "specific",
+                            "answer": t["answer"],
+                            "confidence": t["confidence"],
+                            "prompt_tokens": t["prompt_tokens"],
+                            "batch": True,
+                        },
+                    }
+                    for t in turns
+                ],
+            )
+        except Exception as e:
+            logger.error(f"Failed to save batch chat history for session {req.session_id}: {str(e)}")
+            yield json.dumps({"error": "Failed to save chat history"}) + "\n"
+        else:
+            memory = get_cached_session_memory(req.session_id, current_user.id)
+            if memory is not None:
+                for t in turns:
+                    memory.add_turn(t["question"], t["answer"])
+        finally:
+            db.close()
+
+        yield json.dumps({"done": True, "total": len(turns), "elapsed": round(time.time() - start_time, 3)}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.config import (
+    CHAT_WRITE_BEHIND,
+    CHAT_WRITER_BATCH_SIZE,
+    CHAT_WRITER_FLUSH_INTERVAL,
+    CHAT_WRITER_MAX_RETRIES,
+    CHAT_WRITER_RETRY_BACKOFF,
+)
+from app.crud.user_chatbot_crud import save_chat_turn
+from app.database.db import SessionLocal
+from app.models.models import ChatHistory, ChatSession
+
+logger = logging.getLogger(__name__)
+
+
+class ChatHistoryWriter:
+    """
+    In-process write-behind queue for chat turns. Turns are collected for up to
+    CHAT_WRITER_FLUSH_INTERVAL seconds (or CHAT_WRITER_BATCH_SIZE turns) and
+    written with one session upsert and one executemany insert per batch.
+    A failed batch is retried with backoff, then written turn by turn so one
+    bad row cannot take the rest of the batch with it.
+    `stop()` drains the queue, so a graceful shutdown loses nothing.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = CHAT_WRITER_BATCH_SIZE,
+        flush_interval: float = CHAT_WRITER_FLUSH_INTERVAL,
+        max_retries: int = CHAT_WRITER_MAX_RETRIES,
+        retry_backoff: float = CHAT_WRITER_RETRY_BACKOFF,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info("Chat history writer started")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        await self.queue.put(None)
+        await self._task
+        logger.info("Chat history writer stopped")
+
+    def enqueue(self, turn: dict) -> None:
+        self.queue.put_nowait(turn)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            batch = []
+            item = await self.queue.get()
+            if item is None:
+                stopping = True
+            else:
+                batch.append(item)
+                deadline = loop.time() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+            if stopping:
+                while not self.queue.empty():
+                    item = self.queue.get_nowait()
+                    if item is not None:
+                        batch.append(item)
+
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: List[dict]) -> None:
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            try:
+                await loop.run_in_executor(None, write_turns, batch)
+                return
+            except Exception as e:
+                logger.warning(f"Failed to flush {len(batch)} chat turns (attempt {attempt + 1}): {str(e)}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+
+        dropped = []
+        for turn in batch:
+            try:
+                await loop.run_in_executor(None, write_turns, [turn])
+            except Exception as e:
+                logger.error(f"Failed to write chat turn for session {turn['chat_session_id']}: {str(e)}")
+                dropped.append(turn)
+        if dropped:
+            logger.error(
+                f"Dropped {len(dropped)} of {len(batch)} chat turns: "
+                + ", ".join(f"{turn['chat_session_id']}@{turn['timestamp'].isoformat()}" for turn in dropped)
+            )
+
+
+def write_turns(turns: List[dict]) -> None:
+    """
+    Upsert the sessions referenced by `turns` and insert all history rows in one
+    transaction. Turns whose session belongs to a different user or company are
+    skipped.
+    """
+    db = SessionLocal()
+    try:
+        sessions = {}
+        for turn in turns:
+            sessions.setdefault(turn["chat_session_id"], {
+                "id": turn["chat_session_id"],
+                "user_id": turn["user_id"],
+                "company_id": turn["company_id"],
+                "category": turn.get("category"),
+                "building_id": turn.get("building_id"),
+                "created_at": turn["timestamp"],
+            })
+
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(pg_insert(ChatSession).on_conflict_do_nothing(index_elements=["id"]), list(sessions.values()))
+        else:
+            existing = set(db.execute(select(ChatSession.id).where(ChatSession.id.in_(sessions))).scalars())
+            missing = [row for session_id, row in sessions.items() if session_id not in existing]
+            if missing:
+                db.execute(insert(ChatSession), missing)
+
+        # a session id that already belongs to another user or company is never written to
+        owners = {
+            session_id: (user_id, company_id)
+            for session_id, user_id, company_id in db.execute(
+                select(ChatSession.id, ChatSession.user_id, ChatSession.company_id).where(ChatSession.id.in_(sessions))
+            )
+        }
+        owned, foreign = [], set()
+        for turn in turns:
+            if owners.get(turn["chat_session_id"]) == (turn["user_id"], turn["company_id"]):
+                owned.append(turn)
+            else:
+                foreign.add(turn["chat_session_id"])
+        if foreign:
+            logger.warning(f"Skipped {len(turns) - len(owned)} chat turns for sessions owned by another user: {sorted(foreign)}")
+
+        history_columns = {c.name for c in ChatHistory.__table__.columns}
+        if owned:
+            db.execute(insert(ChatHistory), [{k: v for k, v in t.items() if k in history_columns} for t in owned])
+        db.commit()
+        logger.info(f"Flushed {len(owned)} chat turns for {len(sessions)} sessions")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+chat_writer = ChatHistoryWriter()
+
+
+def persist_chat_turn(
+    db,
+    session_id: str,
+    user_id: int,
+    company_id: int,
+    question: str,
+    answer: str,
+    category: Optional[str] = None,
+    building_id: Optional[int] = None,
+    response_json: Optional[dict] = None,
+    response_time: Optional[float] = None,
+    confidence: Optional[float] = None
+) -> None:
+    """Hand the turn to the write-behind queue, or write it in one transaction when the queue is off."""
+    timestamp = datetime.utcnow()
+    if CHAT_WRITE_BEHIND and chat_writer.running:
+        chat_writer.enqueue({
+            "chat_session_id": session_id,
+            "user_id": user_id,
+            "company_id": company_id,
+            "category": category,
+            "building_id": building_id,
+            "question": question,
+            "answer": answer,
+            "file_id": None,
+            "response_json": response_json,
+            "response_time": response_time,
+            "confidence": confidence,
+            "timestamp": timestamp,
+        })
+        return
+
+    save_chat_turn(
+        db,
+        session_id=session_id,
+        user_id=user_id,
+        company_id=company_id,
+        category=category,
+        building_id=building_id,
+        question=question,
+        answer=answer,
+        response_json=response_json,
+        response_time=response_time,
+        confidence=confidence,
+        timestamp=timestamp,
+    )
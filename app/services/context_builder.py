@@ -0,0 +1,120 @@
+import logging
+from functools import lru_cache
+from typing import List
+
+import tiktoken
+
+from app.config import CHUNK_OVERLAP, CONTEXT_TOKEN_BUDGET, MMR_LAMBDA
+from app.utils.lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    return len(_encoding().encode(text))
+
+
+def _strip_overlap(previous: str, following: str, max_overlap: int = CHUNK_OVERLAP) -> str:
+    """Drop the prefix of `following` that repeats the tail of `previous`."""
+    for size in range(min(max_overlap, len(previous), len(following)), 0, -1):
+        if previous.endswith(following[:size]):
+            return following[size:]
+    return following
+
+
+def _relevance(match: dict) -> float:
+    return match.get("rrf_score", match.get("score", 0.0))
+
+
+def merge_adjacent_chunks(matches: List[dict]) -> List[dict]:
+    """
+    Group matches by file and join runs of consecutive chunk_index values into
+    one passage, removing the repeated overlap between neighbours.
+    """
+    by_file = {}
+    passages = []
+    for match in matches:
+        metadata = match["metadata"]
+        if metadata.get("chunk_index") is None:
+            passages.append({"text": metadata["chunk"], "relevance": _relevance(match), "file_id": metadata.get("file_id")})
+            continue
+        by_file.setdefault(metadata.get("file_id"), []).append(match)
+
+    for file_id, file_matches in by_file.items():
+        file_matches.sort(key=lambda m: int(m["metadata"]["chunk_index"]))
+        current = None
+        for match in file_matches:
+            chunk_index = int(match["metadata"]["chunk_index"])
+            chunk = match["metadata"]["chunk"]
+            if current and chunk_index == current["end"]:
+                continue
+            if current and chunk_index == current["end"] + 1:
+                current["text"] += _strip_overlap(current["text"], chunk)
+                current["end"] = chunk_index
+                current["relevance"] = max(current["relevance"], _relevance(match))
+            else:
+                if current:
+                    passages.append(current)
+                current = {"text": chunk, "relevance": _relevance(match), "file_id": file_id, "start": chunk_index, "end": chunk_index}
+        if current:
+            passages.append(current)
+
+    return passages
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def mmr_order(passages: List[dict], lambda_: float = MMR_LAMBDA) -> List[dict]:
+    """Order passages by maximal marginal relevance, using token-set overlap as similarity."""
+    if not passages:
+        return []
+
+    top = max(p["relevance"] for p in passages) or 1.0
+    token_sets = [set(tokenize(p["text"])) for p in passages]
+    remaining = list(range(len(passages)))
+    selected = []
+
+    while remaining:
+        def mmr_score(i):
+            redundancy = max((_jaccard(token_sets[i], token_sets[j]) for j in selected), default=0.0)
+            return lambda_ * passages[i]["relevance"] / top - (1 - lambda_) * redundancy
+
+        best = max(remaining, key=mmr_score)
+        selected.append(best)
+        remaining.remove(best)
+
+    return [passages[i] for i in selected]
+
+
+def build_context(matches: List[dict], token_budget: int = CONTEXT_TOKEN_BUDGET) -> dict:
+    """
+    Merge adjacent chunks, order them by MMR and pack as many passages as fit in
+    `token_budget`. The first passage is truncated rather than dropped.
+    """
+    passages = mmr_order(merge_adjacent_chunks(matches))
+
+    packed = []
+    used = 0
+    separator_tokens = count_tokens("\n\n")
+    for passage in passages:
+        tokens = count_tokens(passage["text"])
+        cost = tokens + (separator_tokens if packed else 0)
+        if used + cost <= token_budget:
+            packed.append(passage["text"])
+            used += cost
+        elif not packed:
+            truncated = _encoding().decode(_encoding().encode(passage["text"])[:token_budget])
+            packed.append(truncated)
+            used = token_budget
+
+    logger.info(f"Packed {len(packed)}/{len(passages)} passages from {len(matches)} chunks into {used} tokens")
+    return {"context": "\n\n".join(packed), "context_tokens": used, "passages": len(packed)}
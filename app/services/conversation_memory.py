@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import (
+    MEMORY_CACHE_SIZE,
+    MEMORY_MAX_TURNS,
+    MEMORY_SUMMARY_TOKENS,
+    MEMORY_TOKEN_BUDGET,
+    MEMORY_TTL_SECONDS,
+)
+from app.models.models import ChatHistory
+from app.services.context_builder import count_tokens, _encoding
+from app.services.prompts import summarize_memory_prompt
+from app.utils.llm_client import llm_gateway
+
+logger = logging.getLogger(__name__)
+
+
+def _truncate_tokens(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    tokens = _encoding().encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    tokens = tokens[-max_tokens:] if keep_end else tokens[:max_tokens]
+    return _encoding().decode(tokens)
+
+
+class ConversationMemory:
+    """
+    Last `max_turns` question/answer pairs of a chat session plus a running
+    summary of everything older. Turns pushed out of the window are folded into
+    the summary in the background.
+    """
+
+    def __init__(self, session_id: str, user_id: Optional[int] = None, max_turns: int = MEMORY_MAX_TURNS):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.turns = deque()
+        self.max_turns = max_turns
+        self.summary = ""
+        self.pending = []
+        self.touched_at = time.monotonic()
+        self._summary_task: Optional[asyncio.Task] = None
+
+    def is_empty(self) -> bool:
+        return not self.turns and not self.summary and not self.pending
+
+    def add_turn(self, question: str, answer: str) -> None:
+        self.turns.append((question, answer or ""))
+        while len(self.turns) > self.max_turns:
+            self.pending.append(self.turns.popleft())
+        self.touched_at = time.monotonic()
+        if self.pending:
+            self._schedule_summary()
+
+    def _schedule_summary(self) -> None:
+        if self._summary_task and not self._summary_task.done():
+            return
+        try:
+            self._summary_task = asyncio.get_running_loop().create_task(self._fold_pending())
+        except RuntimeError:
+            pass
+
+    async def _fold_pending(self) -> None:
+        while self.pending:
+            evicted, self.pending = self.pending, []
+            transcript = "\n".join(f"User: {q}\nAssistant: {a}" for q, a in evicted)
+            try:
+                response = await llm_gateway.ainvoke(summarize_memory_prompt.format(
+                    summary=self.summary or "(none)",
+                    transcript=_truncate_tokens(transcript, MEMORY_TOKEN_BUDGET),
+                    max_tokens=MEMORY_SUMMARY_TOKENS,
+                ))
+                self.summary = _truncate_tokens(response.content.strip(), MEMORY_SUMMARY_TOKENS, keep_end=True)
+            except Exception as e:
+                logger.error(f"Failed to update memory summary for session {self.session_id}: {e}")
+                self.pending = evicted + self.pending
+                return
+
+    def render(self, token_budget: int = MEMORY_TOKEN_BUDGET) -> str:
+        """Summary plus the most recent turns, newest kept first when over budget."""
+        parts = []
+        used = 0
+        if self.summary:
+            header = f"Summary of earlier conversation: {self.summary}"
+            used = count_tokens(header)
+            parts.append(header)
+
+        recent = []
+        for question, answer in reversed(self.turns):
+            turn = f"User: {question}\nAssistant: {_truncate_tokens(answer, 200)}"
+            tokens = count_tokens(turn)
+            if used + tokens > token_budget:
+                break
+            recent.append(turn)
+            used += tokens
+
+        return "\n".join(parts + list(reversed(recent)))
+
+
+# keyed by (user_id, session_id): a session id alone must never reveal another user's conversation
+_memories: "OrderedDict[tuple, ConversationMemory]" = OrderedDict()
+
+
+def _evict_stale() -> None:
+    now = time.monotonic()
+    for key in [key for key, m in _memories.items() if now - m.touched_at > MEMORY_TTL_SECONDS]:
+        del _memories[key]
+    while len(_memories) > MEMORY_CACHE_SIZE:
+        _memories.popitem(last=False)
+
+
+def get_session_memory(db: Session, session_id: str, user_id: int) -> ConversationMemory:
+    """Return the user's cached memory for a session, loading it from ChatHistory on a miss."""
+    key = (user_id, session_id)
+    memory = _memories.get(key)
+    if memory is not None:
+        _memories.move_to_end(key)
+        memory.touched_at = time.monotonic()
+        return memory
+
+    rows = (
+        db.query(ChatHistory.question, ChatHistory.answer)
+        .filter(ChatHistory.chat_session_id == session_id, ChatHistory.user_id == user_id)
+        .order_by(ChatHistory.timestamp.desc())
+        .limit(MEMORY_MAX_TURNS * 3)
+        .all()
+    )
+
+    memory = ConversationMemory(session_id, user_id)
+    for question, answer in reversed(rows):
+        memory.add_turn(question, answer)
+
+    _memories[key] = memory
+    _evict_stale()
+    return memory
+
+
+def get_cached_session_memory(session_id: str, user_id: int) -> Optional[ConversationMemory]:
+    """Cached memory only; callers that already persisted their turns use this to avoid a reload."""
+    return _memories.get((user_id, session_id))
+
+
+def drop_session_memory(session_id: str, user_id: int) -> None:
+    _memories.pop((user_id, session_id), None)
@@ -1,13 +1,18 @@
+import asyncio
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from fastapi.responses import JSONResponse
 
-from app.crud.dashborad import get_activity_summary_data, get_analytics_data, get_rag_metrics_data, get_recent_questions_data, get_stats_data, get_usage_trends_data
+from app.crud.dashborad import get_activity_summary_data, get_analytics_data, get_chat_timings_data, get_rag_metrics_data, get_recent_questions_data, get_stats_data, get_usage_trends_data
 import json
 import re
+import numpy as np
 
 from dotenv import load_dotenv
-from app.utils.llm_client import llm
+from app.config import LATENCY_BREAKDOWN_MAX_ROWS
+from app.utils.llm_client import llm_gateway
+from app.services import session_retrieval_cache
+from app.services.placeholder_mapping import mapping_cache_stats
 from app.services.prompts import get_ai_insights_prompt, get_recent_questions_prompt, get_usage_trends_prompt
 
 
@@ -39,12 +44,15 @@ def get_recent_questions_service(db: Session, company_id: int):
 
 
 
-def get_ai_insights_service(db, company_id: int):
-    analytics_data = get_analytics_data(db, company_id, datetime.utcnow() - timedelta(days=7))
+# The DB reads below are synchronous SQLAlchemy; they run in a worker thread so
+# only the LLM call is awaited on the event loop.
+
+async def get_ai_insights_service(db, company_id: int):
+    analytics_data = await asyncio.to_thread(get_analytics_data, db, company_id, datetime.utcnow() - timedelta(days=7))
     prompt = get_ai_insights_prompt(analytics_data)
     response = None
     try:
-        response = llm.invoke(prompt)
+        response = await llm_gateway.ainvoke(prompt)
         insights = json.loads(response.content)
     except Exception as e:
         print(f"AI Insights error: {e}")
@@ -52,10 +60,10 @@ def get_ai_insights_service(db, company_id: int):
     return insights
 
 
-def get_usage_trends_service(db, company_id: int, days: int):
+async def get_usage_trends_service(db, company_id: int, days: int):
     start_date = datetime.utcnow().date() - timedelta(days=days - 1)
-    daily_login_activity = get_usage_trends_data(db, company_id, start_date, days)
-    analytics_data = get_analytics_data(db, company_id, datetime.utcnow() - timedelta(days=days))
+    daily_login_activity = await asyncio.to_thread(get_usage_trends_data, db, company_id, start_date, days)
+    analytics_data = await asyncio.to_thread(get_analytics_data, db, company_id, datetime.utcnow() - timedelta(days=days))
     activity_categories = {
         "chat_sessions": analytics_data["chat_sessions"],
         "active_users": analytics_data["active_users"],
@@ -64,7 +72,7 @@ def get_usage_trends_service(db, company_id: int, days: int):
     }
     prompt = get_usage_trends_prompt(daily_login_activity, activity_categories)
     try:
-        response = llm.invoke(prompt)
+        response = await llm_gateway.ainvoke(prompt)
         response_text = getattr(response, "content", "").strip()
         if response_text.startswith("```"):
             response_text = response_text.strip("`")
@@ -79,14 +87,59 @@ def get_usage_trends_service(db, company_id: int, days: int):
         "ai_insights": ai_insights
     })
 
-def get_recent_questions_ai_service(db, company_id: int):
-    question_texts = get_recent_questions_data(db, company_id)
+async def get_recent_questions_ai_service(db, company_id: int):
+    question_texts = await asyncio.to_thread(get_recent_questions_data, db, company_id)
     prompt = get_recent_questions_prompt(question_texts)
     try:
-        response = llm.invoke(prompt)
+        response = await llm_gateway.ainvoke(prompt)
         response_text = getattr(response, "content", "").strip()
         response_text = re.sub(r"^```json|```$", "", response_text, flags=re.MULTILINE).strip()
         summary = json.loads(response_text)
     except:
         summary = {"summary": "AI parsing failed", "questions": question_texts}
-    return JSONResponse(content={"recent_questions": summary})
\ No newline at end of file
+    return JSONResponse(content={"recent_questions": summary})
+
+def get_latency_breakdown_service(db: Session, company_id: int, days: int):
+    """
+    p50/p95/p99 per pipeline stage (ms) over the company's chat turns of the last
+    `days` days, sampled to the newest LATENCY_BREAKDOWN_MAX_ROWS turns.
+    """
+    rows = get_chat_timings_data(db, company_id, datetime.utcnow() - timedelta(days=days), LATENCY_BREAKDOWN_MAX_ROWS)
+
+    stages = {}
+    tokens = {"prompt_tokens": [], "completion_tokens": []}
+    cache_hits = {}
+    for response_time, timings, usage, turn_cache_hits in rows:
+        timings = timings or {}
+        if not timings and response_time is not None:
+            timings = {"total": response_time * 1000}
+        for stage, ms in timings.items():
+            stages.setdefault(stage, []).append(ms)
+        for key in tokens:
+            value = (usage or {}).get(key)
+            if value:
+                tokens[key].append(value)
+        for cache, hit in (turn_cache_hits or {}).items():
+            counts = cache_hits.setdefault(cache, {"hits": 0, "lookups": 0})
+            counts["lookups"] += 1
+            counts["hits"] += int(bool(hit))
+
+    def percentiles(values):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {"count": len(values), "p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2)}
+
+    return {
+        "company_id": company_id,
+        "days": days,
+        "turns": len(rows),
+        "sampled": len(rows) >= LATENCY_BREAKDOWN_MAX_ROWS,
+        "stages_ms": {stage: percentiles(values) for stage, values in sorted(stages.items())},
+        "tokens": {key: percentiles(values) for key, values in tokens.items() if values},
+        "cache_hit_rate": {
+            cache: round(c["hits"] / c["lookups"], 4) for cache, c in cache_hits.items() if c["lookups"]
+        },
+        "coalesced_requests": cache_hits.get("coalesced", {}).get("hits", 0),
+        "session_retrieval_cache": session_retrieval_cache.stats(),
+        "placeholder_mapping_cache": mapping_cache_stats(),
+        "llm_gateway": llm_gateway.stats(),
+    }
@@ -1,29 +1,29 @@
 
 import logging
-import os
 import json
 import re
-from typing import Dict, Any
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from app.crud.user_chatbot_crud import get_standalone_file
 from app.models.models import StandaloneFile, User
 from datetime import datetime
-from google.generativeai import GenerativeModel
+from app.utils.llm_client import llm_gateway
+from app.config import METADATA_EXTRACTION_MODE, METADATA_SECTION_CHARS
+from app.services.lease_store import lease_store
+from app.services.lease_template_engine import compile_template
+from app.services.metadata_extraction import extract_metadata_chunked, parse_metadata_json
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
 with open("app/services/templates/lease_template.txt", "r", encoding="utf-8") as f:
     LEASE_TEMPLATE = f.read()
+COMPILED_LEASE_TEMPLATE = compile_template(LEASE_TEMPLATE)
 
-def save_lease_file(content: str, company_id: str, category: str, file_id: str) -> str:
+def save_lease_file(content: str, company_id: str, category: str, file_id: str, note: str = "") -> dict:
+    """Store `content` as the newest revision of the lease; returns that revision's entry (rev, sha, ...)."""
     try:
-        file_path = f"uploads/{company_id}/{category}/{file_id}.txt"
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(content)
-        return file_path
+        return lease_store.commit(company_id, category, file_id, content, note=note)
     except Exception as e:
         logger.error(f"Error saving lease file {file_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to save lease file: {str(e)}")
@@ -34,8 +34,7 @@ def format_lease_text(raw_text: str) -> str:
     text = text.replace('\t', '    ')
     return text.strip()
 
-# from typing import Dict, Any
-
+# 
 # def generate_lease_text(metadata: Dict[str, Any]) -> str:
 #     lease_text = LEASE_TEMPLATE
 #     try:
@@ -61,61 +60,6 @@ def format_lease_text(raw_text: str) -> str:
 #         lease_text = lease_text.replace("[ERROR]", f"Error processing metadata: {e}")
 #     return lease_text
 
-import json
-from typing import Dict, Any
-from google import genai
-
-client = genai.Client()
-
-def generate_lease_text(metadata: Dict[str, Any]) -> str:
-    lease_text = LEASE_TEMPLATE
-    try:
-        prompt = f"""
-        You are an expert in lease document automation.
-        Analyze the following lease template and metadata, and determine which metadata keys should replace which placeholders.
-        Use your best judgment based on context (e.g., names, dates, addresses, terms).
-
-        Template:
-        {LEASE_TEMPLATE}
-
-        Metadata:
-        {metadata}
-
-        Return only a valid JSON mapping of placeholder to value. Example:
-        {{
-          "[TENANT_NAME]": "John Smith",
-          "[LANDLORD_NAME]": "ABC Properties",
-          "[PROPERTY_ADDRESS]": "123 Main St, New York"
-        }}
-        """
-
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt
-        )
-
-        raw_text = response.text.strip()
-
-        # ✅ Remove Markdown code fences if present
-        if raw_text.startswith("```"):
-            raw_text = raw_text.strip("`")
-            raw_text = raw_text.replace("json", "", 1).strip()
-
-        # ✅ Safely parse JSON
-        try:
-            replacements = json.loads(raw_text)
-        except Exception as json_error:
-            print("Raw response from Gemini:", raw_text)
-            raise ValueError(f"Gemini returned invalid JSON: {json_error}")
-
-        for placeholder, value in replacements.items():
-            lease_text = lease_text.replace(placeholder, str(value or "N/A"))
-
-        return lease_text
-
-    except Exception as e:
-        return f"Error processing lease template with metadata: {e}"
-
 def format_lease_text(lease_text: str) -> str:
     """Ensure consistent formatting of the lease text."""
     # Remove extra newlines and ensure single spacing
@@ -166,9 +110,23 @@ async def list_category_files_service(current_user: User, db: Session, category:
         "total_files": len(result),
     }
 
-def extract_structured_metadata_with_llm(extracted_text: str) -> dict:
+async def extract_structured_metadata_with_llm(extracted_text: str) -> dict:
+    """
+    Lease metadata as a JSON-ready dict ({} on failure). Documents longer than
+    one METADATA_SECTION_CHARS section are extracted section by section
+    concurrently and merged (METADATA_EXTRACTION_MODE=auto); "single" always
+    sends the whole text in one prompt.
+    """
+    if METADATA_EXTRACTION_MODE == "chunked" or (
+        METADATA_EXTRACTION_MODE == "auto" and len(extracted_text or "") > METADATA_SECTION_CHARS
+    ):
+        try:
+            return await extract_metadata_chunked(extracted_text)
+        except Exception as e:
+            logger.error(f"Chunked LLM extraction failed: {str(e)}")
+            return {}
+
     try:
-        model = GenerativeModel("gemini-2.0-flash")
         prompt = f"""
                     You are an AI legal document assistant. A user has uploaded a lease-related document 
                     (e.g., Letter of Intent, lease agreement, or rental contract). 
@@ -195,20 +153,9 @@ def extract_structured_metadata_with_llm(extracted_text: str) -> dict:
             Document Text: {extracted_text}
             """
           
-        response = model.generate_content(prompt)
+        response = await llm_gateway.ainvoke(prompt)
        
-        text = response.text.strip()
-        print(text)
-        json_match = re.search(r"\{.*\}", text, re.DOTALL)
-        if json_match:
-            try:
-                metadata = json.loads(json_match.group())
-                if isinstance(metadata, dict):
-                    return metadata
-            except json.JSONDecodeError:
-                logger.error("LLM returned malformed JSON")
-        logger.error(f"LLM did not return valid JSON, response: {text[:500]}")
-        return {}
+        return parse_metadata_json(response.content.strip())
     except Exception as e:
         logger.error(f"LLM extraction failed: {str(e)}")
         return {}
@@ -0,0 +1,148 @@
+import asyncio
+import io
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+import zipfile
+from typing import List
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.config import LEASE_BATCH_CONCURRENCY, LEASE_BATCH_MAX_FILES
+from app.services.gen_lease_services import extract_structured_metadata_with_llm, save_lease_file
+from app.services.lease_template_engine import CompiledTemplate
+from app.services.placeholder_mapping import mapping_cache_stats, resolve_placeholders
+from app.utils.process_file import extract_text_from_file, extract_text_from_file_using_llm
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "uploads"
+LOI_EXTENSIONS = {".pdf", ".docx", ".txt"}
+
+
+def save_loi(upload_file, user_id: int) -> dict:
+    ext = os.path.splitext(upload_file.filename)[1].lower()
+    if ext not in LOI_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported LOI file type: {upload_file.filename}")
+    loi_folder = os.path.join(UPLOAD_DIR, f"user_{user_id}", "loi")
+    os.makedirs(loi_folder, exist_ok=True)
+    loi_file_id = str(uuid.uuid4())
+    loi_path = os.path.join(loi_folder, f"{loi_file_id}{ext}")
+    with open(loi_path, "wb") as buffer:
+        shutil.copyfileobj(upload_file.file, buffer)
+    return {"loi_file_id": loi_file_id, "file_name": upload_file.filename, "path": loi_path}
+
+
+async def extract_loi_text(loi_path: str) -> str:
+    """Local text extraction first (no LLM); scanned or image-only files go through the LLM."""
+    try:
+        return await asyncio.to_thread(extract_text_from_file, loi_path)
+    except Exception as e:
+        if not loi_path.lower().endswith(".pdf"):
+            raise
+        logger.info(f"Local extraction failed for {loi_path} ({e}), using LLM extraction")
+        return await extract_text_from_file_using_llm(loi_path)
+
+
+async def generate_lease_for_loi(loi: dict, template: CompiledTemplate, user_id: int) -> dict:
+    """LOI file -> text -> metadata -> lease rendered from `template`, saved under the user's leases."""
+    extracted_text = await extract_loi_text(loi["path"])
+    metadata = await extract_structured_metadata_with_llm(extracted_text)
+    if not metadata:
+        raise ValueError("No metadata extracted from LOI")
+    replacements = await resolve_placeholders(template, metadata)
+    lease_text = template.render(replacements)
+    revision = save_lease_file(lease_text, f"user_{user_id}", "leases", loi["loi_file_id"], note="generated")
+    return {
+        "lease_text": lease_text,
+        "lease_revision": {"rev": revision["rev"], "sha": revision["sha"]},
+        "metadata": metadata,
+    }
+
+
+class _ZipStream(io.RawIOBase):
+    """Write-only sink for ZipFile; `drain()` hands out what has been written since the last call."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+async def generate_leases_batch(loi_files: list, template: CompiledTemplate, current_user) -> StreamingResponse:
+    """
+    Generate one lease per LOI against one compiled template, at most
+    LEASE_BATCH_CONCURRENCY at a time. The zip is streamed as leases finish
+    (completion order); manifest.json at the end lists every LOI's outcome.
+    The LOIs are saved (in a worker thread) before the response starts, since
+    uploads are closed once the endpoint returns.
+    """
+    if not loi_files:
+        raise HTTPException(status_code=400, detail="At least one LOI file is required.")
+    if len(loi_files) > LEASE_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {LEASE_BATCH_MAX_FILES} LOI files.")
+
+    lois = await asyncio.to_thread(lambda: [save_loi(upload_file, current_user.id) for upload_file in loi_files])
+    semaphore = asyncio.Semaphore(LEASE_BATCH_CONCURRENCY)
+    start_time = time.time()
+
+    async def generate(position: int) -> dict:
+        loi = lois[position]
+        item = {"index": position, "file_name": loi["file_name"], "loi_file_id": loi["loi_file_id"]}
+        async with semaphore:
+            try:
+                item.update(await generate_lease_for_loi(loi, template, current_user.id))
+                item["status"] = "completed"
+            except Exception as e:
+                logger.error(f"Batch lease generation failed for {loi['file_name']}: {str(e)}")
+                item.update(status="failed", error=str(e))
+        return item
+
+    async def stream():
+        # a client disconnect closes this generator; the finally cancels the LOIs still in flight
+        tasks = [asyncio.ensure_future(generate(i)) for i in range(len(lois))]
+        try:
+            sink = _ZipStream()
+            manifest = []
+            with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+                for next_done in asyncio.as_completed(tasks):
+                    item = await next_done
+                    if item["status"] == "completed":
+                        stem = os.path.splitext(item["file_name"])[0]
+                        archive.writestr(f"{item['index'] + 1:03d}_{stem}_lease.txt", item.pop("lease_text"))
+                    manifest.append(item)
+                    yield sink.drain()
+
+                manifest.sort(key=lambda entry: entry["index"])
+                archive.writestr("manifest.json", json.dumps({
+                    "template_digest": template.digest,
+                    "total": len(manifest),
+                    "completed": sum(1 for entry in manifest if entry["status"] == "completed"),
+                    "elapsed": round(time.time() - start_time, 3),
+                    "placeholder_mapping_cache": mapping_cache_stats(),
+                    "leases": manifest,
+                }, indent=2, default=str))
+            yield sink.drain()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="leases_{int(start_time)}.zip"'},
+    )
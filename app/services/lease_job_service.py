@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from uuid import uuid4
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.config import (
+    LEASE_JOB_CONCURRENCY,
+    LEASE_JOB_MAX_ATTEMPTS,
+    LEASE_JOB_POLL_INTERVAL,
+    LEASE_JOB_STALE_SECONDS,
+)
+from app.database.db import SessionLocal
+from app.models.models import LeaseJob, StandaloneFile
+from app.services.gen_lease_services import extract_structured_metadata_with_llm, save_lease_file
+from app.services.lease_render_service import render_lease_for_file
+from app.utils.process_file import extract_text_from_file_using_llm, save_to_temp
+
+logger = logging.getLogger(__name__)
+
+# Stages in order; a job records the stage it is in, and the output of every
+# finished stage, so a retry picks up where the last attempt failed.
+STAGES = ("extract_text", "extract_metadata", "save_file", "generate_lease", "done")
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def job_payload(job: LeaseJob) -> dict:
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "stage": job.stage,
+        "stage_index": STAGES.index(job.stage) if job.stage in STAGES else None,
+        "stages": list(STAGES),
+        "file_id": job.file_id,
+        "lease_revision": job.lease_revision,
+        "original_file_name": job.original_file_name,
+        "category": job.category,
+        "error": job.error,
+        "attempts": job.attempts,
+        "retryable": job.status == "failed" and (job.attempts or 0) < LEASE_JOB_MAX_ATTEMPTS,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+
+def _set_stage(db: Session, job: LeaseJob, stage: str, **fields) -> None:
+    job.stage = stage
+    for name, value in fields.items():
+        setattr(job, name, value)
+    db.commit()
+    logger.info(f"Lease job {job.job_id} -> {stage}")
+
+
+def _remove_upload(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def _claimable():
+    """Jobs nobody is working on: queued ones, and running ones whose worker stopped updating them."""
+    stale_before = datetime.utcnow() - timedelta(seconds=LEASE_JOB_STALE_SECONDS)
+    return or_(LeaseJob.status == "queued", and_(LeaseJob.status == "running", LeaseJob.updated_at < stale_before))
+
+
+def _claim(db: Session, job_id: str) -> bool:
+    """Mark the job running in one conditional UPDATE; only one worker's update can match."""
+    claimed = (
+        db.query(LeaseJob)
+        .filter(LeaseJob.job_id == job_id, _claimable())
+        .update(
+            {
+                LeaseJob.status: "running",
+                LeaseJob.error: None,
+                LeaseJob.attempts: LeaseJob.attempts + 1,
+                LeaseJob.updated_at: datetime.utcnow(),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return claimed == 1
+
+
+async def _run_stages(db: Session, job: LeaseJob) -> None:
+    if job.stage == "extract_text":
+        if not job.upload_path or not os.path.exists(job.upload_path):
+            raise ValueError("Uploaded file is no longer available, please upload it again")
+        extracted_text = await extract_text_from_file_using_llm(job.upload_path)
+        # the text is the stage's output; retries never need the upload again
+        upload_path = job.upload_path
+        _set_stage(db, job, "extract_metadata", extracted_text=extracted_text, upload_path=None)
+        _remove_upload(upload_path)
+
+    if job.stage == "extract_metadata":
+        structured_metadata = await extract_structured_metadata_with_llm(job.extracted_text)
+        if not structured_metadata:
+            logger.warning(f"Lease job {job.job_id}: no metadata extracted, continuing with empty metadata")
+        _set_stage(db, job, "save_file", structured_metadata=json.dumps(structured_metadata or {}))
+
+    if job.stage == "save_file":
+        saved_file = StandaloneFile(
+            file_id=str(uuid4()),
+            original_file_name=job.original_file_name,
+            user_id=job.user_id,
+            category=job.category,
+            gcs_path="",
+            company_id=job.company_id,
+            uploaded_at=datetime.utcnow(),
+            structured_metadata=job.structured_metadata,
+        )
+        db.add(saved_file)
+        db.flush()
+        _set_stage(db, job, "generate_lease", file_id=saved_file.file_id)
+
+    if job.stage == "generate_lease":
+        lease_text = await render_lease_for_file(db, job.file_id, json.loads(job.structured_metadata))
+        revision = save_lease_file(
+            content=lease_text,
+            company_id=job.company_id,
+            category="lease_gen",
+            file_id=job.file_id,
+            note="generated",
+        )
+        _set_stage(db, job, "done", lease_revision=revision["rev"])
+
+
+class LeaseJobRunner:
+    """
+    Runs lease jobs as tasks on the app's event loop, at most
+    LEASE_JOB_CONCURRENCY at a time. Job state lives in the database, so jobs
+    interrupted by a restart are picked up again by `resume_unfinished()`.
+    A job is claimed with a conditional UPDATE before it runs, so with several
+    workers each job runs in one of them. Jobs cancelled by `stop()` go back to
+    queued; a job left running by a crashed worker is claimable again once it
+    has not been updated for LEASE_JOB_STALE_SECONDS.
+
+    Upload retention: the uploaded file is deleted as soon as its text has been
+    extracted. If extraction itself fails the file is kept for a retry, until
+    the job has failed LEASE_JOB_MAX_ATTEMPTS times; then it is deleted and the
+    job can no longer be retried.
+    """
+
+    def __init__(self, concurrency: int = LEASE_JOB_CONCURRENCY):
+        self.concurrency = concurrency
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, job_id: str) -> asyncio.Task:
+        task = self.tasks.get(job_id)
+        if task is None or task.done():
+            if self.semaphore is None:
+                self.semaphore = asyncio.Semaphore(self.concurrency)
+            task = asyncio.get_running_loop().create_task(self._run(job_id))
+            self.tasks[job_id] = task
+            task.add_done_callback(lambda _: self.tasks.pop(job_id, None))
+        return task
+
+    def resume_unfinished(self) -> int:
+        db = SessionLocal()
+        try:
+            job_ids = [job_id for (job_id,) in db.query(LeaseJob.job_id).filter(_claimable()).all()]
+        finally:
+            db.close()
+        for job_id in job_ids:
+            self.submit(job_id)
+        if job_ids:
+            logger.info(f"Resuming {len(job_ids)} unfinished lease jobs")
+        return len(job_ids)
+
+    async def stop(self) -> None:
+        """Cancel running jobs; they are queued again in the database and resume on the next start."""
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job_id: str) -> None:
+        async with self.semaphore:
+            db = SessionLocal()
+            try:
+                if not _claim(db, job_id):
+                    logger.info(f"Lease job {job_id} is finished or claimed by another worker, skipping")
+                    return
+                job = db.query(LeaseJob).filter_by(job_id=job_id).first()
+                try:
+                    await _run_stages(db, job)
+                except asyncio.CancelledError:
+                    db.rollback()
+                    job.status = "queued"
+                    db.commit()
+                    raise
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Lease job {job_id} failed at {job.stage}: {str(e)}")
+                    job.status, job.error = "failed", str(e)
+                    upload_path = None
+                    if job.attempts >= LEASE_JOB_MAX_ATTEMPTS:
+                        upload_path, job.upload_path = job.upload_path, None
+                    db.commit()
+                    _remove_upload(upload_path)
+                    return
+
+                job.status = "completed"
+                db.commit()
+            finally:
+                db.close()
+
+
+lease_job_runner = LeaseJobRunner()
+
+
+async def create_lease_job(db: Session, file, category: str, current_user) -> LeaseJob:
+    """Store the upload and queue a job for it."""
+    job_id = str(uuid4())
+    upload_path = await save_to_temp(file, job_id, current_user, category)
+    job = LeaseJob(
+        job_id=job_id,
+        user_id=current_user.id,
+        company_id=current_user.company_id,
+        category=category,
+        original_file_name=file.filename,
+        upload_path=upload_path,
+        status="queued",
+        stage=STAGES[0],
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    lease_job_runner.submit(job.job_id)
+    return job
+
+
+def get_lease_job(db: Session, job_id: str, current_user) -> LeaseJob:
+    job = db.query(LeaseJob).filter_by(job_id=job_id, user_id=current_user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Lease job not found")
+    return job
+
+
+def retry_lease_job(db: Session, job_id: str, current_user) -> LeaseJob:
+    job = get_lease_job(db, job_id, current_user)
+    if job.status != "failed":
+        raise HTTPException(status_code=409, detail=f"Only failed jobs can be retried (job is {job.status})")
+    if job.attempts >= LEASE_JOB_MAX_ATTEMPTS:
+        raise HTTPException(status_code=409, detail=f"Job failed {job.attempts} times and can no longer be retried")
+    job.status, job.error = "queued", None
+    db.commit()
+    db.refresh(job)
+    lease_job_runner.submit(job.job_id)
+    return job
+
+
+def stream_lease_job_events(job_id: str, current_user) -> StreamingResponse:
+    """Server-sent events: one `progress` event per status/stage change, until the job finishes."""
+    db = SessionLocal()
+    try:
+        get_lease_job(db, job_id, current_user)
+    finally:
+        db.close()
+
+    async def events():
+        last = None
+        while True:
+            db = SessionLocal()
+            try:
+                job = db.query(LeaseJob).filter_by(job_id=job_id).first()
+                payload = job_payload(job) if job else None
+            finally:
+                db.close()
+            if payload is None:
+                yield "event: error\ndata: {\"detail\": \"Lease job not found\"}\n\n"
+                return
+            state = (payload["status"], payload["stage"], payload["attempts"])
+            if state != last:
+                last = state
+                yield f"event: progress\ndata: {json.dumps(payload)}\n\n"
+            if payload["status"] in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(LEASE_JOB_POLL_INTERVAL)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
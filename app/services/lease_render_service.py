@@ -0,0 +1,100 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import LEASE_RENDER_CACHE_SIZE
+from app.models.models import LeaseRenderState
+from app.services.gen_lease_services import COMPILED_LEASE_TEMPLATE
+from app.services.lease_template_engine import CompiledTemplate
+from app.services.placeholder_mapping import flatten_metadata, map_placeholders, placeholder_key_mapping
+
+logger = logging.getLogger(__name__)
+
+# file_id -> (template digest, metadata values, filled segments) of the latest render
+_rendered: "OrderedDict[str, Tuple[str, Dict[str, str], List[str]]]" = OrderedDict()
+
+
+def _replacements(mapping: Dict[str, Optional[str]], values: Dict[str, str]) -> Dict[str, Optional[str]]:
+    return {placeholder: values.get(key) if key else None for placeholder, key in mapping.items()}
+
+
+def _remember(file_id: str, digest: str, values: Dict[str, str], parts: List[str]) -> None:
+    _rendered[file_id] = (digest, values, parts)
+    _rendered.move_to_end(file_id)
+    while len(_rendered) > LEASE_RENDER_CACHE_SIZE:
+        _rendered.popitem(last=False)
+
+
+def _save_state(db: Session, file_id: str, digest: str, mapping: dict, values: dict) -> None:
+    state = db.get(LeaseRenderState, file_id)
+    if state is None:
+        state = LeaseRenderState(file_id=file_id)
+        db.add(state)
+    state.template_digest = digest
+    state.mapping = mapping
+    state.metadata_values = values
+    db.commit()
+
+
+async def render_lease_for_file(
+    db: Session, file_id: str, metadata: dict, template: CompiledTemplate = COMPILED_LEASE_TEMPLATE
+) -> str:
+    """Full render of a file's lease; records which metadata key fed each placeholder."""
+    values = flatten_metadata(metadata or {})
+    mapping = await placeholder_key_mapping(template, values)
+    parts = template.fill(_replacements(mapping, values))
+    _save_state(db, file_id, template.digest, mapping, values)
+    _remember(file_id, template.digest, values, parts)
+    return "".join(parts)
+
+
+def patch_lease_for_file(
+    db: Session, file_id: str, metadata: dict, template: CompiledTemplate = COMPILED_LEASE_TEMPLATE
+) -> Optional[Tuple[str, List[str]]]:
+    """
+    Re-render only the placeholders whose metadata changed since the last render,
+    without calling the LLM. Keys that disappeared put their placeholders back
+    to the bracket text; placeholders nothing filled get a deterministic try with new keys.
+    Returns (lease text, changed placeholders), or None when the file has no
+    render state for this template.
+    """
+    state = db.get(LeaseRenderState, file_id)
+    if state is None or state.template_digest != template.digest:
+        return None
+
+    old, new = state.metadata_values or {}, flatten_metadata(metadata or {})
+    changed_keys = {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+    mapping = dict(state.mapping or {})
+    affected = {placeholder for placeholder, key in mapping.items() if key in changed_keys}
+    for placeholder, key in mapping.items():
+        if key and key not in new:
+            mapping[placeholder] = None
+
+    if changed_keys - old.keys():
+        found, _ = map_placeholders(template, new)
+        for placeholder in template.fields:
+            if not mapping.get(placeholder) and placeholder in found:
+                mapping[placeholder] = found[placeholder]
+                affected.add(placeholder)
+
+    cached = _rendered.get(file_id)
+    if cached and cached[0] == template.digest and cached[1] == old:
+        parts = list(cached[2])
+    else:
+        parts = template.fill(_replacements(state.mapping or {}, old))
+    template.fill({placeholder: new.get(mapping[placeholder]) if mapping[placeholder] else None for placeholder in affected}, parts)
+
+    _save_state(db, file_id, template.digest, mapping, new)
+    _remember(file_id, template.digest, new, parts)
+    logger.info(f"Lease {file_id}: re-rendered {len(affected)} placeholders for {len(changed_keys)} changed keys")
+    return "".join(parts), sorted(affected)
+
+
+async def regenerate_lease_for_file(db: Session, file_id: str, metadata: dict) -> Tuple[str, Optional[List[str]]]:
+    """Incremental re-render when possible, a full render otherwise; changed placeholders are None for full renders."""
+    patched = patch_lease_for_file(db, file_id, metadata)
+    if patched is not None:
+        return patched
+    return await render_lease_for_file(db, file_id, metadata), None
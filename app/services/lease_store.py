@@ -0,0 +1,287 @@
+import difflib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from app.config import LEASE_STORE_CACHE_SIZE, LEASE_STORE_DIR, LEASE_STORE_REBASE_RATIO
+
+logger = logging.getLogger(__name__)
+
+FULL, DELTA = b"F", b"D"
+
+
+def _sha(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _line_delta(base_lines: List[str], lines: List[str]) -> list:
+    """Ops rebuilding `lines` from `base_lines`: [start, end] copies a base slice, a list of strings inserts."""
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_lines, lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(lines[j1:j2])
+    return ops
+
+
+def _apply_delta(base_lines: List[str], ops: list) -> str:
+    parts = []
+    for op in ops:
+        if len(op) == 2 and isinstance(op[0], int):
+            parts.extend(base_lines[op[0]:op[1]])
+        else:
+            parts.extend(op)
+    return "".join(parts)
+
+
+class LeaseStore:
+    """
+    Versioned lease texts. Every revision is an object named by the sha256 of
+    its text (per document, so returning to an earlier text stores nothing
+    new); an object holds either the full text or a line delta against
+    the document's current base revision, zlib-compressed. A new full base is
+    written when a delta would exceed LEASE_STORE_REBASE_RATIO of a full copy,
+    so any revision is rebuilt from at most one base plus one delta.
+    Each document has a JSON manifest listing its revisions. Latest texts are
+    kept in an LRU of LEASE_STORE_CACHE_SIZE documents; a hit is checked against
+    the manifest's inode, mtime and size, so writes from other workers are
+    picked up. Manifest updates hold an exclusive lock file, so concurrent
+    commits from several processes do not lose revisions.
+    """
+
+    def __init__(self, root: str = LEASE_STORE_DIR, cache_size: int = LEASE_STORE_CACHE_SIZE):
+        self.root = root
+        self.cache_size = cache_size
+        self.latest: "OrderedDict[tuple, Tuple[tuple, str, str]]" = OrderedDict()  # doc -> (signature, sha, text)
+        self.lock = threading.RLock()
+        self.stats = {"reads": 0, "cache_hits": 0, "revisions": 0, "bytes_written": 0}
+
+    # ---- layout ----
+
+    def _doc_dir(self, company_id, category: str) -> str:
+        return os.path.join(self.root, str(company_id), category)
+
+    def manifest_path(self, company_id, category: str, file_id: str) -> str:
+        return os.path.join(self._doc_dir(company_id, category), f"{file_id}.json")
+
+    def _objects_dir(self, company_id, category: str, file_id: str) -> str:
+        return os.path.join(self._doc_dir(company_id, category), "objects", file_id)
+
+    def _object_path(self, company_id, category: str, file_id: str, sha: str) -> str:
+        return os.path.join(self._objects_dir(company_id, category, file_id), sha)
+
+    @staticmethod
+    def legacy_path(company_id, category: str, file_id: str) -> str:
+        """Where leases were written as plain text before revisions were stored."""
+        return f"uploads/{company_id}/{category}/{file_id}.txt"
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _manifest_lock(self, company_id, category: str, file_id: str):
+        """Exclusive cross-process lock on one document's manifest (on top of the in-process lock)."""
+        path = f"{self.manifest_path(company_id, category, file_id)}.lock"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.lock, open(path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _signature(self, company_id, category: str, file_id: str) -> Optional[tuple]:
+        """Identity of the document's current state on disk, or None when it does not exist."""
+        for path in (self.manifest_path(company_id, category, file_id), self.legacy_path(company_id, category, file_id)):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            return path, st.st_ino, st.st_mtime_ns, st.st_size
+        return None
+
+    def _load_manifest(self, company_id, category: str, file_id: str) -> Optional[dict]:
+        path = self.manifest_path(company_id, category, file_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    # ---- objects ----
+
+    def _read_object(self, company_id, category: str, file_id: str, sha: str) -> str:
+        with open(self._object_path(company_id, category, file_id, sha), "rb") as f:
+            data = f.read()
+        payload = zlib.decompress(data[1:])
+        if data[:1] == FULL:
+            return payload.decode("utf-8")
+        delta = json.loads(payload)
+        base_text = self._read_object(company_id, category, file_id, delta["base"])
+        return _apply_delta(base_text.splitlines(keepends=True), delta["ops"])
+
+    def _stored_object(self, company_id, category: str, file_id: str, sha: str):
+        """(kind, stored_bytes) of an object already on disk, or None."""
+        path = self._object_path(company_id, category, file_id, sha)
+        try:
+            with open(path, "rb") as f:
+                head = f.read(1)
+            return ("full" if head == FULL else "delta"), os.path.getsize(path)
+        except FileNotFoundError:
+            return None
+
+    def _write_object(self, company_id, category: str, file_id: str, sha: str, data: bytes) -> int:
+        path = self._object_path(company_id, category, file_id, sha)
+        if not os.path.exists(path):
+            self._write_atomic(path, data)
+            self.stats["bytes_written"] += len(data)
+        return len(data)
+
+    # ---- public API ----
+
+    def commit(self, company_id, category: str, file_id: str, text: str, note: str = "") -> dict:
+        """Store `text` as the document's newest revision (a no-op when it equals the latest)."""
+        with self._manifest_lock(company_id, category, file_id):
+            manifest = self._load_manifest(company_id, category, file_id)
+            if manifest is None:
+                manifest = {"file_id": file_id, "base": None, "revisions": []}
+                legacy = self.legacy_path(company_id, category, file_id)
+                if os.path.exists(legacy):
+                    with open(legacy, "r", encoding="utf-8") as f:
+                        legacy_text = f.read()
+                    if legacy_text != text:
+                        self._append(company_id, category, manifest, legacy_text, "imported")
+
+            revisions = manifest["revisions"]
+            sha = _sha(text)
+            if revisions and revisions[-1]["sha"] == sha:
+                revision = revisions[-1]
+            else:
+                revision = self._append(company_id, category, manifest, text, note)
+            self._write_atomic(
+                self.manifest_path(company_id, category, file_id),
+                json.dumps(manifest).encode("utf-8"),
+            )
+            self._remember((str(company_id), category, file_id), self._signature(company_id, category, file_id), sha, text)
+            return revision
+
+    def _append(self, company_id, category: str, manifest: dict, text: str, note: str) -> dict:
+        sha = _sha(text)
+        stored = self._stored_object(company_id, category, manifest["file_id"], sha)
+        if stored:
+            # A revisit of earlier text keeps the object already on disk, so record what it really is.
+            kind, stored_bytes = stored
+        else:
+            full = FULL + zlib.compress(text.encode("utf-8"))
+            kind, data = "full", full
+            if manifest["base"]:
+                base_text = self._read_object(company_id, category, manifest["file_id"], manifest["base"])
+                ops = _line_delta(base_text.splitlines(keepends=True), text.splitlines(keepends=True))
+                delta = DELTA + zlib.compress(json.dumps({"base": manifest["base"], "ops": ops}).encode("utf-8"))
+                if len(delta) <= LEASE_STORE_REBASE_RATIO * len(full):
+                    kind, data = "delta", delta
+            stored_bytes = self._write_object(company_id, category, manifest["file_id"], sha, data)
+        if kind == "full":
+            manifest["base"] = sha
+
+        revision = {
+            "rev": len(manifest["revisions"]) + 1,
+            "sha": sha,
+            "kind": kind,
+            "size": len(text),
+            "stored_bytes": stored_bytes,
+            "created_at": datetime.utcnow().isoformat(),
+            "note": note,
+        }
+        manifest["revisions"].append(revision)
+        self.stats["revisions"] += 1
+        return revision
+
+    def _remember(self, doc: tuple, signature: tuple, sha: str, text: str) -> None:
+        self.latest[doc] = (signature, sha, text)
+        self.latest.move_to_end(doc)
+        while len(self.latest) > self.cache_size:
+            self.latest.popitem(last=False)
+
+    def exists(self, company_id, category: str, file_id: str) -> bool:
+        return self._signature(company_id, category, file_id) is not None
+
+    def read_latest(self, company_id, category: str, file_id: str) -> Optional[str]:
+        doc = (str(company_id), category, file_id)
+        with self.lock:
+            self.stats["reads"] += 1
+            signature = self._signature(company_id, category, file_id)
+            if signature is None:
+                self.latest.pop(doc, None)
+                return None
+            cached = self.latest.get(doc)
+            if cached is not None and cached[0] == signature:
+                self.latest.move_to_end(doc)
+                self.stats["cache_hits"] += 1
+                return cached[2]
+            manifest = self._load_manifest(company_id, category, file_id)
+            if manifest and manifest["revisions"]:
+                sha = manifest["revisions"][-1]["sha"]
+                text = self._read_object(company_id, category, file_id, sha)
+            else:
+                legacy = self.legacy_path(company_id, category, file_id)
+                if not os.path.exists(legacy):
+                    return None
+                with open(legacy, "r", encoding="utf-8") as f:
+                    text = f.read()
+                sha = _sha(text)
+            self._remember(doc, signature, sha, text)
+            return text
+
+    def history(self, company_id, category: str, file_id: str) -> List[dict]:
+        manifest = self._load_manifest(company_id, category, file_id)
+        return manifest["revisions"] if manifest else []
+
+    def read_revision(self, company_id, category: str, file_id: str, rev: int) -> Optional[str]:
+        revisions = self.history(company_id, category, file_id)
+        if not 1 <= rev <= len(revisions):
+            return None
+        if rev == len(revisions):
+            return self.read_latest(company_id, category, file_id)
+        return self._read_object(company_id, category, file_id, revisions[rev - 1]["sha"])
+
+    def diff(self, company_id, category: str, file_id: str, from_rev: int, to_rev: int, context: int = 3) -> Optional[str]:
+        """Unified diff between two revisions, or None if either does not exist."""
+        old = self.read_revision(company_id, category, file_id, from_rev)
+        new = self.read_revision(company_id, category, file_id, to_rev)
+        if old is None or new is None:
+            return None
+        return "".join(difflib.unified_diff(
+            old.splitlines(keepends=True),
+            new.splitlines(keepends=True),
+            fromfile=f"{file_id}@{from_rev}",
+            tofile=f"{file_id}@{to_rev}",
+            n=context,
+        ))
+
+    def delete(self, company_id, category: str, file_id: str) -> None:
+        with self._manifest_lock(company_id, category, file_id):
+            self.latest.pop((str(company_id), category, file_id), None)
+            manifest_path = self.manifest_path(company_id, category, file_id)
+            for path in (manifest_path, self.legacy_path(company_id, category, file_id), f"{manifest_path}.lock"):
+                if os.path.exists(path):
+                    os.remove(path)
+            shutil.rmtree(self._objects_dir(company_id, category, file_id), ignore_errors=True)
+
+
+lease_store = LeaseStore()
@@ -0,0 +1,86 @@
+import hashlib
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+PLACEHOLDER_RE = re.compile(r"\[[^\[\]\n]{1,80}\]")
+# Brackets that are drafting notes or alternatives rather than fields to fill,
+# e.g. "[OPTION #1 - LANDLORD PAYS FOR TI]", "[NOTE: delete if not applicable]"
+DRAFTING_NOTE_RE = re.compile(r"^\[\s*(?:OPTION|ALTERNATIVE|NOTE|DRAFTING NOTE|IF APPLICABLE)\b|[#:;]", re.IGNORECASE)
+MAX_FIELD_WORDS = 6
+
+
+def is_field_placeholder(placeholder: str) -> bool:
+    """Whether a bracket names a field ("[Tenant Name]") rather than an optional phrase ("[jointly and severally]")."""
+    inner = placeholder.strip("[]").strip()
+    if not inner or inner[0].islower() or len(inner.split()) > MAX_FIELD_WORDS:
+        return False
+    return not DRAFTING_NOTE_RE.search(placeholder)
+
+
+class CompiledTemplate:
+    """
+    A lease template split once into literal segments and placeholder slots.
+    `render` fills every slot in a single pass and joins, so the document is
+    copied once per render and substituted values are never re-scanned.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        self.segments: List[str] = []
+        self.slots: Dict[str, List[int]] = {}
+
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(text):
+            if match.start() > position:
+                self.segments.append(text[position:match.start()])
+            self.slots.setdefault(match.group(0), []).append(len(self.segments))
+            self.segments.append(match.group(0))
+            position = match.end()
+        if position < len(text):
+            self.segments.append(text[position:])
+
+    @property
+    def placeholders(self) -> List[str]:
+        """Distinct placeholders in order of first appearance."""
+        return list(self.slots)
+
+    @property
+    def fields(self) -> List[str]:
+        """Placeholders that name fields to fill; drafting notes and optional phrases are left as written."""
+        return [placeholder for placeholder in self.slots if is_field_placeholder(placeholder)]
+
+    def slot_positions(self, key: str) -> List[int]:
+        """Slots for `key`; a key the LLM returned without brackets also matches its bracketed form."""
+        return self.slots.get(key) or self.slots.get(f"[{key.strip('[]')}]") or []
+
+    def context_snippet(self, placeholder: str, width: int = 160) -> str:
+        """Text around the first occurrence of `placeholder`, whitespace collapsed."""
+        slots = self.slot_positions(placeholder)
+        if not slots:
+            return ""
+        slot = slots[0]
+        before = self.segments[slot - 1][-width:] if slot > 0 else ""
+        after = self.segments[slot + 1][:width] if slot + 1 < len(self.segments) else ""
+        return " ".join(f"{before}{self.segments[slot]}{after}".split())
+
+    def fill(self, replacements: Dict[str, Any], parts: Optional[List[str]] = None) -> List[str]:
+        """
+        Segments with the given placeholders' slots filled; pass `parts` to patch
+        a previous fill in place. A None or empty value leaves the original
+        bracket text, so unresolved fields stay visible for review.
+        """
+        parts = list(self.segments) if parts is None else parts
+        for key, value in replacements.items():
+            for slot in self.slot_positions(key):
+                parts[slot] = self.segments[slot] if value in (None, "") else str(value)
+        return parts
+
+    def render(self, replacements: Dict[str, Any]) -> str:
+        return "".join(self.fill(replacements))
+
+
+@lru_cache(maxsize=32)
+def compile_template(text: str) -> CompiledTemplate:
+    return CompiledTemplate(text)
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from app.config import METADATA_SECTION_CHARS, METADATA_SECTION_CONCURRENCY
+from app.services.placeholder_mapping import normalize_key
+from app.services.prompts import extract_section_metadata_prompt
+from app.utils.llm_client import llm_gateway
+
+logger = logging.getLogger(__name__)
+
+# Blank lines, or a line starting a numbered clause / ARTICLE / SECTION heading
+SECTION_BREAK = re.compile(r"\n\s*\n|\n(?=[ \t]*(?:ARTICLE|SECTION|\d+(?:\.\d+)*\.?)\s)", re.IGNORECASE)
+EMPTY_MARKERS = {"null", "none", "n/a", "na", "not specified", "not provided", "unknown", "-"}
+
+
+def parse_metadata_json(text: str) -> dict:
+    """The JSON object in an LLM reply, or {} when there is none."""
+    json_match = re.search(r"\{.*\}", text, re.DOTALL)
+    if json_match:
+        try:
+            metadata = json.loads(json_match.group())
+            if isinstance(metadata, dict):
+                return metadata
+        except json.JSONDecodeError:
+            logger.error("LLM returned malformed JSON")
+    logger.error(f"LLM did not return valid JSON, response: {text[:500]}")
+    return {}
+
+
+def split_sections(text: str, max_chars: int = METADATA_SECTION_CHARS) -> List[str]:
+    """Pack paragraphs/clauses into sections of at most `max_chars`; oversized paragraphs are cut."""
+    if len(text) <= max_chars:
+        return [text]
+    sections, current = [], ""
+    for paragraph in SECTION_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        while len(paragraph) > max_chars:
+            if current:
+                sections.append(current)
+                current = ""
+            sections.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            sections.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        sections.append(current)
+    return sections
+
+
+def _is_empty(value: Any) -> bool:
+    if value is None or value == [] or value == {}:
+        return True
+    return isinstance(value, str) and value.strip().lower() in EMPTY_MARKERS | {""}
+
+
+def _fingerprint(value: Any) -> str:
+    return " ".join(json.dumps(value, sort_keys=True, ensure_ascii=False).lower().split())
+
+
+def merge_section_metadata(results: List[dict], path: str = "") -> Tuple[dict, Dict[str, list]]:
+    """
+    Merge per-section extractions (in document order) into one object.
+    Keys are matched after normalisation and keep their first spelling. Nested
+    objects merge recursively and lists are unioned. Conflicting scalars are
+    settled by how many sections agree, ties going to the earliest section.
+    Returns (merged, {key path: distinct candidates, kept value first} for every conflict).
+    """
+    names: Dict[str, str] = {}
+    candidates: Dict[str, List[Any]] = {}
+    for result in results:
+        for key, value in result.items():
+            if _is_empty(value):
+                continue
+            normalized = normalize_key(key)
+            names.setdefault(normalized, key)
+            candidates.setdefault(normalized, []).append(value)
+
+    merged, conflicts = {}, {}
+    for normalized, values in candidates.items():
+        key = names[normalized]
+        key_path = f"{path}.{key}" if path else key
+        if all(isinstance(v, dict) for v in values):
+            merged[key], nested = merge_section_metadata(values, key_path)
+            conflicts.update(nested)
+        elif all(isinstance(v, list) for v in values):
+            seen, union = set(), []
+            for item in (item for v in values for item in v):
+                if not _is_empty(item) and _fingerprint(item) not in seen:
+                    seen.add(_fingerprint(item))
+                    union.append(item)
+            merged[key] = union
+        else:
+            votes = Counter(_fingerprint(v) for v in values)
+            first_seen = {}
+            for v in values:
+                first_seen.setdefault(_fingerprint(v), v)
+            winner = max(first_seen, key=lambda fp: votes[fp])  # max keeps the first of equal counts
+            merged[key] = first_seen[winner]
+            if len(first_seen) > 1:
+                conflicts[key_path] = [merged[key]] + [v for fp, v in first_seen.items() if fp != winner]
+    return merged, conflicts
+
+
+async def extract_metadata_chunked(extracted_text: str, max_chars: int = METADATA_SECTION_CHARS) -> dict:
+    """
+    Map-reduce extraction: every section is extracted concurrently (at most
+    METADATA_SECTION_CONCURRENCY in flight) and the results are merged with
+    `merge_section_metadata`. A failed section only loses its own keys.
+    """
+    sections = split_sections(extracted_text, max_chars)
+    semaphore = asyncio.Semaphore(METADATA_SECTION_CONCURRENCY)
+    start = time.monotonic()
+
+    async def extract(index: int, section_text: str) -> dict:
+        prompt = extract_section_metadata_prompt.format(index=index + 1, count=len(sections), section_text=section_text)
+        async with semaphore:
+            try:
+                response = await llm_gateway.ainvoke(prompt)
+            except Exception as e:
+                logger.error(f"Metadata extraction failed for section {index + 1}/{len(sections)}: {str(e)}")
+                return {}
+        return parse_metadata_json(response.content.strip())
+
+    results = await asyncio.gather(*[extract(i, section) for i, section in enumerate(sections)])
+    merged, conflicts = merge_section_metadata(results)
+    logger.info(
+        f"Chunked metadata extraction: {len(sections)} sections, {len(merged)} keys, "
+        f"{len(conflicts)} conflicts in {time.monotonic() - start:.2f}s"
+    )
+    for key_path, values in conflicts.items():
+        logger.info(f"Metadata conflict on {key_path}: kept {values[0]!r} of {len(values)} candidates")
+    return merged
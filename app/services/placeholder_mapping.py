@@ -0,0 +1,180 @@
+import json
+import logging
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import PLACEHOLDER_MAP_CACHE_SIZE
+from app.services.lease_template_engine import CompiledTemplate
+from app.services.prompts import (
+    lease_template_context_prompt,
+    map_cached_placeholders_prompt,
+    map_placeholders_prompt,
+)
+from app.utils.llm_client import llm_gateway
+
+logger = logging.getLogger(__name__)
+
+# Normalised placeholder -> metadata keys (normalised, flattened) that fill it, best first.
+# The placeholder's own normalised name is always tried last.
+PLACEHOLDER_ALIASES = {
+    "tenant_name": ["tenant_name", "tenant", "tenant_legal_name", "tenant_information_name", "lessee", "lessee_name"],
+    "additional_tenant_name": ["additional_tenant_name", "co_tenant", "additional_tenant"],
+    "landlord_name": ["landlord_name", "landlord", "landlord_legal_name", "landlord_information_name", "lessor", "lessor_name", "owner"],
+    "guarantor": ["guarantor", "guarantor_name", "guaranty"],
+    "property_address": ["property_address", "premises_address", "building_address", "address", "property", "premises"],
+    "date": ["lease_date", "effective_date", "date", "loi_date"],
+    "commencement_date": ["commencement_date", "lease_commencement_date", "start_date", "lease_start_date"],
+    "expiration_date": ["expiration_date", "lease_expiration_date", "end_date", "lease_end_date", "termination_date"],
+    "lease_term": ["lease_term", "term", "lease_duration", "term_length", "initial_term"],
+    "square_footage": ["square_footage", "rentable_square_feet", "rentable_square_footage", "rsf", "square_feet", "premises_size"],
+    "premises_square_footage": ["premises_square_footage", "rentable_square_feet", "square_footage", "rsf", "square_feet"],
+    "center_square_footage": ["center_square_footage", "building_square_footage", "building_size"],
+    "base_annual_rent": ["base_annual_rent", "annual_base_rent", "annual_rent", "base_rent_annual", "base_rent", "rent_amount"],
+    "base_monthly_rent": ["base_monthly_rent", "monthly_base_rent", "monthly_rent"],
+    "security_deposit": ["security_deposit", "deposit", "security_deposit_amount"],
+    "use_clause": ["use_clause", "permitted_use", "use", "permitted_uses"],
+    "tenant_improvements": ["tenant_improvements", "tenant_improvement_allowance", "ti_allowance", "improvement_allowance"],
+    "base_year": ["base_year", "operating_expense_base_year"],
+    "pro_rata_share": ["pro_rata_share", "proportionate_share", "tenant_s_pro_rata_share", "tenants_share"],
+    "state_of_incorporation": ["state_of_incorporation", "tenant_state_of_incorporation", "state_of_formation"],
+}
+
+
+def normalize_key(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", str(name).lower()).strip("_")
+
+
+def flatten_metadata(metadata: Any, prefix: str = "") -> Dict[str, str]:
+    """Nested extraction output -> {normalised_path: text}; empty values are dropped."""
+    flat: Dict[str, str] = {}
+    if isinstance(metadata, dict):
+        for key, value in metadata.items():
+            path = normalize_key(f"{prefix}_{key}" if prefix else key)
+            flat.update(flatten_metadata(value, path))
+            if isinstance(value, dict):
+                # {"tenant": {"name": ...}} also answers for plain "tenant"
+                name = value.get("name") or value.get("legal_name")
+                if name and path not in flat:
+                    flat[path] = str(name)
+    elif isinstance(metadata, list):
+        items = [str(item) for item in metadata if item not in (None, "", [], {})]
+        if items and prefix:
+            flat[prefix] = ", ".join(items)
+    elif metadata not in (None, "") and prefix:
+        flat[prefix] = str(metadata)
+    return flat
+
+
+def map_placeholders(template: CompiledTemplate, flat: Dict[str, str]) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Deterministic placeholder -> metadata key map from the keys we know.
+    Only field placeholders are considered; drafting notes are never mapped.
+    Returns (mapping, unresolved fields in template order).
+    """
+    mapping, unresolved = {}, []
+    for placeholder in template.fields:
+        key = normalize_key(placeholder)
+        for candidate in PLACEHOLDER_ALIASES.get(key, []) + [key]:
+            if flat.get(candidate):
+                mapping[placeholder] = candidate
+                break
+        else:
+            unresolved.append(placeholder)
+    return mapping, unresolved
+
+
+def _parse_json_object(text: str) -> dict:
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        raise ValueError("no JSON object in response")
+    parsed = json.loads(match.group())
+    if not isinstance(parsed, dict):
+        raise ValueError("response is not a JSON object")
+    return parsed
+
+
+async def map_leftover_placeholders(template: CompiledTemplate, placeholders: List[str], flat: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """
+    Ask the LLM which metadata key fills each placeholder the deterministic map
+    could not. When a provider context cache holds the whole template (one per
+    template digest) only the placeholder names and metadata are sent;
+    otherwise, including when the provider refuses to cache it, each
+    placeholder goes out with its surrounding text, never the full template.
+    Placeholders the LLM answered without a usable key map to None and keep their bracket text.
+    """
+    if not placeholders:
+        return {}
+    metadata = json.dumps(flat, ensure_ascii=False)
+    system = lease_template_context_prompt.format(lease_template=template.text)
+    cache_key = f"lease-template:{template.digest}"
+    # looking the cache up only picks the prompt shape; ainvoke counts the call that reuses it
+    cache_name = await llm_gateway.context_cache(cache_key, system) if llm_gateway.context_caching else None
+    if cache_name:
+        prompt = map_cached_placeholders_prompt.format(
+            placeholders="\n".join(f"- {p}" for p in placeholders),
+            metadata=metadata,
+        )
+        response = await llm_gateway.ainvoke(prompt, system=system, cache_key=cache_key)
+    else:
+        listing = "\n".join(f"- {p}: ...{template.context_snippet(p)}..." for p in placeholders)
+        prompt = map_placeholders_prompt.format(placeholders=listing, metadata=metadata)
+        response = await llm_gateway.ainvoke(prompt)
+    logger.info(
+        f"Placeholder mapping call: {response.input_tokens} input tokens, "
+        f"{response.cached_tokens or 0} served from context cache"
+    )
+
+    mapping = _parse_json_object(response.content)
+    wanted = set(placeholders)
+    return {p: (key if key in flat else None) for p, key in mapping.items() if p in wanted}
+
+
+_key_mappings: "OrderedDict[tuple, Dict[str, str]]" = OrderedDict()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+async def placeholder_key_mapping(template: CompiledTemplate, flat: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """
+    placeholder -> metadata key, cached by (template digest, sorted metadata keys):
+    a regeneration with the same key set only re-reads the values.
+    Mappings are only cached when the LLM step (if any) succeeded.
+    """
+    cache_key = (template.digest, tuple(sorted(flat)))
+    cached = _key_mappings.get(cache_key)
+    if cached is not None:
+        _key_mappings.move_to_end(cache_key)
+        _cache_stats["hits"] += 1
+        return cached
+
+    _cache_stats["misses"] += 1
+    mapping, unresolved = map_placeholders(template, flat)
+    llm_mapping, complete = {}, True
+    if unresolved:
+        try:
+            llm_mapping = await map_leftover_placeholders(template, unresolved, flat)
+        except Exception as e:
+            complete = False
+            logger.error(f"LLM placeholder mapping failed for {len(unresolved)} placeholders: {e}")
+    logger.info(
+        f"Placeholder mapping: {len(mapping)} deterministic, "
+        f"{sum(1 for key in llm_mapping.values() if key)} from LLM, {len(unresolved)} sent to LLM"
+    )
+
+    mapping = {**llm_mapping, **mapping}
+    if complete:
+        _key_mappings[cache_key] = mapping
+        while len(_key_mappings) > PLACEHOLDER_MAP_CACHE_SIZE:
+            _key_mappings.popitem(last=False)
+    return mapping
+
+
+async def resolve_placeholders(template: CompiledTemplate, metadata: dict) -> Dict[str, str]:
+    """Full placeholder -> value map for rendering `template` with `metadata`."""
+    flat = flatten_metadata(metadata or {})
+    mapping = await placeholder_key_mapping(template, flat)
+    return {placeholder: flat.get(key) if key else None for placeholder, key in mapping.items()}
+
+
+def mapping_cache_stats() -> dict:
+    return {**_cache_stats, "entries": len(_key_mappings)}
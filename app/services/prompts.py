@@ -112,6 +112,34 @@ Do not assume or infer beyond the query provided.
 Query: {query}
 """
 
+contextual_classification_prompt = """
+You are a helpful assistant that classifies user queries into two categories: 'general' or 'specific'.
+- 'general' queries include greetings(e.g., "Hello", "How are you?").
+- 'specific' queries are related to categorized files, inquiries about documents, or specific information (e.g., "What is in the lease agreement?", "Find details about the tenant contract").
+The query is a follow-up in an ongoing conversation. Rewrite it as a standalone question that can be understood
+without the conversation, resolving pronouns and references (e.g., "and the renewal option?" -> "What is the renewal option in the lease for 2 Fairfax Square?").
+If the query is already standalone, repeat it unchanged.
+Return a JSON object with the keys 'query_type' ('general' or 'specific') and 'standalone_query'.
+Example: {{"query_type": "specific", "standalone_query": "What is the renewal option in the lease?"}}
+
+Conversation so far:
+{history}
+
+Query: {query}
+"""
+
+summarize_memory_prompt = """
+You maintain a running summary of a conversation between a user and a lease analysis assistant.
+Update the summary with the new exchanges below. Keep buildings, tenants, suites, dates, amounts and
+open questions; drop greetings and filler. Stay under {max_tokens} tokens and return only the summary text.
+
+Current summary:
+{summary}
+
+New exchanges:
+{transcript}
+"""
+
 general_prompt = """
         You are a professional real estate and property management analyst responding to general questions or greetings.
         Provide a concise, conversational response appropriate to the user's query.
@@ -140,4 +168,57 @@ contents="""You are an expert data extractor. Extract content from the given fil
                 -For images, describe them briefly if they contain important information.
                 -Return only clean, structured content, without any unrelated metadata or formatting artifacts.
                 -Organize the output logically, preserving the original structure of the document as much as possible.
-                Output should be fully text-based, structured, and ready for further analysis or processing."""
\ No newline at end of file
+                Output should be fully text-based, structured, and ready for further analysis or processing."""
+map_placeholders_prompt = """
+You are an expert in lease document automation. Fill the lease template placeholders below from the metadata.
+Each placeholder is shown with the template text around it so you can tell what it stands for.
+
+Placeholders:
+{placeholders}
+
+Metadata (key: value):
+{metadata}
+
+Return only a valid JSON object mapping each placeholder, exactly as written above, to the metadata KEY whose
+value belongs there. Use null when no key fits. Do not include any other keys or text.
+Example: {{"[BASE YEAR]": "operating_expenses_base_year", "[FLOOR LOAD]": null}}
+"""
+
+lease_template_context_prompt = """
+You are an expert in lease document automation. You fill the placeholders of the lease template below
+(written in square brackets, e.g. [TENANT NAME]) from metadata extracted out of a letter of intent.
+Use the template text around each placeholder to tell what it stands for.
+
+Lease template:
+{lease_template}
+"""
+
+map_cached_placeholders_prompt = """
+Fill the lease template placeholders listed below from the metadata.
+
+Placeholders:
+{placeholders}
+
+Metadata (key: value):
+{metadata}
+
+Return only a valid JSON object mapping each placeholder, exactly as written above, to the metadata KEY whose
+value belongs there. Use null when no key fits. Do not include any other keys or text.
+Example: {{"[BASE YEAR]": "operating_expenses_base_year", "[FLOOR LOAD]": null}}
+"""
+
+extract_section_metadata_prompt = """
+You are an AI legal document assistant. A user has uploaded a long lease-related document (e.g., Letter of
+Intent, lease agreement, or rental contract). You are given part {index} of {count} of its text.
+Identify all important information in this part and extract it as key-value pairs in a JSON object:
+tenant and landlord information, property address and details, lease term and dates, financial terms
+(rent, security deposit, payment schedule), square footage, permitted use, tenant improvements, and any
+special clauses, rights, obligations, insurance, maintenance, renewal or penalty terms.
+
+Requirements:
+- Return a valid JSON object only.
+- Only include information stated in this part; leave out keys this part does not mention (do not use null).
+- Use short snake_case keys (e.g. "tenant_name", "commencement_date", "base_annual_rent").
+
+Document Text: {section_text}
+"""
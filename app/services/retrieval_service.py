@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from typing import List
+
+from app.config import (
+    ADAPTIVE_FETCH_K,
+    ADAPTIVE_FLAT_SPREAD,
+    ADAPTIVE_MAX_K,
+    ADAPTIVE_MIN_K,
+    ADAPTIVE_RELATIVE_THRESHOLD,
+    HYBRID_SEARCH,
+    RETRIEVAL_MODE,
+    RETRIEVAL_TOP_K,
+    RRF_K,
+)
+from app.services import session_retrieval_cache
+from app.utils import lexical_index
+from app.utils.process_file import get_pinecone_index
+
+logger = logging.getLogger(__name__)
+
+
+def query_vector_index(query_emb, top_k: int, filter_metadata: dict, include_values: bool = False) -> List[dict]:
+    index = get_pinecone_index()
+    result = index.query(
+        vector=query_emb,
+        top_k=top_k,
+        include_metadata=True,
+        include_values=include_values,
+        filter=filter_metadata
+    )
+    matches = []
+    for m in result["matches"]:
+        match = {"id": m["id"], "score": m["score"], "metadata": m["metadata"]}
+        if include_values:
+            match["values"] = m["values"]
+        matches.append(match)
+    return matches
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def adaptive_k(scores: List[float], base_k: int = RETRIEVAL_TOP_K) -> int:
+    """
+    Number of matches to keep from an over-fetched, score-sorted list.
+    Matches below ADAPTIVE_RELATIVE_THRESHOLD x the top score are cut, which
+    shrinks k when the scores drop steeply. k may only grow past `base_k`
+    (up to ADAPTIVE_MAX_K) when the leading scores are flat, i.e. no clear winner.
+    """
+    if not scores:
+        return 0
+    top = scores[0]
+    if top <= 0:
+        return min(base_k, len(scores))
+
+    eligible = sum(1 for score in scores if score >= top * ADAPTIVE_RELATIVE_THRESHOLD)
+    head = scores[:base_k]
+    flat = (top - head[-1]) / top <= ADAPTIVE_FLAT_SPREAD
+    limit = ADAPTIVE_MAX_K if flat else base_k
+    return max(min(ADAPTIVE_MIN_K, len(scores)), min(eligible, limit))
+
+
+async def retrieve_chunks(
+    question: str,
+    query_emb,
+    filter_metadata: dict,
+    company_id,
+    top_k: int = RETRIEVAL_TOP_K,
+    timer=None,
+    mode: str = RETRIEVAL_MODE,
+    session_cache=None,
+) -> dict:
+    """
+    Query Pinecone and, when hybrid search is on, the company's BM25 index in
+    parallel, then fuse both rankings with reciprocal-rank fusion.
+    In "adaptive" mode both are over-fetched and k is picked from the vector
+    score curve (see `adaptive_k`); "fixed" keeps exactly `top_k`.
+    With a `session_cache` (follow-up turns), the session's recently retrieved
+    chunks are scored locally first and Pinecone is only queried when none
+    scores high enough; fresh Pinecone results are added to the cache.
+    Returns the fused matches plus the kept vector matches (used for confidence).
+    """
+    fetch_k = max(ADAPTIVE_FETCH_K, top_k) if mode == "adaptive" else top_k
+    loop = asyncio.get_running_loop()
+
+    cached, cache_hit = None, False
+    if session_cache is not None and len(session_cache):
+        cached = _timed(session_cache.lookup, query_emb, fetch_k)
+        cache_hit = cached[0] is not None
+        session_retrieval_cache.record_lookup(cache_hit, cached[1])
+    if cache_hit:
+        vector_task = loop.create_future()
+        vector_task.set_result(cached)
+    else:
+        vector_task = loop.run_in_executor(
+            None, _timed, query_vector_index, query_emb, fetch_k, filter_metadata, session_cache is not None
+        )
+
+    lexical_matches, lexical_seconds = [], 0.0
+    if HYBRID_SEARCH:
+        lexical_task = loop.run_in_executor(None, _timed, lexical_index.search, company_id, question, fetch_k, filter_metadata)
+        vector_result, lexical_result = await asyncio.gather(vector_task, lexical_task, return_exceptions=True)
+        if isinstance(vector_result, Exception):
+            raise vector_result
+        if isinstance(lexical_result, Exception):
+            logger.error(f"Lexical search failed, falling back to vector only: {lexical_result}")
+        else:
+            lexical_matches, lexical_seconds = lexical_result
+    else:
+        vector_result = await vector_task
+    vector_matches, vector_seconds = vector_result
+    if session_cache is not None and not cache_hit:
+        session_retrieval_cache.record_vector_query(vector_seconds)
+        session_cache.add(vector_matches)
+
+    if timer:
+        timer.add("session_cache_lookup" if cache_hit else "vector_query", vector_seconds)
+        if HYBRID_SEARCH:
+            timer.add("lexical_query", lexical_seconds)
+
+    k = adaptive_k([m["score"] for m in vector_matches], top_k) if mode == "adaptive" else top_k
+    if not vector_matches and lexical_matches:
+        k = top_k
+
+    if HYBRID_SEARCH:
+        matches = lexical_index.reciprocal_rank_fusion([vector_matches, lexical_matches[:k]], top_k=k, k=RRF_K)
+    else:
+        matches = vector_matches[:k]
+    return {
+        "matches": matches,
+        "vector_matches": vector_matches[:k],
+        "k": k,
+        "session_cache_hit": cache_hit if cached is not None else None,
+    }
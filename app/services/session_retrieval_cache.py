@@ -0,0 +1,140 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from app.config import (
+    SESSION_CACHE_MAX_CHUNKS,
+    SESSION_CACHE_MIN_SCORE,
+    SESSION_CACHE_SIZE,
+    SESSION_CACHE_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _filter_key(filter_metadata: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in filter_metadata.items()))
+
+
+class SessionChunkCache:
+    """
+    Chunks (with their embeddings) recently returned by the vector store for one
+    session and one filter. Follow-up turns are scored against them locally and
+    only fall through to the vector store when the best local score is too low.
+    """
+
+    def __init__(self, filter_key: tuple):
+        self.filter_key = filter_key
+        self.matches: List[dict] = []
+        self.vectors: Optional[np.ndarray] = None
+        self.touched_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.matches)
+
+    def add(self, matches: List[dict]) -> None:
+        """Cache the matches that carry `values`; the values are popped off the match dicts."""
+        known = {m["id"] for m in self.matches}
+        rows, fresh = [], []
+        for match in matches:
+            values = match.pop("values", None)
+            if values is None or match["id"] in known:
+                continue
+            known.add(match["id"])
+            fresh.append({"id": match["id"], "metadata": match["metadata"]})
+            rows.append(np.asarray(values, dtype=np.float32))
+        if not rows:
+            return
+
+        block = np.vstack(rows)
+        block /= np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+        self.matches.extend(fresh)
+        self.vectors = block if self.vectors is None else np.vstack([self.vectors, block])
+        if len(self.matches) > SESSION_CACHE_MAX_CHUNKS:
+            self.matches = self.matches[-SESSION_CACHE_MAX_CHUNKS:]
+            self.vectors = self.vectors[-SESSION_CACHE_MAX_CHUNKS:]
+
+    def lookup(self, query_emb, top_k: int, min_score: float = SESSION_CACHE_MIN_SCORE) -> Optional[List[dict]]:
+        """Top cached matches by cosine score, or None when the best one is below `min_score`."""
+        if not self.matches:
+            return None
+        query = np.asarray(query_emb, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        scores = self.vectors @ query
+        order = np.argsort(-scores)[:top_k]
+        if scores[order[0]] < min_score:
+            return None
+        return [
+            {"id": self.matches[i]["id"], "score": float(scores[i]), "metadata": self.matches[i]["metadata"]}
+            for i in order
+        ]
+
+    def drop_file(self, file_id: str) -> None:
+        keep = [i for i, m in enumerate(self.matches) if m["metadata"].get("file_id") != file_id]
+        if len(keep) != len(self.matches):
+            self.matches = [self.matches[i] for i in keep]
+            self.vectors = self.vectors[keep] if keep else None
+
+
+_caches: "OrderedDict[str, SessionChunkCache]" = OrderedDict()
+_stats = {"lookups": 0, "hits": 0, "saved_seconds": 0.0}
+_vector_query_seconds = {"ewma": None}
+
+
+def _evict_stale() -> None:
+    now = time.monotonic()
+    for session_id in [sid for sid, c in _caches.items() if now - c.touched_at > SESSION_CACHE_TTL_SECONDS]:
+        del _caches[session_id]
+    while len(_caches) > SESSION_CACHE_SIZE:
+        _caches.popitem(last=False)
+
+
+def get_session_cache(session_id: str, filter_metadata: dict) -> SessionChunkCache:
+    """The session's chunk cache for this filter; a different filter (category/building) starts a new one."""
+    key = _filter_key(filter_metadata)
+    cache = _caches.get(session_id)
+    if cache is None or cache.filter_key != key:
+        cache = SessionChunkCache(key)
+        _caches[session_id] = cache
+    _caches.move_to_end(session_id)
+    cache.touched_at = time.monotonic()
+    _evict_stale()
+    return cache
+
+
+def drop_session_cache(session_id: str) -> None:
+    _caches.pop(session_id, None)
+
+
+def drop_file_from_caches(file_id: str) -> None:
+    """Forget a deleted or replaced file's chunks in every session."""
+    for cache in _caches.values():
+        cache.drop_file(file_id)
+
+
+def record_vector_query(seconds: float) -> None:
+    previous = _vector_query_seconds["ewma"]
+    _vector_query_seconds["ewma"] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+
+
+def record_lookup(hit: bool, lookup_seconds: float) -> None:
+    _stats["lookups"] += 1
+    if hit:
+        _stats["hits"] += 1
+        typical = _vector_query_seconds["ewma"]
+        if typical is not None:
+            _stats["saved_seconds"] += max(0.0, typical - lookup_seconds)
+
+
+def stats() -> dict:
+    lookups = _stats["lookups"]
+    return {
+        "sessions": len(_caches),
+        "lookups": lookups,
+        "hits": _stats["hits"],
+        "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else None,
+        "latency_saved_ms": round(_stats["saved_seconds"] * 1000, 1),
+    }
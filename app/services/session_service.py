@@ -2,6 +2,8 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app.crud.user_chatbot_crud import delete_user_chat_session, get_user_chat_history, list_user_chat_sessions
 from app.models.models import ChatSession, ChatHistory
+from app.services.conversation_memory import drop_session_memory
+from app.services.session_retrieval_cache import drop_session_cache
 
 async def list_chat_sessions_service(current_user, db: Session):
     """Lists chat sessions for the user."""
@@ -54,4 +56,6 @@ async def delete_session_service(session_id: str, current_user, db: Session):
     session = delete_user_chat_session(db, session_id, current_user.id)
     if not session:
         raise HTTPException(status_code=404, detail="Chat session not found or you do not have access")
+    drop_session_memory(session_id, current_user.id)
+    drop_session_cache(session_id)
     return {"message": "Session successfully deleted"}
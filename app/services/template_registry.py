@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.config import TEMPLATE_REGISTRY_SIZE
+from app.services.lease_template_engine import CompiledTemplate
+from app.utils.process_file import extract_text_from_file
+
+logger = logging.getLogger(__name__)
+
+
+def extracted_text_path(template_path: str) -> str:
+    """Where the text extracted from an uploaded template is kept, next to the original."""
+    return f"{os.path.splitext(template_path)[0]}.extracted.txt"
+
+
+class TemplateRegistry:
+    """
+    Compiled user-uploaded lease templates by file id, LRU-evicted beyond
+    TEMPLATE_REGISTRY_SIZE. Templates are extracted once at upload and the
+    text is stored next to the original, so a miss (eviction, restart) only
+    reads and compiles text and never re-parses the DOCX/PDF. Uploads register
+    from a worker thread, so the LRU is guarded by a lock.
+    """
+
+    def __init__(self, max_size: int = TEMPLATE_REGISTRY_SIZE):
+        self.max_size = max_size
+        self.templates: "OrderedDict[str, CompiledTemplate]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "extractions": 0}
+        self.lock = threading.Lock()
+
+    def _put(self, file_id: str, template: CompiledTemplate) -> CompiledTemplate:
+        with self.lock:
+            self.templates[file_id] = template
+            self.templates.move_to_end(file_id)
+            while len(self.templates) > self.max_size:
+                self.templates.popitem(last=False)
+        return template
+
+    def _extract(self, template_path: str) -> str:
+        self.stats["extractions"] += 1
+        text = extract_text_from_file(template_path)
+        with open(extracted_text_path(template_path), "w", encoding="utf-8") as f:
+            f.write(text)
+        return text
+
+    def register(self, file_id: str, template_path: str) -> CompiledTemplate:
+        """Extract and compile a newly uploaded template; raises ValueError when it has no text."""
+        return self._put(file_id, CompiledTemplate(self._extract(template_path)))
+
+    def _cached(self, file_id: str) -> Optional[CompiledTemplate]:
+        with self.lock:
+            template = self.templates.get(file_id)
+            if template is not None:
+                self.templates.move_to_end(file_id)
+                self.stats["hits"] += 1
+            return template
+
+    def get(self, template_file) -> CompiledTemplate:
+        """The compiled template for a `StandaloneFile` of category "template"."""
+        template = self._cached(template_file.file_id)
+        if template is not None:
+            return template
+
+        self.stats["misses"] += 1
+        template_path = template_file.gcs_path
+        if not template_path or not os.path.exists(template_path):
+            raise HTTPException(status_code=404, detail="Template file is missing on disk.")
+        try:
+            cached_text = extracted_text_path(template_path)
+            if os.path.exists(cached_text):
+                with open(cached_text, "r", encoding="utf-8") as f:
+                    text = f.read()
+            else:
+                # uploaded before templates were extracted at upload time
+                text = self._extract(template_path)
+            template = CompiledTemplate(text)
+        except Exception as e:
+            logger.warning(f"Could not read template {template_file.file_id}: {e}")
+            raise HTTPException(status_code=400, detail=f"Could not read template: {str(e)}")
+        return self._put(template_file.file_id, template)
+
+    async def aget(self, template_file) -> CompiledTemplate:
+        """`get` for async routes: a miss reads (or parses) the template in a worker thread."""
+        template = self._cached(template_file.file_id)
+        if template is not None:
+            return template
+        return await asyncio.to_thread(self.get, template_file)
+
+    def drop(self, file_id: str, template_path: Optional[str] = None) -> Optional[CompiledTemplate]:
+        if template_path and os.path.exists(extracted_text_path(template_path)):
+            os.remove(extracted_text_path(template_path))
+        with self.lock:
+            return self.templates.pop(file_id, None)
+
+
+template_registry = TemplateRegistry()
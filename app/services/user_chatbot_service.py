@@ -4,7 +4,7 @@ from typing import Optional
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from langchain_core.prompts import ChatPromptTemplate
-from app.crud.user_chatbot_crud import get_or_create_chat_session, save_chat_history, save_standalone_file
+from app.crud.user_chatbot_crud import save_standalone_file
 from app.models.models import  StandaloneFile
 from app.schema.chat_bot_schema import FileItem, ListFilesResponse
 from app.schema.user_chat import StandaloneFileResponse
@@ -21,8 +21,11 @@ from datetime import datetime
 from app.models.models import StandaloneFile
 from app.config import google_api_key
 from app.utils.process_file import get_pinecone_index, process_uploaded_file, save_to_temp
-from app.utils.llm_client import llm
-from app.config import SUPPORTED_EXT
+from app.utils.llm_client import llm_gateway
+from app.utils import lexical_index
+from app.services.retrieval_service import retrieve_chunks
+from app.services.context_builder import build_context, count_tokens
+from app.config import SESSION_RETRIEVAL_CACHE, SUPPORTED_EXT
 logger = logging.getLogger(__name__)
 
 def human_readable_size(size_in_bytes: int) -> str:
@@ -113,7 +116,79 @@ async def upload_standalone_files_service(
 
 import time
 import numpy as np
-from app.services.prompts import classification_prompt,general_prompt,system_prompt
+from app.services.prompts import classification_prompt,contextual_classification_prompt,general_prompt,system_prompt
+from app.services.conversation_memory import get_cached_session_memory, get_session_memory
+from app.services.session_retrieval_cache import drop_file_from_caches, get_session_cache
+from app.utils.timing import StageTimer
+from app.utils.single_flight import SingleFlight, normalize_question
+from app.services.chat_writer import persist_chat_turn
+
+
+def retrieval_confidence(result: dict) -> float:
+    scores = [m["score"] for m in result["vector_matches"]] or [0.0]
+    return float(np.mean(scores))
+
+
+def llm_usage(response) -> tuple:
+    """(input_tokens, output_tokens) reported by the model, or (None, None)."""
+    return response.input_tokens, response.output_tokens
+
+
+async def answer_from_matches(question: str, matches: list, timer: Optional[StageTimer] = None) -> dict:
+    """Build the packed context for `matches` and generate the answer."""
+    timer = timer or StageTimer()
+    with timer.stage("context_build"):
+        context = build_context(matches)
+        prompt = ChatPromptTemplate.from_messages([("system", system_prompt), ("human", question)])
+        messages = prompt.format_messages(context=context["context"])
+        prompt_tokens = sum(count_tokens(m.content) for m in messages)
+
+    with timer.stage("generation"):
+        response = await llm_gateway.ainvoke(messages)
+    answer = response.content.strip()
+    input_tokens, output_tokens = llm_usage(response)
+    return {
+        "answer": answer,
+        "prompt_tokens": input_tokens or prompt_tokens,
+        "completion_tokens": output_tokens if output_tokens is not None else count_tokens(answer),
+        "context_tokens": context["context_tokens"],
+    }
+
+
+pipeline_flights = SingleFlight("ask_simple")
+
+
+async def answer_specific_query(retrieval_query: str, filter_metadata: dict, company_id, session_cache=None) -> dict:
+    """Embedding, hybrid retrieval and generation for one document question."""
+    timer = StageTimer()
+    with timer.stage("embedding"):
+        query_emb = await get_embedding(retrieval_query, google_api_key)
+
+    with timer.stage("retrieval"):
+        result = await retrieve_chunks(
+            retrieval_query, query_emb[0], filter_metadata, company_id, timer=timer, session_cache=session_cache
+        )
+
+    outcome = {
+        "answer": "Information not available in documents",
+        "confidence": 0.0,
+        "prompt_tokens": None,
+        "completion_tokens": None,
+        "top_k_scores": [round(float(m["score"]), 4) for m in result["vector_matches"]],
+        "retrieval_k": result["k"],
+        "session_cache_hit": result["session_cache_hit"],
+    }
+    if result["matches"]:
+        generated = await answer_from_matches(retrieval_query, result["matches"], timer=timer)
+        outcome.update(
+            answer=generated["answer"],
+            confidence=retrieval_confidence(result),
+            prompt_tokens=generated["prompt_tokens"],
+            completion_tokens=generated["completion_tokens"],
+        )
+
+    outcome["timings_ms"] = dict(timer.stages)
+    return outcome
 
 
 async def ask_simple_service(req, current_user, db: Session):
@@ -124,12 +199,35 @@ async def ask_simple_service(req, current_user, db: Session):
         raise HTTPException(400, "Question cannot be empty")
     logger.info(f"Received question: '{req.question}'")
     question_lower = req.question.lower().strip()
-    prompt = ChatPromptTemplate.from_messages([("system", classification_prompt), ("human", question_lower)])
 
     start_time = time.time()  
+    timer = StageTimer()
+    usage = {"prompt_tokens": 0, "completion_tokens": 0}
+    cache_hits = {"memory": get_cached_session_memory(req.session_id, current_user.id) is not None}
+
+    with timer.stage("memory"):
+        memory = get_session_memory(db, req.session_id, current_user.id)
+        history = memory.render()
+    if history:
+        prompt = ChatPromptTemplate.from_messages([("system", contextual_classification_prompt), ("human", "{query}")])
+        messages = prompt.format_messages(query=req.question, history=history)
+    else:
+        prompt = ChatPromptTemplate.from_messages([("system", classification_prompt), ("human", question_lower)])
+        messages = prompt.format_messages(query=question_lower)
 
     try:
-        response = await llm.ainvoke(prompt.format_messages(query=question_lower))
+        with timer.stage("classification"):
+            if history:
+                response = await llm_gateway.ainvoke(messages)
+            else:
+                response, shared = await pipeline_flights.do(
+                    ("classify", current_user.company_id, normalize_question(req.question)),
+                    lambda: llm_gateway.ainvoke(messages),
+                )
+                cache_hits["coalesced_classification"] = shared
+        input_tokens, output_tokens = llm_usage(response)
+        usage["prompt_tokens"] += input_tokens or 0
+        usage["completion_tokens"] += output_tokens or 0
         content = response.content.strip()
         json_match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", content, re.DOTALL)
         if json_match:
@@ -137,74 +235,100 @@ async def ask_simple_service(req, current_user, db: Session):
 
         classification = json.loads(content)
         query_type = classification.get("query_type")
+        retrieval_query = (classification.get("standalone_query") or req.question).strip()
     except Exception as e:
         logger.error(f"Failed to classify query: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to classify query type")
 
     confidence_score = 1.0  
+    prompt_tokens = None
+    top_k_scores = []
+    retrieval_k = 0
 
     if query_type == "general":
         prompt = ChatPromptTemplate.from_messages([("system", general_prompt), ("human", req.question)])
         try:
-            response = await llm.ainvoke(prompt.format_messages(query=req.question))
+            with timer.stage("generation"):
+                response = await llm_gateway.ainvoke(prompt.format_messages(query=req.question))
             answer = response.content.strip()
+            input_tokens, output_tokens = llm_usage(response)
+            usage["prompt_tokens"] += input_tokens or 0
+            usage["completion_tokens"] += output_tokens or 0
         except Exception as e:
             logger.error(f"Failed to generate response for general query: {str(e)}")
             answer = "Hello! How can I assist you today?"
     else:
+        if retrieval_query != req.question:
+            logger.info(f"Rewrote follow-up as: '{retrieval_query}'")
+
+        filter_metadata = {"category": req.category, "company_id": str(current_user.company_id)}
+        if getattr(req, "building_id", None) and str(req.building_id).strip():
+            filter_metadata["building_id"] = str(req.building_id)
+
+        session_cache = get_session_cache(req.session_id, filter_metadata) if SESSION_RETRIEVAL_CACHE else None
+        flight_key = (
+            current_user.company_id,
+            req.category,
+            filter_metadata.get("building_id"),
+            normalize_question(retrieval_query),
+            # Follow-ups answered from this session's chunks must not be shared with other sessions
+            req.session_id if session_cache is not None and len(session_cache) else None,
+        )
         try:
-            query_emb = await get_embedding(req.question, google_api_key)
-            index = get_pinecone_index()
-
-            filter_metadata = {"category": req.category, "company_id": str(current_user.company_id)}
-            if getattr(req, "building_id", None) and str(req.building_id).strip():
-                filter_metadata["building_id"] = str(req.building_id)
-
-            result = index.query(
-                vector=query_emb,
-                top_k=5,
-                include_metadata=True,
-                filter=filter_metadata
+            wait_start = time.perf_counter()
+            result, shared = await pipeline_flights.do(
+                flight_key,
+                lambda: answer_specific_query(retrieval_query, filter_metadata, current_user.company_id, session_cache),
             )
-
-            if not result["matches"]:
-                answer = "Information not available in documents"
-                confidence_score = 0.0
-            else:
-                
-                scores = [m["score"] for m in result["matches"]]
-                confidence_score = float(np.mean(scores))
-
-                contexts = [m["metadata"]["chunk"] for m in result["matches"]]
-                combined_context = "\n\n".join(contexts)
-
-                
-                prompt = ChatPromptTemplate.from_messages([("system", system_prompt), ("human", req.question)])
-                response = await llm.ainvoke(prompt.format_messages(context=combined_context))
-                answer = response.content.strip()
-
         except Exception as e:
             logger.error(f"Failed to search results: {str(e)}")
             raise HTTPException(status_code=500, detail="Failed to retrieve information from files")
 
+        cache_hits["coalesced"] = shared
+        if result["session_cache_hit"] is not None and not shared:
+            cache_hits["retrieval"] = result["session_cache_hit"]
+        if shared:
+            timer.add("coalesced_wait", time.perf_counter() - wait_start)
+        else:
+            timer.stages.update(result["timings_ms"])
+        answer = result["answer"]
+        confidence_score = result["confidence"]
+        prompt_tokens = result["prompt_tokens"]
+        top_k_scores = result["top_k_scores"]
+        retrieval_k = result["retrieval_k"]
+        if not shared:
+            usage["prompt_tokens"] += result["prompt_tokens"] or 0
+            usage["completion_tokens"] += result["completion_tokens"] or 0
+
     end_time = time.time()
     response_time = round(end_time - start_time, 3)  
 
 
-    session = get_or_create_chat_session(db, req.session_id, current_user.id, req.category, current_user.company_id)
-
-    save_chat_history(
-        db=db,
-        session_id=session.id,
+    persist_chat_turn(
+        db,
+        session_id=req.session_id,
         user_id=current_user.id,
-        file_id=None,
+        category=req.category,
+        building_id=getattr(req, "building_id", None),
         question=req.question,
         answer=answer,
         company_id=current_user.company_id,
         response_time=response_time,
         confidence=confidence_score,
-        response_json={"query_type": query_type, "answer": answer, "confidence": confidence_score}
+        response_json={
+            "query_type": query_type,
+            "answer": answer,
+            "confidence": confidence_score,
+            "prompt_tokens": prompt_tokens,
+            "retrieval_query": retrieval_query,
+            "timings_ms": timer.as_dict(),
+            "top_k_scores": top_k_scores,
+            "retrieval_k": retrieval_k,
+            "usage": usage,
+            "cache_hits": cache_hits,
+        }
     )
+    memory.add_turn(req.question, answer)
 
     return {
         "session_id": req.session_id,
@@ -212,6 +336,7 @@ async def ask_simple_service(req, current_user, db: Session):
         "answer": answer,
         "confidence": confidence_score,
         "response_time": response_time,
+        "coalesced": cache_hits.get("coalesced", False),
         "source_file": None,
         "all_answers": [],
     }
@@ -297,6 +422,8 @@ async def update_standalone_file_service(
 
         index = get_pinecone_index()
         index.delete(filter={"file_id": file_id})
+        lexical_index.delete_file_segment(existing_file.company_id, file_id)
+        drop_file_from_caches(file_id)
 
         await process_uploaded_file(
             temp_path, new_file.filename, file_id, google_api_key, category_to_use, current_user.company_id, building_id=building_id
@@ -365,6 +492,11 @@ async def delete_simple_file_service(
         logger.info(f"Deleted vectors for file_id {file_id} from Pinecone")
     except Exception as e:
         logger.error(f"Failed to delete Pinecone vectors for file_id {file_id}: {e}")
+    try:
+        lexical_index.delete_file_segment(file_record.company_id, file_id)
+        drop_file_from_caches(file_id)
+    except Exception as e:
+        logger.error(f"Failed to delete lexical index segment for file_id {file_id}: {e}")
     try:
         if file_record.gcs_path:  
             local_path = os.path.join("standalone_files", os.path.basename(file_record.gcs_path))
@@ -0,0 +1,167 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from app.config import LEXICAL_INDEX_DIR
+
+logger = logging.getLogger(__name__)
+
+# Keeps identifiers such as "1200", "12.3", "b-2" or "ste/400" as single terms.
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def _company_dir(company_id) -> str:
+    return os.path.join(LEXICAL_INDEX_DIR, str(company_id))
+
+
+def _segment_path(company_id, file_id: str) -> str:
+    return os.path.join(_company_dir(company_id), f"{file_id}.json")
+
+
+def write_file_segment(company_id, file_id: str, docs: List[dict]) -> None:
+    """
+    Write the inverted index segment for one uploaded file.
+    Each doc needs `id` and `chunk`; every other key is kept as match metadata.
+    """
+    postings = defaultdict(list)
+    lengths = []
+    for local_id, doc in enumerate(docs):
+        counts = Counter(tokenize(doc["chunk"]))
+        lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings[term].append([local_id, tf])
+
+    segment = {"file_id": file_id, "docs": docs, "lengths": lengths, "postings": postings}
+
+    path = _segment_path(company_id, file_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(segment, f)
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote lexical index segment for file {file_id} ({len(docs)} chunks)")
+
+
+def delete_file_segment(company_id, file_id: str) -> None:
+    path = _segment_path(company_id, file_id)
+    if os.path.exists(path):
+        os.remove(path)
+        logger.info(f"Deleted lexical index segment for file {file_id}")
+
+
+class _CompanyIndex:
+    """In-memory merge of all segments of one company."""
+
+    def __init__(self, segments: List[dict]):
+        self.docs: List[dict] = []
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[tuple]] = defaultdict(list)
+
+        for segment in segments:
+            offset = len(self.docs)
+            self.docs.extend(segment["docs"])
+            self.lengths.extend(segment["lengths"])
+            for term, plist in segment["postings"].items():
+                self.postings[term].extend((offset + local_id, tf) for local_id, tf in plist)
+
+        self.avgdl = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def search(self, query: str, top_k: int, filter_metadata: Optional[dict] = None) -> List[dict]:
+        n_docs = len(self.docs)
+        if not n_docs:
+            return []
+
+        filter_metadata = {k: v for k, v in (filter_metadata or {}).items() if k != "company_id"}
+        scores: Dict[int, float] = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            for doc_idx, tf in plist:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc_idx] / self.avgdl)
+                scores[doc_idx] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        matches = []
+        for doc_idx, score in ranked:
+            doc = self.docs[doc_idx]
+            if any(str(doc.get(key, "")) != str(value) for key, value in filter_metadata.items()):
+                continue
+            metadata = {k: v for k, v in doc.items() if k != "id"}
+            matches.append({"id": doc["id"], "score": score, "metadata": metadata})
+            if len(matches) >= top_k:
+                break
+        return matches
+
+
+_cache: Dict[str, tuple] = {}
+_cache_lock = threading.Lock()
+
+
+def _load_company_index(company_id) -> _CompanyIndex:
+    company_dir = _company_dir(company_id)
+    if not os.path.isdir(company_dir):
+        return _CompanyIndex([])
+
+    # Segment mtimes act as the cache key, so writes from other workers are picked up.
+    entries = sorted(
+        (entry.name, entry.stat().st_mtime_ns)
+        for entry in os.scandir(company_dir)
+        if entry.name.endswith(".json")
+    )
+    signature = tuple(entries)
+
+    with _cache_lock:
+        cached = _cache.get(str(company_id))
+        if cached and cached[0] == signature:
+            return cached[1]
+
+    segments = []
+    for name, _ in entries:
+        try:
+            with open(os.path.join(company_dir, name), "r", encoding="utf-8") as f:
+                segments.append(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.error(f"Skipping unreadable lexical segment {name}: {e}")
+
+    index = _CompanyIndex(segments)
+    with _cache_lock:
+        _cache[str(company_id)] = (signature, index)
+    return index
+
+
+def search(company_id, query: str, top_k: int, filter_metadata: Optional[dict] = None) -> List[dict]:
+    """BM25 search over a company's chunks. Matches use the same shape as Pinecone matches."""
+    return _load_company_index(company_id).search(query, top_k, filter_metadata)
+
+
+def reciprocal_rank_fusion(result_lists: List[List[dict]], top_k: int, k: int = 60) -> List[dict]:
+    """
+    Fuse ranked match lists by reciprocal rank. The first list that contains a
+    match decides which copy of it is kept, so pass the vector results first to
+    keep their cosine scores.
+    """
+    fused: Dict[str, dict] = {}
+    rrf_scores: Dict[str, float] = defaultdict(float)
+
+    for matches in result_lists:
+        for rank, match in enumerate(matches):
+            rrf_scores[match["id"]] += 1.0 / (k + rank + 1)
+            fused.setdefault(match["id"], match)
+
+    ranked_ids = sorted(rrf_scores, key=rrf_scores.get, reverse=True)[:top_k]
+    return [{**fused[match_id], "rrf_score": rrf_scores[match_id]} for match_id in ranked_ids]
@@ -1,25 +1,26 @@
-import os
 import json
 import re
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from app.config import google_api_key
+from app.config import google_api_key, LLM_PROVIDER, PROVIDER_MODE
+from app.utils.llm_gateway import GeminiBackend, LLMGateway
 load_dotenv()
 
 
+def _build_backend():
+    if PROVIDER_MODE == "offline" or LLM_PROVIDER == "offline":
+        from app.utils.offline_providers import OfflineBackend
+        return OfflineBackend()
+    return GeminiBackend(api_key=google_api_key)
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    google_api_key=google_api_key,
-    temperature=0.2
-)
 
+llm_gateway = LLMGateway(_build_backend())
 
-def invoke_llm(prompt: str, expect_json: bool = True, fallback: dict = None):
+
+async def invoke_llm(prompt: str, expect_json: bool = True, fallback: dict = None):
 
     try:
-        response = llm.invoke(prompt)
-        content = getattr(response, "content", "").strip()
+        response = await llm_gateway.ainvoke(prompt)
+        content = response.content.strip()
 
         if not expect_json:
             return content
@@ -0,0 +1,469 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import (
+    model as EMBEDDING_MODEL,
+    LLM_ATTEMPT_TIMEOUT,
+    LLM_BACKOFF_BASE,
+    LLM_CONTEXT_CACHE_ENABLED,
+    LLM_CONTEXT_CACHE_TTL_SECONDS,
+    LLM_DEADLINE_SECONDS,
+    LLM_HEDGE_BUDGET,
+    LLM_HEDGE_DEFAULT_DELAY,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_MIN_DELAY,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_MODEL,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TEMPERATURE,
+)
+from app.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE = 100
+
+NON_RETRYABLE_ERRORS = {"InvalidArgument", "PermissionDenied", "Unauthenticated", "NotFound", "ValueError", "TypeError"}
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if type(exc).__name__ in NON_RETRYABLE_ERRORS:
+        return False
+    code = getattr(exc, "code", None)
+    return not (isinstance(code, int) and 400 <= code < 500 and code != 429)
+
+
+@dataclass
+class LLMResponse:
+    content: str
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+
+
+def normalize_prompt(prompt, system: Optional[str] = None) -> Tuple[Optional[str], List[Tuple[str, Any]]]:
+    """
+    Accept a plain string, a list of (role, content) pairs or chat-prompt
+    messages (objects with `type` and `content`) and return
+    (system_instruction, [(role, content), ...]) with roles "user"/"model".
+    Non-text parts such as uploaded files pass through unchanged.
+    """
+    if isinstance(prompt, str):
+        return system, [("user", prompt)]
+
+    system_parts = [system] if system else []
+    contents = []
+    for message in prompt:
+        if isinstance(message, tuple):
+            role, content = message
+        elif hasattr(message, "type") and hasattr(message, "content"):
+            role, content = message.type, message.content
+        else:
+            role, content = "user", message
+        if role == "system":
+            system_parts.append(content)
+        else:
+            contents.append(("model" if role in ("ai", "assistant", "model") else "user", content))
+    return ("\n\n".join(system_parts) or None), contents
+
+
+class GeminiBackend:
+    """google-genai async client, created once and shared so HTTP connections are pooled."""
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        model: str = LLM_MODEL,
+        temperature: float = LLM_TEMPERATURE,
+        embedding_model: Optional[str] = EMBEDDING_MODEL,
+    ):
+        from google import genai
+        from google.genai import types
+
+        self.types = types
+        self.client = genai.Client(api_key=api_key)
+        self.model = model
+        self.temperature = temperature
+        self.embedding_model = embedding_model
+
+    def _to_part(self, content):
+        if isinstance(content, str):
+            return self.types.Part(text=content)
+        if hasattr(content, "uri"):
+            return self.types.Part.from_uri(file_uri=content.uri, mime_type=content.mime_type)
+        return content
+
+    async def generate(self, system, contents, model=None, temperature=None, cached_content=None) -> LLMResponse:
+        types = self.types
+        parts = [types.Content(role=role, parts=[self._to_part(content)]) for role, content in contents]
+        config = types.GenerateContentConfig(
+            system_instruction=None if cached_content else system,
+            temperature=self.temperature if temperature is None else temperature,
+            cached_content=cached_content,
+        )
+        response = await self.client.aio.models.generate_content(
+            model=model or self.model, contents=parts, config=config
+        )
+        usage = response.usage_metadata
+        return LLMResponse(
+            content=(response.text or "").strip(),
+            input_tokens=getattr(usage, "prompt_token_count", None),
+            output_tokens=getattr(usage, "candidates_token_count", None),
+            cached_tokens=getattr(usage, "cached_content_token_count", None),
+        )
+
+    async def embed(self, texts: List[str], task_type: str, output_dim: int) -> List[List[float]]:
+        response = await self.client.aio.models.embed_content(
+            model=self.embedding_model,
+            contents=texts,
+            config=self.types.EmbedContentConfig(task_type=task_type, output_dimensionality=output_dim),
+        )
+        return [embedding.values for embedding in response.embeddings]
+
+    async def upload_file(self, path: str):
+        return await self.client.aio.files.upload(file=path)
+
+    async def create_cache(self, system: str, ttl_seconds: int, model: Optional[str] = None) -> str:
+        """Store `system` provider-side as cached content; returns the cache name to pass as `cached_content`."""
+        cache = await self.client.aio.caches.create(
+            model=model or self.model,
+            config=self.types.CreateCachedContentConfig(system_instruction=system, ttl=f"{int(ttl_seconds)}s"),
+        )
+        return cache.name
+
+    async def delete_cache(self, name: str) -> None:
+        await self.client.aio.caches.delete(name=name)
+
+
+class RateLimiter:
+    """Shared concurrency cap plus a requests-per-minute token bucket."""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, requests_per_minute: int = LLM_REQUESTS_PER_MINUTE):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, float(min(requests_per_minute, max_concurrency)))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        await self.semaphore.acquire()
+        if self.rate <= 0:
+            return
+        try:
+            async with self.lock:
+                while True:
+                    now = time.monotonic()
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                    self.updated_at = now
+                    if self.tokens >= 1.0:
+                        self.tokens -= 1.0
+                        return
+                    await asyncio.sleep((1.0 - self.tokens) / self.rate)
+        except BaseException:
+            self.semaphore.release()
+            raise
+
+    def release(self) -> None:
+        self.semaphore.release()
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies (seconds)."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def p95(self, default: float) -> float:
+        if len(self.samples) < self.min_samples:
+            return default
+        return float(np.percentile(self.samples, 95))
+
+
+class HedgeBudget:
+    """Token bucket: each call earns `ratio` tokens, each hedge spends one."""
+
+    def __init__(self, ratio: float, burst: float = 5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+
+    def on_call(self) -> None:
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class LLMGateway:
+    """
+    Single async entry point for every LLM call in the app.
+
+    Every call gets an overall deadline. Each attempt is bounded by
+    LLM_ATTEMPT_TIMEOUT and failed attempts are retried with jittered
+    exponential backoff while time remains. If an attempt has not answered
+    after the observed p95 latency, a duplicate request is fired and the first
+    successful reply wins; hedges are capped at LLM_HEDGE_BUDGET per call.
+    All requests, hedges included, share one rate limiter, and token usage is
+    counted per gateway.
+
+    Calls that pass a `cache_key` have their system prompt stored provider-side
+    as cached content (one per key and model, renewed every
+    LLM_CONTEXT_CACHE_TTL_SECONDS), so repeats only send the variable part.
+    """
+
+    def __init__(
+        self,
+        backend,
+        deadline: float = LLM_DEADLINE_SECONDS,
+        attempt_timeout: float = LLM_ATTEMPT_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        hedge_enabled: bool = LLM_HEDGE_ENABLED,
+        hedge_budget: float = LLM_HEDGE_BUDGET,
+    ):
+        self.backend = backend
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.hedge_enabled = hedge_enabled
+        self.latency = LatencyTracker()
+        self.budget = HedgeBudget(hedge_budget)
+        self.limiter = None
+        self.context_caches = {}
+        self.context_cache_flight = SingleFlight("context-cache")
+        self.counters = {
+            "calls": 0, "retries": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0, "failures": 0,
+            "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0, "embed_calls": 0,
+            "context_cache_hits": 0, "context_cache_creates": 0,
+        }
+
+    def set_backend(self, backend) -> None:
+        """Swap the provider, e.g. for an offline stub in tests and benchmarks."""
+        self.backend = backend
+
+    def _backoff(self, attempt: int) -> float:
+        return self.backoff_base * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    @property
+    def context_caching(self) -> bool:
+        """Whether `cache_key` calls can actually reuse a provider-side prefix."""
+        return LLM_CONTEXT_CACHE_ENABLED and hasattr(self.backend, "create_cache")
+
+    async def ainvoke(
+        self,
+        prompt,
+        system: Optional[str] = None,
+        deadline: Optional[float] = None,
+        cache_key: Optional[str] = None,
+        **kwargs,
+    ) -> LLMResponse:
+        """
+        Generate a reply for `prompt` (see `normalize_prompt` for accepted shapes).
+        With `cache_key`, the system prompt is served from a provider-side context
+        cache; `response.cached_tokens` is the per-call saving.
+        """
+        system, contents = normalize_prompt(prompt, system)
+        self.counters["calls"] += 1
+        self.budget.on_call()
+        cached_content = None
+        if cache_key and system and self.context_caching:
+            cached_content = await self.context_cache(cache_key, system, kwargs.get("model"))
+            if cached_content:
+                self._count_cache_use((cache_key, kwargs.get("model")))
+
+        if cached_content:
+            try:
+                response = await self._with_policy(
+                    lambda: self._hedged(None, contents, cached_content=cached_content, **kwargs), deadline
+                )
+            except Exception as e:
+                if _is_retryable(e):
+                    raise
+                # expired or evicted on the provider's side: forget it and send the prefix inline
+                logger.warning(f"Context cache {cache_key} unusable, sending prompt inline: {e}")
+                self.context_caches.pop((cache_key, kwargs.get("model")), None)
+                response = await self._with_policy(lambda: self._hedged(system, contents, **kwargs), deadline)
+        else:
+            response = await self._with_policy(lambda: self._hedged(system, contents, **kwargs), deadline)
+        self.counters["input_tokens"] += response.input_tokens or 0
+        self.counters["output_tokens"] += response.output_tokens or 0
+        self.counters["cached_tokens"] += response.cached_tokens or 0
+        return response
+
+    async def aembed(self, texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT", output_dim: int = 1536) -> List[List[float]]:
+        """Embed `texts` in provider-sized batches, with the same deadline and retry policy (no hedging)."""
+        vectors = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            batch = texts[start:start + EMBED_BATCH_SIZE]
+            self.counters["embed_calls"] += 1
+            vectors.extend(await self._with_policy(
+                lambda: self._limited(self.backend.embed(batch, task_type=task_type, output_dim=output_dim))
+            ))
+        return vectors
+
+    async def generate_from_file(self, file_path: str, instructions: str, **kwargs) -> LLMResponse:
+        """Upload a file once, then run `instructions` against it under the usual call policy."""
+        uploaded = await self._with_policy(lambda: self._limited(self.backend.upload_file(file_path)))
+        return await self.ainvoke([("user", uploaded), ("user", instructions)], **kwargs)
+
+    async def context_cache(self, cache_key: str, system: str, model: Optional[str] = None) -> Optional[str]:
+        """
+        Name of the live provider cache holding `system` for `cache_key`, created
+        (or renewed shortly before it expires) on demand. Returns None when the
+        provider refuses, e.g. a prefix below its minimum size; that answer is
+        remembered for one TTL so we don't ask on every call. Concurrent misses
+        on the same key share one create call; other keys are not held up.
+        Looking a cache up is not a use: `ainvoke` counts hits when a call reuses it.
+        """
+        key = (cache_key, model)
+        now = time.monotonic()
+        for stale in [k for k, entry in self.context_caches.items() if entry["expires_at"] <= now]:
+            del self.context_caches[stale]
+
+        entry = self.context_caches.get(key)
+        if entry and entry["expires_at"] - now > min(60.0, LLM_CONTEXT_CACHE_TTL_SECONDS / 10):
+            return entry["name"]
+
+        name, _ = await self.context_cache_flight.do(key, lambda: self._create_context_cache(key, system))
+        return name
+
+    def _count_cache_use(self, key: tuple) -> None:
+        # the first call served from a cache is the one it was created for; only later calls are hits
+        entry = self.context_caches.get(key)
+        if entry is None:
+            return
+        entry["uses"] += 1
+        if entry["uses"] > 1:
+            entry["hits"] += 1
+            self.counters["context_cache_hits"] += 1
+
+    async def _create_context_cache(self, key: tuple, system: str) -> Optional[str]:
+        cache_key, model = key
+        try:
+            name = await self._with_policy(lambda: self._limited(
+                self.backend.create_cache(system, ttl_seconds=LLM_CONTEXT_CACHE_TTL_SECONDS, model=model)
+            ))
+            self.counters["context_cache_creates"] += 1
+            logger.info(f"Created context cache {name} for {cache_key}")
+        except Exception as e:
+            logger.warning(f"Context caching unavailable for {cache_key}: {e}")
+            name = None
+        self.context_caches[key] = {
+            "name": name,
+            "expires_at": time.monotonic() + LLM_CONTEXT_CACHE_TTL_SECONDS,
+            "uses": 0,
+            "hits": 0,
+        }
+        return name
+
+    async def drop_context_cache(self, cache_key: str) -> None:
+        """Delete every provider cache for `cache_key`, e.g. when that template version is retired."""
+        for key in [k for k in self.context_caches if k[0] == cache_key]:
+            name = self.context_caches.pop(key)["name"]
+            if name and hasattr(self.backend, "delete_cache"):
+                try:
+                    await self.backend.delete_cache(name)
+                except Exception as e:
+                    logger.warning(f"Could not delete context cache {name}: {e}")
+
+    async def _with_policy(self, attempt_fn, deadline: Optional[float] = None):
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                return await asyncio.wait_for(attempt_fn(), min(self.attempt_timeout, remaining))
+            except asyncio.TimeoutError:
+                self.counters["timeouts"] += 1
+                logger.warning(f"LLM attempt {attempt + 1} timed out")
+            except Exception as e:
+                if not _is_retryable(e) or attempt == self.max_retries:
+                    self.counters["failures"] += 1
+                    raise
+                logger.warning(f"LLM attempt {attempt + 1} failed: {e}")
+
+            if attempt < self.max_retries:
+                self.counters["retries"] += 1
+                pause = min(self._backoff(attempt), max(0.0, deadline_at - time.monotonic()))
+                await asyncio.sleep(pause)
+
+        self.counters["failures"] += 1
+        raise asyncio.TimeoutError("LLM call exceeded its deadline")
+
+    async def _limited(self, awaitable):
+        if self.limiter is None:
+            self.limiter = RateLimiter()
+        await self.limiter.acquire()
+        try:
+            return await awaitable
+        finally:
+            self.limiter.release()
+
+    async def _timed_call(self, system, contents, **kwargs) -> LLMResponse:
+        async def generate():
+            # timed from the moment a slot is held: rate-limiter queueing is not model latency
+            start = time.monotonic()
+            result = await self.backend.generate(system, contents, **kwargs)
+            self.latency.record(time.monotonic() - start)
+            return result
+
+        return await self._limited(generate())
+
+    async def _hedged(self, system, contents, **kwargs) -> LLMResponse:
+        primary = asyncio.ensure_future(self._timed_call(system, contents, **kwargs))
+        tasks = {primary}
+        try:
+            if not self.hedge_enabled:
+                return await primary
+
+            hedge_delay = max(LLM_HEDGE_MIN_DELAY, self.latency.p95(LLM_HEDGE_DEFAULT_DELAY))
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if done or not self.budget.try_spend():
+                return await primary
+
+            self.counters["hedges"] += 1
+            hedge = asyncio.ensure_future(self._timed_call(system, contents, **kwargs))
+            tasks.add(hedge)
+            last_error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.counters["hedge_wins"] += 1
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "p95_seconds": round(self.latency.p95(0.0), 3),
+            "context_caches": {
+                key: {"active": bool(entry["name"]), "hits": entry["hits"]}
+                for (key, _), entry in self.context_caches.items()
+            },
+        }
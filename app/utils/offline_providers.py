@@ -0,0 +1,342 @@
+"""
+Local stand-ins for Gemini and Pinecone, used when PROVIDER_MODE=offline.
+
+Everything here is deterministic for a given OFFLINE_SEED and never touches
+the network, so the whole app can be load-tested or benchmarked on one box:
+  - `hash_embedding`: feature-hashed bag of words, so texts sharing terms
+    land close together and retrieval still returns sensible chunks,
+  - `InMemoryVectorIndex`: the subset of the Pinecone Index API the app uses,
+    including metadata filters,
+  - `OfflineBackend`: an LLM backend for `LLMGateway` that answers each
+    prompt family with a canned, well-formed reply after a sampled latency.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config import (
+    OFFLINE_EMBED_LATENCY,
+    OFFLINE_LLM_ERROR_RATE,
+    OFFLINE_LLM_LATENCY,
+    OFFLINE_SEED,
+    OFFLINE_VECTOR_LATENCY,
+)
+from app.utils.llm_gateway import LLMResponse
+from app.utils.lexical_index import tokenize
+
+
+class LatencyDistribution:
+    """
+    Parse a latency spec (milliseconds) and sample it in seconds:
+      fixed:40 | uniform:20,80 | normal:300,50 | lognormal:600,0.4 (median, sigma)
+    """
+
+    def __init__(self, spec: str, seed: int = OFFLINE_SEED):
+        kind, _, params = (spec or "fixed:0").partition(":")
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(",") if p.strip()] or [0.0]
+        if self.kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+        self.rng = random.Random(seed)
+
+    def sample(self) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            ms = p[0]
+        elif self.kind == "uniform":
+            ms = self.rng.uniform(p[0], p[1] if len(p) > 1 else p[0])
+        elif self.kind == "normal":
+            ms = self.rng.gauss(p[0], p[1] if len(p) > 1 else 0.0)
+        else:
+            ms = p[0] * float(np.exp(self.rng.gauss(0.0, p[1] if len(p) > 1 else 0.0)))
+        return max(0.0, ms) / 1000.0
+
+
+def _stable_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def hash_embedding(text: str, dim: int) -> List[float]:
+    """Signed feature hashing of unigrams and bigrams, L2-normalised."""
+    vector = np.zeros(dim, dtype=np.float32)
+    tokens = tokenize(text)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if not features:
+        features = [text or "<empty>"]
+    for feature in features:
+        h = _stable_hash(feature)
+        vector[h % dim] += 1.0 if (h >> 63) & 1 else -1.0
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        vector[_stable_hash(text) % dim] = 1.0
+        norm = 1.0
+    return (vector / norm).tolist()
+
+
+def _compare(value, condition) -> bool:
+    if not isinstance(condition, dict):
+        return value == condition
+    for op, operand in condition.items():
+        if op == "$eq" and not value == operand:
+            return False
+        if op == "$ne" and not value != operand:
+            return False
+        if op == "$in" and value not in operand:
+            return False
+        if op == "$nin" and value in operand:
+            return False
+        if op == "$exists" and (value is not None) != bool(operand):
+            return False
+        if op in ("$gt", "$gte", "$lt", "$lte"):
+            if value is None:
+                return False
+            if op == "$gt" and not value > operand:
+                return False
+            if op == "$gte" and not value >= operand:
+                return False
+            if op == "$lt" and not value < operand:
+                return False
+            if op == "$lte" and not value <= operand:
+                return False
+    return True
+
+
+def matches_filter(metadata: dict, filter_metadata: Optional[dict]) -> bool:
+    """Evaluate a Pinecone-style metadata filter ($eq/$ne/$in/$nin/$gt../$exists, $and/$or)."""
+    if not filter_metadata:
+        return True
+    for key, condition in filter_metadata.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif not _compare(metadata.get(key), condition):
+            return False
+    return True
+
+
+class InMemoryVectorIndex:
+    """Cosine-similarity index with the upsert/query/delete surface of `pinecone.Index`."""
+
+    def __init__(self, dimension: int, latency: Optional[LatencyDistribution] = None):
+        self.dimension = dimension
+        self.latency = latency or LatencyDistribution(OFFLINE_VECTOR_LATENCY)
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._metadata: List[dict] = []
+        self._vectors = np.zeros((0, dimension), dtype=np.float32)
+        self._pending: List[np.ndarray] = []
+
+    def _sleep(self) -> None:
+        delay = self.latency.sample()
+        if delay:
+            time.sleep(delay)
+
+    def _matrix(self) -> np.ndarray:
+        if self._pending:
+            self._vectors = np.vstack([self._vectors] + self._pending)
+            self._pending = []
+        return self._vectors
+
+    def upsert(self, vectors, namespace: str = "", **kwargs) -> dict:
+        self._sleep()
+        with self._lock:
+            for item in vectors:
+                if isinstance(item, dict):
+                    vector_id, values, metadata = item["id"], item["values"], item.get("metadata") or {}
+                else:
+                    vector_id, values, metadata = item[0], item[1], item[2] if len(item) > 2 else {}
+                row = np.asarray(values, dtype=np.float32)
+                norm = float(np.linalg.norm(row))
+                row = row / norm if norm else row
+                if vector_id in self._rows:
+                    index = self._rows[vector_id]
+                    self._matrix()[index] = row
+                    self._metadata[index] = dict(metadata)
+                else:
+                    self._rows[vector_id] = len(self._ids)
+                    self._ids.append(vector_id)
+                    self._metadata.append(dict(metadata))
+                    self._pending.append(row[None, :])
+        return {"upserted_count": len(vectors)}
+
+    def query(self, vector, top_k: int = 10, filter: Optional[dict] = None, include_metadata: bool = False,
+              include_values: bool = False, **kwargs) -> dict:
+        self._sleep()
+        with self._lock:
+            matrix = self._matrix()
+            candidates = [
+                i for i, vector_id in enumerate(self._ids)
+                if vector_id is not None and matches_filter(self._metadata[i], filter)
+            ]
+            if not candidates:
+                return {"matches": []}
+            query = np.asarray(vector, dtype=np.float32)
+            norm = float(np.linalg.norm(query))
+            query = query / norm if norm else query
+            scores = matrix[candidates] @ query
+            order = np.argsort(-scores, kind="stable")[:top_k]
+
+            matches = []
+            for position in order:
+                row = candidates[position]
+                match = {"id": self._ids[row], "score": float(scores[position])}
+                if include_metadata:
+                    match["metadata"] = dict(self._metadata[row])
+                if include_values:
+                    match["values"] = matrix[row].tolist()
+                matches.append(match)
+        return {"matches": matches}
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[dict] = None, delete_all: bool = False, **kwargs) -> dict:
+        with self._lock:
+            for row, vector_id in enumerate(self._ids):
+                if vector_id is None:
+                    continue
+                if delete_all or (ids and vector_id in ids) or (filter and matches_filter(self._metadata[row], filter)):
+                    del self._rows[vector_id]
+                    self._ids[row] = None
+                    self._metadata[row] = {}
+        return {}
+
+    def describe_index_stats(self, **kwargs) -> dict:
+        return {"dimension": self.dimension, "total_vector_count": len(self._rows)}
+
+
+class OfflineLLMError(Exception):
+    """Injected transient failure (OFFLINE_LLM_ERROR_RATE); retryable like a provider 503."""
+
+
+class _OfflineFile:
+    def __init__(self, text: str):
+        self.text = text
+
+
+GREETING = re.compile(r"^\s*(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening)|how are you)\b", re.I)
+KEY_VALUE_LINE = re.compile(r"^\s*([A-Za-z][A-Za-z /&()-]{1,40}?)\s*:\s*(.+?)\s*$", re.M)
+
+
+def _section(text: str, start: str, end: Optional[str] = None) -> str:
+    _, found, tail = text.rpartition(start)
+    if not found:
+        return ""
+    return tail.split(end, 1)[0] if end else tail
+
+
+def _key(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+class OfflineBackend:
+    """
+    Canned LLM for `LLMGateway`. Replies are chosen by prompt family (query
+    classification, lease placeholder mapping, metadata extraction, dashboard
+    JSON, file extraction) so every caller's parser sees a valid payload;
+    anything else gets an answer built from the prompt's own words.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[LatencyDistribution] = None,
+        embed_latency: Optional[LatencyDistribution] = None,
+        error_rate: float = OFFLINE_LLM_ERROR_RATE,
+        answer_words: int = 80,
+        seed: int = OFFLINE_SEED,
+    ):
+        self.latency = latency or LatencyDistribution(OFFLINE_LLM_LATENCY, seed)
+        self.embed_latency = embed_latency or LatencyDistribution(OFFLINE_EMBED_LATENCY, seed + 1)
+        self.error_rate = error_rate
+        self.answer_words = answer_words
+        self.rng = random.Random(seed + 2)
+        self.caches = {}
+
+    async def _wait(self, distribution: LatencyDistribution) -> None:
+        delay = distribution.sample()
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise OfflineLLMError("offline backend: injected transient failure")
+
+    async def generate(self, system, contents, model=None, temperature=None, cached_content=None) -> LLMResponse:
+        await self._wait(self.latency)
+        cached_tokens, prefix = 0, ""
+        if cached_content:
+            if cached_content not in self.caches:
+                raise ValueError(f"offline backend: unknown cached content {cached_content}")
+            system = self.caches[cached_content]
+            cached_tokens = len(system.split())
+            prefix = system + "\n"
+        files = [c for _, c in contents if isinstance(c, _OfflineFile)]
+        text = "\n".join(c for _, c in contents if isinstance(c, str))
+        reply = files[0].text if files else self.reply_for(prefix + text)
+        return LLMResponse(
+            content=reply,
+            input_tokens=len(((system or "") + text).split()),
+            output_tokens=len(reply.split()),
+            cached_tokens=cached_tokens,
+        )
+
+    async def create_cache(self, system: str, ttl_seconds: int, model: Optional[str] = None) -> str:
+        await self._wait(self.latency)
+        name = f"cachedContents/offline-{_stable_hash(system):016x}"
+        self.caches[name] = system
+        return name
+
+    async def delete_cache(self, name: str) -> None:
+        self.caches.pop(name, None)
+
+    async def embed(self, texts: List[str], task_type: str, output_dim: int) -> List[List[float]]:
+        await self._wait(self.embed_latency)
+        return [hash_embedding(text, output_dim) for text in texts]
+
+    async def upload_file(self, path: str):
+        from app.utils.process_file import extract_text_from_file
+        return _OfflineFile(extract_text_from_file(path) or "")
+
+    def reply_for(self, prompt: str) -> str:
+        if "'query_type'" in prompt:
+            query = _section(prompt, "Query:").strip()
+            reply: Dict[str, Any] = {"query_type": "general" if GREETING.match(query) else "specific"}
+            if "standalone_query" in prompt:
+                reply["standalone_query"] = query
+            return json.dumps(reply)
+        if "Fill the lease template placeholders" in prompt:
+            return json.dumps(self._lease_mapping(prompt))
+        if "key-value pairs in a JSON object" in prompt:
+            document = _section(prompt, "Document Text:")
+            return json.dumps({_key(k): v for k, v in KEY_VALUE_LINE.findall(document)})
+        if '"feedback"' in prompt:
+            count = len(re.findall(r"^\s*- ", _section(prompt, "Feedback list:"), re.M))
+            return json.dumps({"feedback": ["neutral"] * count})
+        if '"trend_summary"' in prompt:
+            return json.dumps({"trend_summary": "Usage is steady.", "category_analysis": "No category stands out."})
+        if '"questions"' in prompt:
+            return json.dumps({"summary": "Users asked about lease terms.", "questions": []})
+        return self._answer(prompt)
+
+    def _lease_mapping(self, prompt: str) -> dict:
+        try:
+            metadata = json.loads(_section(prompt, "(key: value):", "Return only").strip())
+        except ValueError:
+            metadata = {}
+        keys = {_key(k): k for k in metadata} if isinstance(metadata, dict) else {}
+        listing = _section(prompt, "Placeholders:", "Metadata")
+        placeholders = [m.group(1) for m in re.finditer(r"^- (\[[^\]\n]+\])", listing, re.M)]
+        return {p: keys.get(_key(p)) for p in placeholders}
+
+    def _answer(self, prompt: str) -> str:
+        words = [w for w in prompt.split() if w.isalpha()]
+        if not words:
+            return "Information not available in documents."
+        start = _stable_hash(prompt) % max(1, len(words) - self.answer_words)
+        return " ".join(words[start:start + self.answer_words]) + "."
@@ -1,20 +1,15 @@
 import os
-import uuid
 import logging
-import asyncio
 from typing import List, Optional, Union
 from app.utils.docx_extreactinon import extract_docx_text
 import pinecone
 import pandas as pd
 from fastapi import HTTPException
-import os
-from app.config import api_key,index_name,dimension,cloud,region,model
-import google.generativeai as gen
-import PyPDF2
+from app.config import api_key,index_name,dimension,cloud,region,CHUNK_SIZE,CHUNK_OVERLAP,PROVIDER_MODE
+from app.utils import lexical_index
 import PyPDF2
-import pandas as pd
-from app.config import client
 from app.services.prompts import contents
+from app.utils.llm_client import llm_gateway
 logger = logging.getLogger(__name__)
 
 # client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
@@ -87,19 +82,11 @@ def guess_mime_type(file_path: str) -> str:
         return "Invalid file type. Only PDF files are allowed."
     
     
-def extract_text_from_file_using_llm(file_path: str) -> str:
+async def extract_text_from_file_using_llm(file_path: str) -> str:
     try:
-        uploaded_file = client.files.upload(file=file_path)  
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",  
-            contents=[
-                uploaded_file,contents
-              
-            ],
-        )
+        response = await llm_gateway.generate_from_file(file_path, contents)
 
-
-        text = getattr(response, "text", "").strip()
+        text = response.content.strip()
         if not text:
             raise ValueError("Cannot process file: No text extracted")
         return text
@@ -116,23 +103,22 @@ async def get_embedding(texts: Union[str, List[str]], api_key: str, output_dim:
     if not texts:
         raise ValueError("No texts provided for embedding")
     
-    gen.configure(api_key=api_key)
-    # model = os.getenv("GEMINI_EMBEDDING_MODEL")
-    
-    def embed_sync():
-        result = gen.embed_content(
-            model=model,
-            content=texts, 
-            task_type="RETRIEVAL_DOCUMENT",
-            output_dimensionality=output_dim
-        )
-        return result['embedding']  
-    
-    embeddings = await asyncio.get_event_loop().run_in_executor(None, embed_sync)
-    return embeddings
+    return await llm_gateway.aembed(texts, task_type="RETRIEVAL_DOCUMENT", output_dim=output_dim)
+
+
+_pinecone_index = None
 
 
 def get_pinecone_index():
+    global _pinecone_index
+    if _pinecone_index is not None:
+        return _pinecone_index
+
+    if PROVIDER_MODE == "offline":
+        from app.utils.offline_providers import InMemoryVectorIndex
+        logger.info("PROVIDER_MODE=offline: using the in-memory vector index")
+        _pinecone_index = InMemoryVectorIndex(int(dimension or 1536))
+        return _pinecone_index
 
     if not api_key:
         raise ValueError("PINECONE_API_KEY environment variable is not set")
@@ -155,7 +141,12 @@ def get_pinecone_index():
     else:
         logger.info(f"Using existing Pinecone index: {index_name}")
     
-    return pc.Index(index_name)
+    _pinecone_index = pc.Index(index_name)
+    return _pinecone_index
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size - overlap)]
+
 
 async def process_uploaded_file(file_path,  filename,  file_id,  google_api_key,  category,  company_id,building_id: Optional[int] = None ):
     try:
@@ -165,34 +156,34 @@ async def process_uploaded_file(file_path,  filename,  file_id,  google_api_key,
             logger.warning(f"No text extracted from {filename}")
             return
         
-        chunk_size = 1000
-        overlap = 200
-        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size - overlap)]
+        chunks = chunk_text(text)
         
         index = get_pinecone_index()
         vectors = []
+        lexical_docs = []
         
 
         if chunks:
             embeddings = await get_embedding(chunks, google_api_key)  
             vectors = []
             for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                vector_id = f"{uuid.uuid4()}"
+                vector_id = f"{file_id}-{i}"
                 metadata = {
                     "file_id": file_id,
                     "category": category,
                     "company_id": str(company_id),
                     "building_id": str(building_id) if building_id is not None else "",  
                     "total_chunks": len(chunks),
+                    "chunk_index": i,
                     "chunk": chunk
                 }
 
                 vectors.append((vector_id, embedding, metadata))
+                lexical_docs.append({"id": vector_id, **metadata})
         if vectors:
             index.upsert(vectors=vectors)
             logger.info(f"Upserted {len(vectors)} vectors for file {file_id}")
+            lexical_index.write_file_segment(company_id, file_id, lexical_docs)
     except Exception as e:
         logger.error(f"Failed to process and upsert file {file_id}: {str(e)}")
         raise
-
-
@@ -0,0 +1,119 @@
+"""
+Compare fixed top_k against adaptive retrieval on questions stored in chat_history.
+
+For every stored document question we retrieve with both modes and build the
+packed context. Reported per mode:
+  - context tokens (what the prompt would cost),
+  - answer support: share of the stored answer's content words found in the
+    context, a proxy for whether the context still holds what the answer needed,
+  - the chosen k.
+
+    python -m benchmarks.adaptive_topk_eval --company-id 1 --limit 200
+"""
+import argparse
+import asyncio
+import json
+import re
+
+import numpy as np
+
+from app.config import google_api_key, RETRIEVAL_TOP_K
+from app.database.db import SessionLocal
+from app.models.models import ChatHistory, ChatSession
+from app.services.context_builder import build_context
+from app.services.retrieval_service import retrieve_chunks
+from app.utils.lexical_index import tokenize
+from app.utils.process_file import get_embedding
+
+STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "is", "are", "be", "by", "with",
+    "as", "at", "that", "this", "it", "from", "not", "no", "will", "shall", "any", "all", "per",
+}
+NOT_FOUND = "information not available in documents"
+
+
+def load_questions(company_id, limit: int):
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(ChatHistory.question, ChatHistory.answer, ChatHistory.response_json, ChatSession.category)
+            .join(ChatSession, ChatSession.id == ChatHistory.chat_session_id)
+            .filter(ChatHistory.company_id == company_id, ChatHistory.answer.isnot(None))
+            .order_by(ChatHistory.timestamp.desc())
+            .limit(limit * 3)
+            .all()
+        )
+    finally:
+        db.close()
+
+    questions = []
+    for question, answer, response_json, category in rows:
+        response_json = response_json or {}
+        if response_json.get("query_type") == "general" or NOT_FOUND in (answer or "").lower():
+            continue
+        questions.append({
+            "question": response_json.get("retrieval_query") or question,
+            "answer": answer,
+            "category": category,
+        })
+        if len(questions) >= limit:
+            break
+    return questions
+
+
+def answer_support(answer: str, context: str) -> float:
+    answer_terms = {t for t in tokenize(answer) if t not in STOPWORDS and not re.fullmatch(r"[a-z]", t)}
+    if not answer_terms:
+        return 1.0
+    context_terms = set(tokenize(context))
+    return len(answer_terms & context_terms) / len(answer_terms)
+
+
+async def run(args):
+    questions = load_questions(args.company_id, args.limit)
+    if not questions:
+        raise SystemExit("No stored document questions found for this company")
+
+    embeddings = await get_embedding([q["question"] for q in questions], google_api_key)
+    stats = {mode: {"tokens": [], "support": [], "k": []} for mode in ("fixed", "adaptive")}
+
+    for item, emb in zip(questions, embeddings):
+        filter_metadata = {"company_id": str(args.company_id)}
+        if item["category"]:
+            filter_metadata["category"] = item["category"]
+        for mode in stats:
+            result = await retrieve_chunks(item["question"], emb, filter_metadata, args.company_id, top_k=args.top_k, mode=mode)
+            context = build_context(result["matches"])
+            stats[mode]["tokens"].append(context["context_tokens"])
+            stats[mode]["support"].append(answer_support(item["answer"], context["context"]))
+            stats[mode]["k"].append(result["k"])
+
+    def summary(mode):
+        s = stats[mode]
+        return {
+            "mean_context_tokens": round(float(np.mean(s["tokens"])), 1),
+            "mean_answer_support": round(float(np.mean(s["support"])), 4),
+            "mean_k": round(float(np.mean(s["k"])), 2),
+            "k_distribution": {str(k): s["k"].count(k) for k in sorted(set(s["k"]))},
+        }
+
+    fixed_tokens = float(np.sum(stats["fixed"]["tokens"])) or 1.0
+    report = {
+        "questions": len(questions),
+        "fixed": summary("fixed"),
+        "adaptive": summary("adaptive"),
+        "token_savings_pct": round(100 * (1 - float(np.sum(stats["adaptive"]["tokens"])) / fixed_tokens), 2),
+    }
+    print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--company-id", required=True, type=int)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=RETRIEVAL_TOP_K)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Recall and latency of vector-only vs hybrid (BM25 + vector, RRF) retrieval.
+
+Queries are built from the company's own chunks: for each sampled chunk we take
+an identifier-like phrase (suite numbers, clause numbers, capitalised names) and
+ask about it. A query counts as recalled when the source chunk is in the top k.
+
+    python -m benchmarks.hybrid_retrieval --company-id 1 --category Building --queries 100
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+
+import numpy as np
+
+from app.config import google_api_key, RETRIEVAL_TOP_K, RRF_K
+from app.services.retrieval_service import query_vector_index
+from app.utils import lexical_index
+from app.utils.process_file import get_embedding
+
+IDENTIFIER_RE = re.compile(r"\b(?:[A-Z][\w&.,'-]*\s){1,4}[A-Z][\w&.'-]*|\b\w*\d[\w.\-/]*\b")
+
+
+def build_queries(company_id, category, n_queries: int, seed: int):
+    index = lexical_index._load_company_index(company_id)
+    docs = [d for d in index.docs if not category or d.get("category") == category]
+    rng = random.Random(seed)
+    rng.shuffle(docs)
+
+    queries = []
+    for doc in docs:
+        candidates = [m.group(0).strip() for m in IDENTIFIER_RE.finditer(doc["chunk"]) if len(m.group(0).strip()) > 2]
+        if not candidates:
+            continue
+        phrase = rng.choice(candidates)
+        queries.append({"question": f"What does the document say about {phrase}?", "expected_id": doc["id"]})
+        if len(queries) >= n_queries:
+            break
+    return queries
+
+
+def summarize(latencies, hits):
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "recall": round(sum(hits) / len(hits), 4) if hits else 0.0,
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2) if len(latencies_ms) else 0.0,
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 2) if len(latencies_ms) else 0.0,
+    }
+
+
+async def run(args):
+    queries = build_queries(args.company_id, args.category, args.queries, args.seed)
+    if not queries:
+        raise SystemExit("No indexed chunks found for this company/category")
+
+    embeddings = await get_embedding([q["question"] for q in queries], google_api_key)
+    filter_metadata = {"company_id": str(args.company_id)}
+    if args.category:
+        filter_metadata["category"] = args.category
+
+    loop = asyncio.get_running_loop()
+    results = {"vector": ([], []), "hybrid": ([], [])}
+
+    for query, emb in zip(queries, embeddings):
+        start = time.perf_counter()
+        vector_matches = await loop.run_in_executor(None, query_vector_index, emb, args.top_k, filter_metadata)
+        vector_elapsed = time.perf_counter() - start
+        results["vector"][0].append(vector_elapsed)
+        results["vector"][1].append(any(m["id"] == query["expected_id"] for m in vector_matches))
+
+        start = time.perf_counter()
+        lexical_task = loop.run_in_executor(
+            None, lexical_index.search, args.company_id, query["question"], args.top_k, filter_metadata
+        )
+        vector_task = loop.run_in_executor(None, query_vector_index, emb, args.top_k, filter_metadata)
+        vector_matches, lexical_matches = await asyncio.gather(vector_task, lexical_task)
+        fused = lexical_index.reciprocal_rank_fusion([vector_matches, lexical_matches], top_k=args.top_k, k=RRF_K)
+        results["hybrid"][0].append(time.perf_counter() - start)
+        results["hybrid"][1].append(any(m["id"] == query["expected_id"] for m in fused))
+
+    report = {
+        "queries": len(queries),
+        "top_k": args.top_k,
+        "vector_only": summarize(*results["vector"]),
+        "hybrid_rrf": summarize(*results["hybrid"]),
+    }
+    print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--company-id", required=True)
+    parser.add_argument("--category", default=None)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=RETRIEVAL_TOP_K)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
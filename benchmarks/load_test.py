@@ -0,0 +1,473 @@
+"""
+End-to-end load test of main:app.
+
+Boots uvicorn with PROVIDER_MODE=offline (no Gemini/Pinecone traffic) against a
+fresh local SQLite database, seeds a company, an admin and buildings, indexes a
+few synthetic lease documents, then drives weighted scenarios at increasing
+concurrency:
+  - chat:      login -> list buildings -> a few questions in one session
+  - upload:    bulk upload of building documents
+  - dashboard: every admin dashboard panel
+  - lease:     LOI PDF upload -> lease generation
+Throughput and latency percentiles are reported per route and per level, and
+the full result is written as JSON; pass --compare to diff against an old run.
+
+    python -m benchmarks.load_test --concurrency 1,8,32 --duration 30
+    python -m benchmarks.load_test --compare benchmarks/results/load_20260101-120000.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "LoadTest#2024"
+CATEGORY = "Building"
+LEASE_CATEGORY = "lease_gen"
+
+TENANTS = ["Acme Analytics LLC", "Northwind Legal LLP", "Blue Harbor Capital", "Keystone Dental Group", "Juniper Labs Inc."]
+LANDLORDS = ["Fairfax Square Owner LLC", "Market Street Holdings LP", "Tysons Corner Realty Trust"]
+QUESTIONS = [
+    "What is the base rent?",
+    "When does the lease expire?",
+    "Who is the tenant?",
+    "What is the security deposit?",
+    "Is there a renewal option?",
+    "What are the permitted uses of the premises?",
+    "How much is the tenant improvement allowance?",
+]
+FOLLOW_UPS = ["and the escalation?", "what about parking?", "who pays operating expenses?"]
+GENERAL_QUESTIONS = ["hello", "thanks!"]
+CLAUSES = [
+    "Tenant shall pay Base Rent in equal monthly installments in advance on the first day of each month.",
+    "Landlord shall deliver the Premises with base building systems in good working order.",
+    "Tenant shall maintain commercial general liability insurance with limits of not less than $2,000,000.",
+    "Operating Expenses shall be allocated to Tenant based on its proportionate share of the Building.",
+    "Tenant may not assign this Lease or sublet the Premises without Landlord's prior written consent.",
+    "Parking is provided at a ratio of 3 spaces per 1,000 rentable square feet at prevailing rates.",
+]
+DASHBOARD_ROUTES = [
+    "/admin/stats",
+    "/admin/analytics?days=7",
+    "/admin/ai_insights",
+    "/admin/usage_trends?days=7",
+    "/admin/recent_questions",
+    "/admin/activity_summary?days=7",
+    "/admin/latency_breakdown?days=7",
+]
+
+
+def lease_document(rng: random.Random, building: str) -> list:
+    start_year = rng.randint(2022, 2026)
+    term = rng.choice([3, 5, 7, 10])
+    lines = [
+        f"Tenant: {rng.choice(TENANTS)}",
+        f"Landlord: {rng.choice(LANDLORDS)}",
+        f"Premises: Suite {rng.randint(100, 2400)}, {building}",
+        f"Rentable Square Feet: {rng.randint(2, 60) * 500:,}",
+        f"Base Rent: ${rng.randint(28, 95)}.00 per rentable square foot per year",
+        f"Annual Escalation: {rng.choice([2.5, 3.0, 3.5])}%",
+        f"Commencement Date: January 1, {start_year}",
+        f"Expiration Date: December 31, {start_year + term - 1}",
+        f"Security Deposit: ${rng.randint(2, 12) * 5000:,}",
+        f"Renewal Option: one {rng.choice([3, 5])}-year option at fair market value",
+        f"Tenant Improvement Allowance: ${rng.randint(10, 90)}.00 per rentable square foot",
+        "Permitted Use: general office use",
+    ]
+    clauses = rng.sample(CLAUSES, k=len(CLAUSES))
+    return lines + [f"{i}. {clause}" for i, clause in enumerate(clauses, start=1)]
+
+
+def pdf_bytes(lines: list) -> bytes:
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=10)
+    for line in lines:
+        pdf.multi_cell(0, 5, line)
+        pdf.ln(1)
+    out = pdf.output(dest="S")
+    return out.encode("latin-1") if isinstance(out, str) else bytes(out)
+
+
+def encode_multipart(fields: dict, files: list) -> tuple:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, filename, content, content_type in files:
+        header = (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        )
+        parts.append(header.encode() + content + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class Recorder:
+    """Thread-safe (route, latency, status) samples for the current level."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = Counter()
+        self.scenarios = Counter()
+
+    def record(self, route: str, seconds: float, status: int) -> None:
+        with self.lock:
+            self.samples[route].append(seconds)
+            if status == 0 or status >= 400:
+                self.errors[(route, status)] += 1
+
+    def scenario(self, name: str) -> None:
+        with self.lock:
+            self.scenarios[name] += 1
+
+    def summary(self, wall_seconds: float) -> dict:
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            ms = np.array(samples) * 1000
+            errors = {str(status): n for (r, status), n in self.errors.items() if r == route}
+            routes[route] = {
+                "requests": len(samples),
+                "errors": sum(errors.values()),
+                "error_status": errors,
+                "throughput_rps": round(len(samples) / wall_seconds, 2),
+                "p50_ms": round(float(np.percentile(ms, 50)), 2),
+                "p90_ms": round(float(np.percentile(ms, 90)), 2),
+                "p95_ms": round(float(np.percentile(ms, 95)), 2),
+                "p99_ms": round(float(np.percentile(ms, 99)), 2),
+                "max_ms": round(float(ms.max()), 2),
+            }
+        total = sum(r["requests"] for r in routes.values())
+        return {
+            "requests": total,
+            "errors": sum(r["errors"] for r in routes.values()),
+            "throughput_rps": round(total / wall_seconds, 2),
+            "scenarios": dict(self.scenarios),
+            "routes": routes,
+        }
+
+
+class Client:
+    """One keep-alive connection per virtual user."""
+
+    def __init__(self, port: int, recorder: Recorder):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        self.recorder = recorder
+        self.token = None
+
+    def request(self, method: str, path: str, body: bytes = None, content_type: str = None):
+        headers = {}
+        if content_type:
+            headers["Content-Type"] = content_type
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            status, data = response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            status, data = 0, b""
+        self.recorder.record(f"{method} {path.split('?')[0]}", time.perf_counter() - start, status)
+
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, data.decode("utf-8", "replace")
+
+    def json(self, method: str, path: str, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        return self.request(method, path, body, "application/json" if body else None)
+
+    def upload(self, path: str, fields: dict, files: list):
+        body, content_type = encode_multipart(fields, files)
+        return self.request("POST", path, body, content_type)
+
+    def login(self, email: str) -> None:
+        self.token = None
+        status, data = self.json("POST", "/auth/login", {"email": email, "password": PASSWORD})
+        if status == 200:
+            self.token = data["access_token"]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def scenario_chat(client: Client, ctx: dict, rng: random.Random) -> None:
+    client.login(ctx["email"])
+    status, buildings = client.json("GET", "/building_operations/list_buildings")
+    building_ids = [b["id"] for b in buildings] if status == 200 and isinstance(buildings, list) and buildings else ctx["building_ids"]
+    building_id = rng.choice(building_ids)
+    session_id = str(uuid.uuid4())
+
+    questions = [rng.choice(QUESTIONS)] + rng.sample(FOLLOW_UPS, k=rng.randint(0, 2))
+    if rng.random() < 0.15:
+        questions.insert(0, rng.choice(GENERAL_QUESTIONS))
+    for question in questions:
+        client.json("POST", "/chatbot/ask_question/", {
+            "session_id": session_id, "question": question, "category": CATEGORY, "building_id": building_id,
+        })
+
+
+def scenario_upload(client: Client, ctx: dict, rng: random.Random) -> None:
+    building_id = rng.choice(ctx["building_ids"])
+    files = [
+        ("files", f"lease_{uuid.uuid4().hex[:8]}.txt", "\n".join(lease_document(rng, f"Building {building_id}")).encode(), "text/plain")
+        for _ in range(ctx["upload_batch"])
+    ]
+    client.upload("/chatbot/upload_building_doc/", {"building_id": building_id, "category": CATEGORY}, files)
+
+
+def scenario_dashboard(client: Client, ctx: dict, rng: random.Random) -> None:
+    for path in DASHBOARD_ROUTES:
+        client.request("GET", path)
+
+
+def scenario_lease(client: Client, ctx: dict, rng: random.Random) -> None:
+    document = pdf_bytes(lease_document(rng, f"{rng.randint(1, 999)} Market Street"))
+    status, data = client.upload(
+        "/generate_lease/upload/simple", {"category": LEASE_CATEGORY},
+        [("file", f"loi_{uuid.uuid4().hex[:8]}.pdf", document, "application/pdf")],
+    )
+    if status == 200 and isinstance(data, dict):
+        client.request("GET", f"/generate_lease/files/lease-agreement-text?file_id={data['file_id']}")
+
+
+SCENARIOS = {
+    "chat": scenario_chat,
+    "upload": scenario_upload,
+    "dashboard": scenario_dashboard,
+    "lease": scenario_lease,
+}
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}'. Choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def seed_database(n_buildings: int) -> dict:
+    from app.database.db import SessionLocal, engine
+    from app.models.models import Base, Building, Company, User
+    from app.utils.auth_utils import get_password_hash
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        tag = uuid.uuid4().hex[:8]
+        company = Company(name=f"Load Test {tag}", owner_name="Load Test")
+        db.add(company)
+        db.flush()
+        admin = User(
+            name="Load Test Admin", number="0000000000", email=f"loadtest-{tag}@example.com",
+            hashed_password=get_password_hash(PASSWORD), is_verified=True, role="admin", company_id=company.id,
+        )
+        db.add(admin)
+        db.flush()
+        buildings = [
+            Building(address=f"{100 + i} Market Street", owner_id=admin.id, company_id=company.id)
+            for i in range(n_buildings)
+        ]
+        db.add_all(buildings)
+        db.commit()
+        return {"email": admin.email, "building_ids": [b.id for b in buildings]}
+    finally:
+        db.close()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, log_path: str) -> subprocess.Popen:
+    os.makedirs(os.path.join(REPO_ROOT, "uploads"), exist_ok=True)
+    log = open(log_path, "w")
+    # One worker: the offline vector store lives in the server process
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/openapi.json")
+            if conn.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.25)
+    process.kill()
+    with open(log_path) as f:
+        raise SystemExit(f"Server failed to start:\n{f.read()[-2000:]}")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def warm_up(port: int, ctx: dict, docs_per_building: int, seed: int) -> None:
+    client = Client(port, Recorder())
+    client.login(ctx["email"])
+    if not client.token:
+        raise SystemExit("Login with the seeded admin failed")
+    rng = random.Random(seed)
+    for building_id in ctx["building_ids"]:
+        files = [
+            ("files", f"seed_{building_id}_{i}.txt", "\n".join(lease_document(rng, f"Building {building_id}")).encode(), "text/plain")
+            for i in range(docs_per_building)
+        ]
+        status, _ = client.upload("/chatbot/upload_building_doc/", {"building_id": building_id, "category": CATEGORY}, files)
+        if status != 200:
+            raise SystemExit(f"Seeding documents for building {building_id} failed with HTTP {status}")
+    client.close()
+
+
+def run_level(port: int, ctx: dict, concurrency: int, duration: float, mix: dict, seed: int) -> dict:
+    recorder = Recorder()
+    names, weights = list(mix), list(mix.values())
+    stop_at = time.monotonic() + duration
+
+    def virtual_user(worker: int):
+        rng = random.Random(seed * 1000 + worker)
+        client = Client(port, recorder)
+        client.login(ctx["email"])
+        while time.monotonic() < stop_at:
+            name = rng.choices(names, weights)[0]
+            recorder.scenario(name)
+            SCENARIOS[name](client, ctx, rng)
+        client.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=virtual_user, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    return {"concurrency": concurrency, "wall_seconds": round(wall, 2), **recorder.summary(wall)}
+
+
+def print_level(level: dict) -> None:
+    print(f"\n== concurrency {level['concurrency']}: {level['requests']} requests, "
+          f"{level['throughput_rps']} req/s, {level['errors']} errors, scenarios {level['scenarios']}")
+    print(f"{'route':<52}{'n':>7}{'err':>6}{'rps':>9}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for route, r in level["routes"].items():
+        print(f"{route:<52}{r['requests']:>7}{r['errors']:>6}{r['throughput_rps']:>9}"
+              f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}")
+
+
+def compare(current: dict, baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    print(f"\n== compared with {baseline_path} (p95 ms / req/s, negative p95 delta is better)")
+    for level in current["levels"]:
+        old = old_levels.get(level["concurrency"])
+        if not old:
+            continue
+        print(f"-- concurrency {level['concurrency']}: {old['throughput_rps']} -> {level['throughput_rps']} req/s")
+        for route, r in level["routes"].items():
+            before = old["routes"].get(route)
+            if not before:
+                continue
+            delta = r["p95_ms"] - before["p95_ms"]
+            pct = 100 * delta / before["p95_ms"] if before["p95_ms"] else 0.0
+            print(f"   {route:<52} p95 {before['p95_ms']:>9} -> {r['p95_ms']:>9} ({pct:+.1f}%)  "
+                  f"rps {before['throughput_rps']} -> {r['throughput_rps']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated virtual user counts, run in order")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per concurrency level")
+    parser.add_argument("--mix", default="chat=6,upload=1,dashboard=2,lease=1", help="Scenario weights")
+    parser.add_argument("--buildings", type=int, default=5)
+    parser.add_argument("--seed-docs", type=int, default=4, help="Documents indexed per building before the run")
+    parser.add_argument("--upload-batch", type=int, default=3, help="Files per bulk upload")
+    parser.add_argument("--database-url", help="Defaults to a fresh SQLite file in a temp directory")
+    parser.add_argument("--llm-latency", default="lognormal:600,0.4", help="Offline LLM latency (see offline_providers)")
+    parser.add_argument("--embed-latency", default="fixed:40")
+    parser.add_argument("--vector-latency", default="fixed:10")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="Result file, defaults to benchmarks/results/load_<timestamp>.json")
+    parser.add_argument("--compare", help="Earlier result file to diff against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    env = {
+        "PROVIDER_MODE": "offline",
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        "LEXICAL_INDEX_DIR": os.path.join(workdir, "lexical"),
+        "LEASE_STORE_DIR": os.path.join(workdir, "lease_store"),
+        "OFFLINE_SEED": str(args.seed),
+        "OFFLINE_LLM_LATENCY": args.llm_latency,
+        "OFFLINE_EMBED_LATENCY": args.embed_latency,
+        "OFFLINE_VECTOR_LATENCY": args.vector_latency,
+    }
+    # Set before any app import so the seeding code and the server share one config
+    os.environ.update(env)
+    sys.path.insert(0, REPO_ROOT)
+
+    ctx = seed_database(args.buildings)
+    ctx["upload_batch"] = args.upload_batch
+    mix = parse_mix(args.mix)
+    port = free_port()
+    server = start_server(port, os.path.join(workdir, "server.log"))
+
+    result = {
+        "started_at": datetime.utcnow().isoformat(),
+        "config": {**vars(args), "env": env},
+        "levels": [],
+    }
+    try:
+        warm_up(port, ctx, args.seed_docs, args.seed)
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            level = run_level(port, ctx, concurrency, args.duration, mix, args.seed)
+            result["levels"].append(level)
+            print_level(level)
+    finally:
+        stop_server(server)
+
+    out = args.out or os.path.join(REPO_ROOT, "benchmarks", "results", f"load_{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {out} (server log: {os.path.join(workdir, 'server.log')})")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
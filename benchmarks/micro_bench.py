@@ -0,0 +1,240 @@
+"""
+Micro-benchmarks for the CPU-bound helpers on the ingestion, lease and dashboard paths.
+
+Each case runs on synthetic inputs at several sizes (the docx case also runs on
+the bundled templates) and reports ops/sec (best of --repeat rounds) and peak
+traced memory for one call. Results can be saved as a baseline and later runs
+compared against it; a case whose ops/sec drops by more than --threshold is
+flagged and the run exits non-zero.
+
+    python -m benchmarks.micro_bench --save-baseline benchmarks/micro_baseline.json
+    python -m benchmarks.micro_bench --baseline benchmarks/micro_baseline.json --only chunk,placeholders
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATES_DIR = os.path.join(REPO_ROOT, "app", "services", "templates")
+
+# Importing the app must not build network clients
+os.environ.setdefault("PROVIDER_MODE", "offline")
+sys.path.insert(0, REPO_ROOT)
+
+WORDS = (
+    "tenant landlord premises rent lease term building suite square feet commencement expiration "
+    "renewal option deposit operating expenses insurance assignment sublease parking allowance"
+).split()
+
+
+def synthetic_text(n_chars: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    words, size = [], 0
+    while size < n_chars:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:n_chars]
+
+
+def write_docx(path: str, n_paragraphs: int) -> None:
+    import docx
+
+    document = docx.Document()
+    rng = random.Random(n_paragraphs)
+    for i in range(n_paragraphs):
+        if i % 25 == 0:
+            document.add_heading(f"Article {i // 25 + 1}", level=1)
+        document.add_paragraph(synthetic_text(rng.randint(120, 400), seed=i))
+        if i % 100 == 50:
+            table = document.add_table(rows=4, cols=3)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = rng.choice(WORDS)
+    document.save(path)
+
+
+def write_pdf(path: str, n_pages: int) -> None:
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=10)
+    for page in range(n_pages):
+        pdf.add_page()
+        for line in range(40):
+            pdf.cell(0, 6, synthetic_text(90, seed=page * 40 + line))
+            pdf.ln(6)
+    pdf.output(path)
+
+
+def write_table(path: str, n_rows: int) -> None:
+    import pandas as pd
+
+    rng = random.Random(n_rows)
+    df = pd.DataFrame({
+        "suite": [f"Suite {rng.randint(100, 2400)}" for _ in range(n_rows)],
+        "tenant": [rng.choice(WORDS).title() for _ in range(n_rows)],
+        "rsf": [rng.randint(500, 30000) for _ in range(n_rows)],
+        "rent_psf": [round(rng.uniform(28, 95), 2) for _ in range(n_rows)],
+        "expiration": [str(date(2025, 1, 1) + timedelta(days=rng.randint(0, 3650))) for _ in range(n_rows)],
+    })
+    if path.endswith(".csv"):
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False, engine="openpyxl")
+
+
+def case_docx(workdir):
+    from app.utils.docx_extreactinon import extract_docx_text
+
+    inputs = {}
+    for name in sorted(os.listdir(TEMPLATES_DIR)):
+        if name.endswith(".docx") and not name.startswith("~$"):
+            inputs[f"template:{name[:24]}"] = os.path.join(TEMPLATES_DIR, name)
+    for n in (50, 500, 2000):
+        path = os.path.join(workdir, f"synthetic_{n}.docx")
+        write_docx(path, n)
+        inputs[f"{n} paragraphs"] = path
+    return {size: (extract_docx_text, (path,)) for size, path in inputs.items()}
+
+
+def case_file_extraction(workdir, ext: str, sizes, writer, unit: str):
+    from app.utils.process_file import extract_text_from_file
+
+    cases = {}
+    for n in sizes:
+        path = os.path.join(workdir, f"synthetic_{n}.{ext}")
+        writer(path, n)
+        cases[f"{n} {unit}"] = (extract_text_from_file, (path,))
+    return cases
+
+
+def case_chunk(workdir):
+    from app.utils.process_file import chunk_text
+
+    return {f"{n // 1000} KB": (chunk_text, (synthetic_text(n),)) for n in (10_000, 100_000, 1_000_000)}
+
+
+def case_placeholders(workdir):
+    from app.services.lease_template_engine import compile_template
+
+    with open(os.path.join(TEMPLATES_DIR, "lease_template.txt"), encoding="utf-8") as f:
+        lease_template = f.read()
+
+    def fill_placeholders(template, replacements):
+        return compile_template(template).render(replacements)
+
+    found = list(dict.fromkeys(re.findall(r"\[[A-Z][A-Z0-9_ ]*\]", lease_template)))
+    cases = {}
+    for n in (10, 50, 200):
+        placeholders = (found + [f"[SYNTHETIC_{i}]" for i in range(n)])[:n]
+        replacements = {p: f"value {i}" for i, p in enumerate(placeholders)}
+        cases[f"{n} placeholders"] = (fill_placeholders, (lease_template, replacements))
+    return cases
+
+
+def case_day_buckets(workdir):
+    from app.crud.dashborad import bucket_by_day
+
+    cases = {}
+    for days in (7, 90, 365):
+        start = date.today() - timedelta(days=days - 1)
+        rows = [(start + timedelta(days=i), i % 17) for i in range(days)]
+        series = {"chat_sessions": rows, "logins": rows, "active_users": rows}
+        cases[f"{days} days"] = (bucket_by_day, (start, days, series))
+    return cases
+
+
+CASES = {
+    "docx": case_docx,
+    "pdf": lambda workdir: case_file_extraction(workdir, "pdf", (1, 10, 50), write_pdf, "pages"),
+    "xlsx": lambda workdir: case_file_extraction(workdir, "xlsx", (100, 1000, 10000), write_table, "rows"),
+    "csv": lambda workdir: case_file_extraction(workdir, "csv", (100, 1000, 10000), write_table, "rows"),
+    "chunk": case_chunk,
+    "placeholders": case_placeholders,
+    "day_buckets": case_day_buckets,
+}
+
+
+def measure(fn, args, min_time: float, repeat: int) -> dict:
+    fn(*args)
+    best = 0.0
+    for _ in range(repeat):
+        calls, start = 0, time.perf_counter()
+        while True:
+            fn(*args)
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, calls / elapsed)
+
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ops_per_sec": round(best, 3), "peak_kib": round(peak / 1024, 1)}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    print(f"\n== compared with baseline (regression threshold {threshold:.0%})")
+    for key, current in results.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        change = current["ops_per_sec"] / before["ops_per_sec"] - 1 if before["ops_per_sec"] else 0.0
+        flag = ""
+        if change < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"{key:<48}{before['ops_per_sec']:>12} -> {current['ops_per_sec']:>12} ops/s ({change:+.1%})"
+              f"  peak {before['peak_kib']} -> {current['peak_kib']} KiB{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help=f"Comma-separated cases: {', '.join(CASES)}")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds per timing round")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing rounds; the best is kept")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="Write these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed ops/sec drop before flagging")
+    args = parser.parse_args()
+
+    selected = args.only.split(",") if args.only else list(CASES)
+    unknown = set(selected) - set(CASES)
+    if unknown:
+        raise SystemExit(f"Unknown case(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    print(f"{'case':<48}{'ops/sec':>14}{'peak KiB':>12}")
+    with tempfile.TemporaryDirectory(prefix="microbench-") as workdir:
+        for case in selected:
+            for size, (fn, fn_args) in CASES[case](workdir).items():
+                key = f"{case} [{size}]"
+                results[key] = measure(fn, fn_args, args.min_time, args.repeat)
+                print(f"{key:<48}{results[key]['ops_per_sec']:>14}{results[key]['peak_kib']:>12}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} case(s) regressed: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+Fill the schema with synthetic multi-tenant data for scale and performance tests.
+
+Generates companies, users, buildings, standalone files, chat sessions, chat
+history, OTPs, logins and feedback. Volumes are set per parent (e.g. sessions
+per user) and skewed so a few tenants dominate, like production. Timestamps
+lean towards recent days, working hours and weekdays.
+
+Rows are streamed in batches: COPY ... FROM STDIN on PostgreSQL,
+executemany inserts elsewhere. Ids continue from the current maxima, so runs
+can be stacked onto an existing database. The same --seed gives the same data.
+
+    python -m benchmarks.synthetic_data --scale dev
+    python -m benchmarks.synthetic_data --scale large        # ~10M chat_history rows
+    python -m benchmarks.synthetic_data --companies 20 --sessions 50 --turns 6 --days 180
+"""
+import argparse
+import bisect
+import csv
+import io
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+PASSWORD = "Password#123"
+
+# Per-parent volumes: users per company, buildings per company, files per building,
+# sessions / OTPs / logins / feedback per user, turns per session
+SCALES = {
+    "dev": dict(companies=5, users=10, buildings=8, files=4, sessions=10, turns=4, otps=5, logins=20, feedback=1),
+    "medium": dict(companies=20, users=50, buildings=20, files=10, sessions=100, turns=4, otps=20, logins=100, feedback=2),
+    "large": dict(companies=50, users=100, buildings=40, files=20, sessions=500, turns=4, otps=40, logins=300, feedback=3),
+}
+
+TABLE_ORDER = [
+    "companies", "user", "building", "standalone_files", "chat_sessions",
+    "chat_history", "otp", "user_logins", "user_feedback",
+]
+COLUMNS = {
+    "companies": ["id", "name", "owner_name", "created_at"],
+    "user": ["id", "name", "number", "email", "hashed_password", "is_verified", "role", "company_id", "created_at"],
+    "building": ["id", "address", "owner_id", "company_id"],
+    "standalone_files": ["file_id", "original_file_name", "user_id", "building_id", "category", "uploaded_at",
+                         "gcs_path", "file_size", "company_id"],
+    "chat_sessions": ["id", "user_id", "building_id", "title", "created_at", "category", "company_id"],
+    "chat_history": ["id", "chat_session_id", "user_id", "question", "answer", "file_id", "timestamp",
+                     "response_time", "confidence", "feedback", "response_json", "company_id"],
+    "otp": ["id", "email", "otp_code", "created_at", "expires_at"],
+    "user_logins": ["id", "user_id", "login_timestamp"],
+    "user_feedback": ["id", "user_id", "company_id", "feedback", "rating", "created_at"],
+}
+INTEGER_ID_TABLES = [t for t in TABLE_ORDER if t not in ("standalone_files", "chat_sessions")]
+
+STREETS = ["Market Street", "Fairfax Square", "Wilson Boulevard", "K Street NW", "Park Avenue", "Main Street"]
+FIRST_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn"]
+LAST_NAMES = ["Patel", "Kim", "Garcia", "Nguyen", "Smith", "Cohen", "Okafor", "Rossi", "Silva", "Meyer"]
+CATEGORIES = ["Building", "Lease", "Portfolio", "Comps", "template"]
+QUESTIONS = [
+    "What is the base rent for suite {suite}?",
+    "When does the lease for suite {suite} expire?",
+    "Who is the tenant in suite {suite}?",
+    "What is the security deposit at {address}?",
+    "Is there a renewal option for suite {suite}?",
+    "What are the operating expense provisions at {address}?",
+    "How much parking is allocated to suite {suite}?",
+    "hello",
+]
+FEEDBACK = [
+    "Answers are accurate and fast.", "Sometimes the answer misses the renewal clause.",
+    "Great for quick lease abstracts.", "Slow on large documents.", "Would like exports to Excel.",
+]
+FEEDBACK_LABELS = ["positive", "neutral", "negative", None]
+
+
+class Clock:
+    """
+    Samples timestamps inside [now - days, now): day weight decays with age
+    (half-life `days / 3`), weekends get a third of a weekday's traffic and
+    hours follow a working-day curve.
+    """
+
+    HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 8, 14, 18, 20, 19, 15, 17, 19, 18, 15, 10, 6, 4, 3, 2, 1, 1]
+
+    def __init__(self, rng: random.Random, days: int, now: datetime):
+        self.rng = rng
+        self.start = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        half_life = max(1.0, days / 3)
+        weights = []
+        for offset in range(days):
+            day = self.start + timedelta(days=offset)
+            recency = math.pow(0.5, (days - 1 - offset) / half_life)
+            weights.append(recency * (0.33 if day.weekday() >= 5 else 1.0))
+        self.day_cum = list(itertools.accumulate(weights))
+        self.hour_cum = list(itertools.accumulate(self.HOUR_WEIGHTS))
+
+    def _pick(self, cumulative: list) -> int:
+        return bisect.bisect(cumulative, self.rng.random() * cumulative[-1])
+
+    def sample(self, not_before: datetime = None) -> datetime:
+        moment = self.start + timedelta(
+            days=self._pick(self.day_cum), hours=self._pick(self.hour_cum), seconds=self.rng.randrange(3600)
+        )
+        if not_before and moment < not_before:
+            moment = not_before + timedelta(seconds=self.rng.randrange(1, 86400))
+        return moment
+
+
+def skewed_counts(total_parents: int, per_parent: float, skew: float, rng: random.Random) -> list:
+    """Split `total_parents * per_parent` children over parents with Zipf(`skew`) weights, at least one each."""
+    weights = [1.0 / math.pow(rank + 1, skew) for rank in range(total_parents)]
+    rng.shuffle(weights)
+    scale = total_parents * per_parent / sum(weights)
+    return [max(1, round(w * scale)) for w in weights]
+
+
+def poisson_like(rng: random.Random, mean: float) -> int:
+    """Cheap integer draw around `mean` (geometric spread), never below 1."""
+    if mean <= 1:
+        return 1
+    return max(1, int(rng.expovariate(1.0 / mean)) + 1)
+
+
+def _copy_value(value):
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+
+class CopyWriter:
+    """PostgreSQL: COPY FROM STDIN per batch through the raw psycopg2 connection."""
+
+    def __init__(self, engine):
+        self.connection = engine.raw_connection()
+
+    def write(self, table: str, columns: list, rows: list) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_copy_value(v) for v in row])
+        buffer.seek(0)
+        cursor = self.connection.cursor()
+        cursor.copy_expert(
+            f'COPY "{table}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')', buffer
+        )
+        self.connection.commit()
+
+    def finish(self, tables: list) -> None:
+        cursor = self.connection.cursor()
+        for table in tables:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), (SELECT COALESCE(MAX(id), 1) FROM \"{table}\"))"
+            )
+        self.connection.commit()
+        self.connection.close()
+
+
+class ExecutemanyWriter:
+    """Any other dialect: one executemany INSERT per batch."""
+
+    def __init__(self, engine, metadata):
+        self.engine = engine
+        self.metadata = metadata
+
+    def write(self, table: str, columns: list, rows: list) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(self.metadata.tables[table].insert(), [dict(zip(columns, row)) for row in rows])
+
+    def finish(self, tables: list) -> None:
+        pass
+
+
+class Loader:
+    """Buffers rows per table and flushes every table, parents first, once any buffer fills."""
+
+    def __init__(self, writer, batch_size: int):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.buffers = defaultdict(list)
+        self.counts = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def add(self, table: str, row: tuple) -> None:
+        self.buffers[table].append(row)
+        if len(self.buffers[table]) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        for table in TABLE_ORDER:
+            rows = self.buffers.pop(table, None)
+            if rows:
+                start = time.perf_counter()
+                self.writer.write(table, COLUMNS[table], rows)
+                self.seconds[table] += time.perf_counter() - start
+                self.counts[table] += len(rows)
+
+
+def next_ids(engine) -> dict:
+    from sqlalchemy import text
+
+    ids = {}
+    with engine.connect() as conn:
+        for table in INTEGER_ID_TABLES:
+            ids[table] = itertools.count((conn.execute(text(f'SELECT MAX(id) FROM "{table}"')).scalar() or 0) + 1)
+    return ids
+
+
+def generate(loader: Loader, ids: dict, volumes: dict, args) -> list:
+    from app.utils.auth_utils import get_password_hash
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    clock = Clock(rng, args.days, now)
+    hashed_password = get_password_hash(PASSWORD)
+    run_tag = uuid.UUID(int=rng.getrandbits(128)).hex[:6]
+
+    users_per_company = skewed_counts(volumes["companies"], volumes["users"], args.skew, rng)
+    buildings_per_company = skewed_counts(volumes["companies"], volumes["buildings"], args.skew, rng)
+    company_ids = []
+
+    for c in range(volumes["companies"]):
+        company_id = next(ids["companies"])
+        company_ids.append(company_id)
+        slug = f"synthetic-{run_tag}-{c}"
+        loader.add("companies", (company_id, f"Synthetic Co {run_tag}-{c}", rng.choice(LAST_NAMES), clock.start))
+
+        users = []
+        for u in range(users_per_company[c]):
+            user_id = next(ids["user"])
+            joined = clock.sample()
+            role = "admin" if u == 0 or rng.random() < 0.05 else "user"
+            email = f"user{user_id}@{slug}.example.com"
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            loader.add("user", (user_id, name, f"555{user_id:07d}"[-10:], email, hashed_password, True, role, company_id, joined))
+            users.append((user_id, email, joined, role))
+        admins = [u for u in users if u[3] == "admin"]
+
+        buildings = []
+        for b in range(buildings_per_company[c]):
+            building_id = next(ids["building"])
+            address = f"{rng.randint(1, 9999)} {rng.choice(STREETS)}"
+            loader.add("building", (building_id, address, rng.choice(admins)[0], company_id))
+            buildings.append((building_id, address))
+
+            for _ in range(poisson_like(rng, volumes["files"])):
+                file_id = str(uuid.UUID(int=rng.getrandbits(128)))
+                name = f"{rng.choice(['lease', 'amendment', 'loi', 'rent_roll'])}_{building_id}_{file_id[:8]}.pdf"
+                loader.add("standalone_files", (
+                    file_id, name, rng.choice(admins)[0], building_id, rng.choice(CATEGORIES), clock.sample(),
+                    f"{file_id}_{name}", f"{rng.randint(20, 9000)} KB", company_id,
+                ))
+
+        for user_id, email, joined, role in users:
+            for _ in range(poisson_like(rng, volumes["sessions"])):
+                session_id = str(uuid.UUID(int=rng.getrandbits(128)))
+                building_id, address = rng.choice(buildings)
+                category = rng.choice(CATEGORIES[:4])
+                started = clock.sample(not_before=joined)
+                loader.add("chat_sessions", (session_id, user_id, building_id, None, started, category, company_id))
+
+                moment = started
+                for turn in range(poisson_like(rng, volumes["turns"])):
+                    moment += timedelta(seconds=rng.randint(5, 240))
+                    question = rng.choice(QUESTIONS).format(suite=rng.randint(100, 2400), address=address)
+                    general = question == "hello"
+                    total_ms = rng.lognormvariate(7.6, 0.45)
+                    response_json = {
+                        "query_type": "general" if general else "specific",
+                        "confidence": None if general else round(rng.uniform(0.3, 0.95), 3),
+                        "prompt_tokens": rng.randint(300, 3500),
+                        "retrieval_k": None if general else rng.randint(2, 10),
+                        "timings_ms": {
+                            "embedding": round(total_ms * 0.08, 2),
+                            "vector_query": round(total_ms * 0.1, 2),
+                            "llm_answer": round(total_ms * 0.7, 2),
+                            "total": round(total_ms, 2),
+                        },
+                    }
+                    loader.add("chat_history", (
+                        next(ids["chat_history"]), session_id, user_id, question,
+                        "Hello! How can I help?" if general else f"Per the lease for {address}, see section {rng.randint(1, 40)}.",
+                        None, moment, round(total_ms / 1000, 3), response_json["confidence"],
+                        rng.choice(FEEDBACK_LABELS), response_json, company_id,
+                    ))
+
+            for _ in range(poisson_like(rng, volumes["otps"])):
+                created = clock.sample(not_before=joined)
+                loader.add("otp", (next(ids["otp"]), email, f"{rng.randrange(10 ** 6):06d}", created, created + timedelta(minutes=10)))
+            for _ in range(poisson_like(rng, volumes["logins"])):
+                loader.add("user_logins", (next(ids["user_logins"]), user_id, clock.sample(not_before=joined)))
+            if role == "user" and volumes["feedback"]:
+                for _ in range(rng.randint(0, 2 * volumes["feedback"])):
+                    loader.add("user_feedback", (
+                        next(ids["user_feedback"]), user_id, company_id, rng.choice(FEEDBACK),
+                        rng.randint(1, 5), clock.sample(not_before=joined),
+                    ))
+
+    loader.flush()
+    return company_ids
+
+
+def set_company_owners(engine, company_ids: list) -> None:
+    from sqlalchemy import bindparam, text
+
+    if not company_ids:
+        return
+    statement = text(
+        'UPDATE companies SET owner_id = (SELECT MIN(id) FROM "user" '
+        "WHERE \"user\".company_id = companies.id AND \"user\".role = 'admin') WHERE id IN :ids"
+    ).bindparams(bindparam("ids", expanding=True))
+    with engine.begin() as conn:
+        conn.execute(statement, {"ids": company_ids})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="dev", help="Preset volumes; flags below override")
+    for name in SCALES["dev"]:
+        parser.add_argument(f"--{name}", type=int)
+    parser.add_argument("--days", type=int, default=365, help="History window for timestamps")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of tenant size (0 = uniform)")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--database-url", help="Defaults to DATABASE_URL")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    from app.database.db import engine
+    from app.models.models import Base
+
+    volumes = {name: getattr(args, name) if getattr(args, name) is not None else value
+               for name, value in SCALES[args.scale].items()}
+    Base.metadata.create_all(bind=engine)
+
+    writer = CopyWriter(engine) if engine.dialect.name == "postgresql" else ExecutemanyWriter(engine, Base.metadata)
+    loader = Loader(writer, args.batch_size)
+
+    started = time.perf_counter()
+    company_ids = generate(loader, next_ids(engine), volumes, args)
+    writer.finish(INTEGER_ID_TABLES)
+    set_company_owners(engine, company_ids)
+    elapsed = time.perf_counter() - started
+
+    total = sum(loader.counts.values())
+    print(f"Loaded {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s) via {type(writer).__name__}")
+    for table in TABLE_ORDER:
+        print(f"  {table:<18}{loader.counts[table]:>14,} rows  {loader.seconds[table]:>8.1f}s writing")
+    print(f"Every synthetic user can log in with password {PASSWORD!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,9 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from app.models.models import Base
 from app.database.db import engine
-from app.router import admin_user_chat, auth, buildings, chatbot, dashborad, feeedback, invite_user,  user_chat_bot,gen_lease
+from app.services.chat_writer import chat_writer
+from app.services.lease_job_service import lease_job_runner
+from app.router import admin_user_chat, auth, buildings, chatbot, dashborad, feeedback, invite_user,  user_chat_bot,gen_lease, lease_template
 from fastapi.staticfiles import StaticFiles
 
 
@@ -43,6 +45,7 @@ app.include_router(auth.router, prefix="/auth")
 app.include_router(invite_user.router, prefix="/invite_user", tags=["Invite User"])
 app.include_router(dashborad.router, prefix="/admin", tags=["Dashboard"])
 app.include_router(gen_lease.router,prefix="/generate_lease", tags=["Generate Lease"])
+app.include_router(lease_template.router, prefix="/lease_template", tags=["Lease Templates"])
 app.include_router(user_chat_bot.router, prefix="/user",tags=["Portfolio Chatbot"])
 app.include_router(admin_user_chat.router, prefix="/admin_user_chat", tags=["Data categories chatbot"])
 app.include_router(buildings.router, prefix="/building_operations", tags=["Building Operations"])
@@ -51,8 +54,16 @@ app.include_router(feeedback.router,prefix="/feedback",tags=["feedback"])
 
 
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     create_db_and_tables()
+    chat_writer.start()
+    lease_job_runner.resume_unfinished()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await lease_job_runner.stop()
+    await chat_writer.stop()
 
 
 @app.exception_handler(HTTPException)
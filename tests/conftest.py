@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+# The app reads its configuration at import time: point it at the offline
+# providers and a throwaway SQLite database before any test imports it.
+_workdir = tempfile.mkdtemp(prefix="tests-")
+os.environ.setdefault("PROVIDER_MODE", "offline")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'test.db')}")
+os.environ.setdefault("LEXICAL_INDEX_DIR", os.path.join(_workdir, "lexical"))
+os.environ.setdefault("LEASE_STORE_DIR", os.path.join(_workdir, "lease_store"))
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
@@ -0,0 +1,36 @@
+import pytest
+
+from app.crud.user_chatbot_crud import is_foreign_chat_session, save_chat_history_batch
+from app.database.db import SessionLocal, engine
+from app.models.models import Base, ChatHistory, ChatSession
+
+TURNS = [{"question": "What is the rent?", "answer": "See section 4."}, {"question": "Deposit?", "answer": "$10,000"}]
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine, tables=[ChatSession.__table__, ChatHistory.__table__])
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine, tables=[ChatHistory.__table__, ChatSession.__table__])
+
+
+def test_batch_is_saved_to_a_new_then_existing_session(db):
+    save_chat_history_batch(db, session_id="s1", user_id=1, company_id=1, turns=TURNS)
+    save_chat_history_batch(db, session_id="s1", user_id=1, company_id=1, turns=TURNS[:1])
+
+    assert db.query(ChatSession).count() == 1
+    assert db.query(ChatHistory).filter_by(chat_session_id="s1").count() == 3
+
+
+def test_another_users_session_is_refused(db):
+    save_chat_history_batch(db, session_id="s1", user_id=1, company_id=1, turns=TURNS)
+
+    assert not is_foreign_chat_session(db, "s1", 1, 1)
+    assert not is_foreign_chat_session(db, "new", 2, 2)
+    assert is_foreign_chat_session(db, "s1", 2, 1)
+    assert is_foreign_chat_session(db, "s1", 1, 2)
+    with pytest.raises(PermissionError):
+        save_chat_history_batch(db, session_id="s1", user_id=2, company_id=1, turns=TURNS)
+    assert db.query(ChatHistory).filter_by(user_id=2).count() == 0
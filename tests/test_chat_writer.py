@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from datetime import datetime
+
+import pytest
+
+from app.database.db import SessionLocal, engine
+from app.models.models import Base, ChatHistory, ChatSession
+from app.services import chat_writer
+from app.services.chat_writer import ChatHistoryWriter, write_turns
+
+
+def turn(session_id, user_id=1, company_id=1, question="What is the rent?"):
+    return {
+        "chat_session_id": session_id,
+        "user_id": user_id,
+        "company_id": company_id,
+        "category": "lease",
+        "building_id": None,
+        "question": question,
+        "answer": "See section 4.",
+        "file_id": None,
+        "response_json": {"timings_ms": {"total": 12.5}},
+        "response_time": 0.0125,
+        "confidence": 0.9,
+        "timestamp": datetime.utcnow(),
+    }
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine, tables=[ChatSession.__table__, ChatHistory.__table__])
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine, tables=[ChatHistory.__table__, ChatSession.__table__])
+
+
+def test_write_turns_creates_sessions_and_history(db):
+    write_turns([turn("s1"), turn("s1", question="And the deposit?"), turn("s2", user_id=2, company_id=2)])
+
+    assert {(s.id, s.user_id) for s in db.query(ChatSession)} == {("s1", 1), ("s2", 2)}
+    assert db.query(ChatHistory).filter_by(chat_session_id="s1").count() == 2
+
+
+def test_write_turns_skips_sessions_owned_by_someone_else(db):
+    write_turns([turn("s1")])
+    write_turns([turn("s1", user_id=2), turn("s1", company_id=2), turn("s1", question="Mine")])
+
+    questions = [q for (q,) in db.query(ChatHistory.question).filter_by(chat_session_id="s1")]
+    assert sorted(questions) == ["Mine", "What is the rent?"]
+    assert db.query(ChatHistory).filter_by(user_id=2).count() == 0
+
+
+def test_failed_batch_is_retried_then_written_turn_by_turn(monkeypatch, caplog):
+    attempts = []
+
+    def flaky_write_turns(turns):
+        attempts.append([t["question"] for t in turns])
+        if len(turns) > 1 or turns[0]["question"] == "bad":
+            raise RuntimeError("write failed")
+
+    monkeypatch.setattr(chat_writer, "write_turns", flaky_write_turns)
+    writer = ChatHistoryWriter(max_retries=2, retry_backoff=0)
+    batch = [turn("s1", question="ok"), turn("s1", question="bad")]
+
+    with caplog.at_level(logging.ERROR, logger=chat_writer.__name__):
+        asyncio.run(writer._flush(batch))
+
+    assert attempts == [["ok", "bad"]] * 3 + [["ok"], ["bad"]]
+    assert "Dropped 1 of 2 chat turns: s1@" in caplog.text
+
+
+def test_stop_drains_the_queue(monkeypatch):
+    written = []
+    monkeypatch.setattr(chat_writer, "write_turns", lambda turns: written.extend(turns))
+
+    async def run():
+        writer = ChatHistoryWriter(batch_size=2, flush_interval=60)
+        writer.start()
+        for i in range(5):
+            writer.enqueue(turn("s1", question=str(i)))
+        await writer.stop()
+
+    asyncio.run(run())
+    assert [t["question"] for t in written] == ["0", "1", "2", "3", "4"]
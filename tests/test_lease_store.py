@@ -0,0 +1,85 @@
+import pytest
+
+from app.services.lease_store import LeaseStore
+
+LEASE = "".join(f"{i}. Clause {i} of the lease, unchanged between revisions.\n" for i in range(1, 201))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LeaseStore(root=str(tmp_path), cache_size=8)
+
+
+def test_small_edit_is_stored_as_delta(store):
+    first = store.commit(1, "leases", "doc", LEASE, note="generated")
+    edited = LEASE.replace("Clause 100 of", "Clause 100 (amended) of")
+    second = store.commit(1, "leases", "doc", edited, note="edited")
+
+    assert first["kind"] == "full"
+    assert second["kind"] == "delta"
+    assert second["stored_bytes"] < first["stored_bytes"] / 4
+    assert store.read_revision(1, "leases", "doc", 1) == LEASE
+    assert store.read_revision(1, "leases", "doc", 2) == edited
+    assert store.read_latest(1, "leases", "doc") == edited
+
+
+def test_large_change_rebases(store):
+    store.commit(1, "leases", "doc", LEASE)
+    rewritten = "".join(f"Entirely new clause {i}.\n" for i in range(300))
+    revision = store.commit(1, "leases", "doc", rewritten)
+    after = store.commit(1, "leases", "doc", rewritten + "Signed.\n")
+
+    assert revision["kind"] == "full"
+    assert after["kind"] == "delta"
+    assert store.read_revision(1, "leases", "doc", 1) == LEASE
+    assert store.read_revision(1, "leases", "doc", 3) == rewritten + "Signed.\n"
+
+
+def test_committing_the_latest_text_again_is_a_no_op(store):
+    store.commit(1, "leases", "doc", LEASE)
+    store.commit(1, "leases", "doc", LEASE)
+
+    assert len(store.history(1, "leases", "doc")) == 1
+
+
+def test_diff_between_revisions(store):
+    store.commit(1, "leases", "doc", LEASE)
+    store.commit(1, "leases", "doc", LEASE.replace("Clause 7 of", "Clause 7 (struck) of"))
+
+    diff = store.diff(1, "leases", "doc", 1, 2)
+    assert "-7. Clause 7 of the lease" in diff
+    assert "+7. Clause 7 (struck) of the lease" in diff
+    assert store.diff(1, "leases", "doc", 1, 3) is None
+
+
+def test_cached_text_follows_writes_from_another_instance(tmp_path):
+    reader, writer = LeaseStore(root=str(tmp_path)), LeaseStore(root=str(tmp_path))
+    writer.commit(1, "leases", "doc", LEASE)
+    assert reader.read_latest(1, "leases", "doc") == LEASE
+
+    writer.commit(1, "leases", "doc", LEASE + "Addendum.\n")
+    assert reader.read_latest(1, "leases", "doc") == LEASE + "Addendum.\n"
+
+    writer.delete(1, "leases", "doc")
+    assert reader.read_latest(1, "leases", "doc") is None
+    assert not reader.exists(1, "leases", "doc")
+
+
+def test_returning_to_earlier_text_reuses_the_stored_object(store):
+    a = LEASE
+    b = LEASE.replace("Clause 50 of", "Clause 50 (amended) of")
+    c = "".join(f"Entirely new clause {i}.\n" for i in range(300))
+    for text in (a, b, c, b, a):
+        store.commit(1, "leases", "doc", text)
+
+    history = store.history(1, "leases", "doc")
+    assert [r["kind"] for r in history] == ["full", "delta", "full", "delta", "full"]
+    assert history[3]["stored_bytes"] == history[1]["stored_bytes"]
+    assert history[4]["stored_bytes"] == history[0]["stored_bytes"]
+    manifest = store._load_manifest(1, "leases", "doc")
+    assert store._stored_object(1, "leases", "doc", manifest["base"])[0] == "full"
+
+    after = store.commit(1, "leases", "doc", a + "Signed.\n")
+    assert after["kind"] == "delta"
+    for rev, text in enumerate((a, b, c, b, a, a + "Signed.\n"), start=1):
+        assert store.read_revision(1, "leases", "doc", rev) == text
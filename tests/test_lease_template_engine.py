@@ -0,0 +1,31 @@
+from app.services.lease_template_engine import CompiledTemplate, compile_template
+
+
+def test_render_fills_every_occurrence_in_one_pass():
+    template = CompiledTemplate("[A] and [B], then [A] again.")
+
+    assert template.placeholders == ["[A]", "[B]"]
+    assert template.render({"[A]": "alpha", "[B]": "[A]"}) == "alpha and [A], then alpha again."
+
+
+def test_keys_without_brackets_match_and_empty_values_keep_the_placeholder():
+    template = CompiledTemplate("Rent: [RENT]. Deposit: [DEPOSIT]. Term: [TERM].")
+
+    assert template.render({"RENT": 0, "[DEPOSIT]": None, "[TERM]": ""}) == "Rent: 0. Deposit: [DEPOSIT]. Term: [TERM]."
+
+
+def test_fill_patches_previous_parts_in_place():
+    template = CompiledTemplate("[X] / [Y]")
+    parts = template.fill({"[X]": "1", "[Y]": "2"})
+    template.fill({"[Y]": "3"}, parts)
+
+    assert "".join(parts) == "1 / 3"
+    template.fill({"[X]": None}, parts)
+    assert "".join(parts) == "[X] / 3"
+
+
+def test_context_snippet_and_compile_cache():
+    template = compile_template("The Premises contain [SQUARE_FOOTAGE] rentable square feet.")
+
+    assert template.context_snippet("[SQUARE_FOOTAGE]", width=13) == "ises contain [SQUARE_FOOTAGE] rentable squ"
+    assert compile_template(template.text) is template
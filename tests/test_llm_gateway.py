@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+
+from app.utils import llm_gateway as gateway_module
+from app.utils.llm_gateway import HedgeBudget, LLMGateway, RateLimiter
+from app.utils.offline_providers import LatencyDistribution, OfflineBackend
+
+SYSTEM = "You map lease template placeholders to metadata keys. " * 20
+
+
+def offline_gateway(latency: str = "fixed:0", **kwargs) -> LLMGateway:
+    return LLMGateway(OfflineBackend(latency=LatencyDistribution(latency), error_rate=0.0), **kwargs)
+
+
+def test_the_call_that_creates_a_context_cache_is_not_a_hit():
+    gateway = offline_gateway()
+
+    async def run():
+        for _ in range(3):
+            # callers may look the cache up to pick a prompt before invoking
+            assert await gateway.context_cache("template", SYSTEM)
+            await gateway.ainvoke("Map [Tenant Name].", system=SYSTEM, cache_key="template")
+
+    asyncio.run(run())
+    assert gateway.counters["context_cache_creates"] == 1
+    assert gateway.counters["context_cache_hits"] == 2
+    assert gateway.stats()["context_caches"]["template"]["hits"] == 2
+
+
+class ScriptedBackend(OfflineBackend):
+    """Offline replies whose n-th generate call sleeps `delays[n]` seconds (the last delay repeats)."""
+
+    def __init__(self, delays, error=None):
+        super().__init__(latency=LatencyDistribution("fixed:0"), error_rate=0.0)
+        self.delays, self.error, self.calls = list(delays), error, 0
+
+    async def generate(self, system, contents, **kwargs):
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        await asyncio.sleep(delay)
+        if self.error is not None:
+            raise self.error
+        return await super().generate(system, contents, **kwargs)
+
+
+class ClientError(Exception):
+    code = 400
+
+
+@pytest.fixture
+def quick_hedges(monkeypatch):
+    monkeypatch.setattr(gateway_module, "LLM_HEDGE_MIN_DELAY", 0.05)
+    monkeypatch.setattr(gateway_module, "LLM_HEDGE_DEFAULT_DELAY", 0.05)
+
+
+def test_hedge_beats_a_slow_primary(quick_hedges):
+    gateway = LLMGateway(ScriptedBackend([2.0, 0.0]), hedge_enabled=True)
+
+    started = time.monotonic()
+    asyncio.run(gateway.ainvoke("Summarise the lease."))
+
+    assert time.monotonic() - started < 1.0
+    assert gateway.counters["hedges"] == 1
+    assert gateway.counters["hedge_wins"] == 1
+
+
+def test_spent_budget_blocks_further_hedges(quick_hedges):
+    gateway = LLMGateway(ScriptedBackend([0.2, 0.0, 0.2]), hedge_enabled=True)
+    gateway.budget = HedgeBudget(ratio=0.0, burst=1.0)
+
+    async def run():
+        await gateway.ainvoke("First.")
+        await gateway.ainvoke("Second.")
+
+    asyncio.run(run())
+    assert gateway.counters["hedges"] == 1
+    assert gateway.backend.calls == 3
+
+
+def test_client_errors_are_not_retried():
+    gateway = LLMGateway(ScriptedBackend([0.0], error=ClientError("bad request")), hedge_enabled=False)
+
+    with pytest.raises(ClientError):
+        asyncio.run(gateway.ainvoke("Anything."))
+    assert gateway.backend.calls == 1
+    assert gateway.counters["retries"] == 0
+    assert gateway.counters["failures"] == 1
+
+
+def test_deadline_bounds_retries_of_slow_attempts():
+    gateway = LLMGateway(
+        ScriptedBackend([5.0]), deadline=0.3, attempt_timeout=0.1, max_retries=10, backoff_base=0.01,
+        hedge_enabled=False,
+    )
+
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(gateway.ainvoke("Anything."))
+    assert time.monotonic() - started < 0.6
+    assert gateway.counters["timeouts"] >= 2
+
+
+def test_rate_limiter_wait_is_not_recorded_as_latency():
+    gateway = LLMGateway(ScriptedBackend([0.0]), hedge_enabled=False)
+
+    async def run():
+        gateway.limiter = RateLimiter(max_concurrency=1, requests_per_minute=0)
+        await gateway.limiter.acquire()
+        asyncio.get_running_loop().call_later(0.3, gateway.limiter.release)
+        await gateway.ainvoke("Anything.")
+
+    asyncio.run(run())
+    assert len(gateway.latency.samples) == 1
+    assert gateway.latency.samples[0] < 0.1
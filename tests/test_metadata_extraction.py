@@ -0,0 +1,55 @@
+from app.services.metadata_extraction import merge_section_metadata, parse_metadata_json, split_sections
+
+
+def test_split_sections_packs_paragraphs_under_the_limit():
+    text = "\n\n".join(f"Paragraph {i} " + "x" * 40 for i in range(10))
+    sections = split_sections(text, max_chars=120)
+
+    assert all(len(section) <= 120 for section in sections)
+    assert "".join(sections).replace("\n", "") == text.replace("\n", "")
+    assert split_sections("short", max_chars=120) == ["short"]
+
+
+def test_split_sections_cuts_oversized_paragraphs():
+    sections = split_sections("y" * 250, max_chars=100)
+
+    assert [len(section) for section in sections] == [100, 100, 50]
+
+
+def test_merge_matches_normalised_keys_and_ignores_empty_values():
+    merged, conflicts = merge_section_metadata([
+        {"Tenant Name": "Acme LLC", "Security Deposit": "N/A"},
+        {"tenant_name": "Acme LLC", "security_deposit": "$10,000"},
+    ])
+
+    assert merged == {"Tenant Name": "Acme LLC", "security_deposit": "$10,000"}
+    assert conflicts == {}
+
+
+def test_merge_votes_on_conflicts_and_ties_go_to_the_earliest_section():
+    merged, conflicts = merge_section_metadata([
+        {"rent": "$100", "term": "5 years"},
+        {"rent": "$120", "term": "10 years"},
+        {"rent": "$120"},
+    ])
+
+    assert merged == {"rent": "$120", "term": "5 years"}
+    assert conflicts == {"rent": ["$120", "$100"], "term": ["5 years", "10 years"]}
+
+
+def test_merge_recurses_into_objects_and_unions_lists_case_insensitively():
+    merged, conflicts = merge_section_metadata([
+        {"landlord": {"name": "Owner Co"}, "permitted_uses": ["retail", "office"]},
+        {"landlord": {"name": "Owner Co.", "address": "1 Main St"}, "permitted_uses": ["Office", "storage"]},
+    ])
+
+    assert merged == {
+        "landlord": {"name": "Owner Co", "address": "1 Main St"},
+        "permitted_uses": ["retail", "office", "storage"],
+    }
+    assert conflicts == {"landlord.name": ["Owner Co", "Owner Co."]}
+
+
+def test_parse_metadata_json_finds_the_object_in_a_reply():
+    assert parse_metadata_json('Here you go:\n```json\n{"rent": "$100"}\n```') == {"rent": "$100"}
+    assert parse_metadata_json("no json here") == {}
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from app.services import placeholder_mapping
+from app.services.lease_template_engine import CompiledTemplate, is_field_placeholder
+from app.services.placeholder_mapping import flatten_metadata, map_placeholders, resolve_placeholders
+
+TEMPLATE = CompiledTemplate(
+    "This lease between [LANDLORD_NAME] and [TENANT_NAME], [jointly and severally], "
+    "for [BASE_ANNUAL_RENT] per year ([BASE_MONTHLY_RENT] per month). "
+    "[OPTION #1 - LANDLORD PAYS FOR TI] Floor load: [FLOOR LOAD]. Tenant: [TENANT_NAME]."
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_mapping_cache():
+    placeholder_mapping._key_mappings.clear()
+    yield
+    placeholder_mapping._key_mappings.clear()
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = []
+
+    async def fake_map_leftover_placeholders(template, placeholders, flat):
+        calls.append(list(placeholders))
+        return {placeholder: None for placeholder in placeholders}
+
+    monkeypatch.setattr(placeholder_mapping, "map_leftover_placeholders", fake_map_leftover_placeholders)
+    return calls
+
+
+def test_flatten_metadata_nests_paths_and_names():
+    flat = flatten_metadata({"Tenant": {"name": "Acme LLC", "Address": None}, "Uses": ["retail", "", "office"]})
+
+    assert flat == {"tenant_name": "Acme LLC", "tenant": "Acme LLC", "uses": "retail, office"}
+
+
+def test_drafting_notes_are_not_fields():
+    assert is_field_placeholder("[TENANT_NAME]")
+    assert is_field_placeholder("[Floor Load]")
+    assert not is_field_placeholder("[jointly and severally]")
+    assert not is_field_placeholder("[OPTION 1]")
+    assert not is_field_placeholder("[OPTION #1 - LANDLORD PAYS FOR TI]")
+    assert TEMPLATE.fields == ["[LANDLORD_NAME]", "[TENANT_NAME]", "[BASE_ANNUAL_RENT]", "[BASE_MONTHLY_RENT]", "[FLOOR LOAD]"]
+
+
+def test_rent_amount_only_fills_annual_rent():
+    mapping, unresolved = map_placeholders(TEMPLATE, {"rent_amount": "$120,000", "landlord": "Owner Co"})
+
+    assert mapping == {"[LANDLORD_NAME]": "landlord", "[BASE_ANNUAL_RENT]": "rent_amount"}
+    assert unresolved == ["[TENANT_NAME]", "[BASE_MONTHLY_RENT]", "[FLOOR LOAD]"]
+
+
+def test_unresolved_placeholders_keep_their_bracket_text(llm_calls):
+    metadata = {"landlord_name": "Owner Co", "tenant": {"name": "Acme LLC"}, "annual_rent": "$120,000"}
+    text = TEMPLATE.render(asyncio.run(resolve_placeholders(TEMPLATE, metadata)))
+
+    assert text == (
+        "This lease between Owner Co and Acme LLC, [jointly and severally], "
+        "for $120,000 per year ([BASE_MONTHLY_RENT] per month). "
+        "[OPTION #1 - LANDLORD PAYS FOR TI] Floor load: [FLOOR LOAD]. Tenant: Acme LLC."
+    )
+    assert llm_calls == [["[BASE_MONTHLY_RENT]", "[FLOOR LOAD]"]]
+
+
+def test_mapping_is_cached_per_template_and_key_set(llm_calls):
+    asyncio.run(resolve_placeholders(TEMPLATE, {"tenant_name": "Acme LLC"}))
+    replacements = asyncio.run(resolve_placeholders(TEMPLATE, {"tenant_name": "Beta Inc"}))
+    asyncio.run(resolve_placeholders(TEMPLATE, {"tenant_name": "Beta Inc", "floor_load": "100 psf"}))
+
+    assert replacements["[TENANT_NAME]"] == "Beta Inc"
+    assert len(llm_calls) == 2
@@ -0,0 +1,49 @@
+import pytest
+
+from app.services import retrieval_service
+from app.services.retrieval_service import adaptive_k
+from app.utils.lexical_index import reciprocal_rank_fusion, tokenize
+
+
+def match(match_id, score=0.0):
+    return {"id": match_id, "score": score, "metadata": {}}
+
+
+def test_rrf_rewards_matches_ranked_by_both_lists():
+    vector = [match("a", 0.9), match("b", 0.8), match("c", 0.7)]
+    lexical = [match("c", 12.0), match("d", 9.0), match("b", 3.0)]
+    fused = reciprocal_rank_fusion([vector, lexical], top_k=3, k=60)
+
+    assert [m["id"] for m in fused] == ["c", "b", "a"]
+    assert fused[0]["score"] == 0.7  # the first list's copy is kept
+    assert fused[0]["rrf_score"] == pytest.approx(1 / 63 + 1 / 61)
+
+
+def test_tokenize_keeps_identifiers_together():
+    assert tokenize("Suite B-2, 1,200 sq ft at 12.5/sf") == ["suite", "b-2", "1", "200", "sq", "ft", "at", "12.5/sf"]
+
+
+@pytest.fixture
+def adaptive_config(monkeypatch):
+    monkeypatch.setattr(retrieval_service, "ADAPTIVE_RELATIVE_THRESHOLD", 0.88)
+    monkeypatch.setattr(retrieval_service, "ADAPTIVE_FLAT_SPREAD", 0.05)
+    monkeypatch.setattr(retrieval_service, "ADAPTIVE_MIN_K", 2)
+    monkeypatch.setattr(retrieval_service, "ADAPTIVE_MAX_K", 10)
+
+
+def test_adaptive_k_shrinks_on_a_steep_drop(adaptive_config):
+    assert adaptive_k([0.9, 0.85, 0.5, 0.4, 0.3, 0.2], base_k=5) == 2
+
+
+def test_adaptive_k_keeps_the_minimum(adaptive_config):
+    assert adaptive_k([0.9, 0.3, 0.2], base_k=5) == 2
+    assert adaptive_k([0.9], base_k=5) == 1
+    assert adaptive_k([], base_k=5) == 0
+
+
+def test_adaptive_k_grows_only_when_the_head_is_flat(adaptive_config):
+    flat = [0.80, 0.80, 0.79, 0.79, 0.78, 0.78, 0.77, 0.77, 0.76, 0.76, 0.75, 0.74]
+    assert adaptive_k(flat, base_k=5) == 10
+
+    sloped = [0.80, 0.78, 0.76, 0.74, 0.72, 0.71, 0.71, 0.71]
+    assert adaptive_k(sloped, base_k=5) == 5
@@ -0,0 +1,33 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.template_registry import TemplateRegistry, extracted_text_path
+
+
+def test_miss_compiles_the_extracted_text_off_the_event_loop(tmp_path):
+    template_path = tmp_path / "t.docx"
+    template_path.write_bytes(b"original upload")
+    with open(extracted_text_path(str(template_path)), "w", encoding="utf-8") as f:
+        f.write("This lease is made by [Tenant Name].\n")
+    registry = TemplateRegistry(max_size=2)
+    template_file = SimpleNamespace(file_id="t", gcs_path=str(template_path))
+
+    first = asyncio.run(registry.aget(template_file))
+    second = asyncio.run(registry.aget(template_file))
+
+    assert first is second
+    assert first.fields == ["[Tenant Name]"]
+    assert registry.stats == {"hits": 1, "misses": 1, "extractions": 0}
+
+
+def test_unreadable_template_is_a_client_error(tmp_path):
+    template_path = tmp_path / "t.docx"
+    template_path.write_bytes(b"not a zip archive")
+    registry = TemplateRegistry()
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(registry.aget(SimpleNamespace(file_id="t", gcs_path=str(template_path))))
+    assert excinfo.value.status_code == 400